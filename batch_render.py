@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import Config
+from ionogram_tester import IonogramTester
+from ionogram_plot import save_ionogram_image
+from ionogram_io import open_ionogram, read_traces
+from ionospheric_layer_trace import IonosphericLayers, Modes
+
+
+LAYERS = (
+    IonosphericLayers.E_LAYER,
+    IonosphericLayers.F1_LAYER,
+    IonosphericLayers.F2_LAYER,
+    IonosphericLayers.ES_LAYER,
+)
+
+
+def read_ordinary_traces(file_name, iono):
+    """Return ordinary traces (as dictionaries) from JSON or STD file of ionogram."""
+    traces = [trace.to_dict() for trace in read_traces(file_name, iono)]
+    return [trace for trace in traces if trace["trace_type"] == Modes.ORDINARY]
+
+
+def get_description(iono, traces):
+    tz = iono.timezone
+    utc_str = "UTC" if tz == 0 else f"UTC{tz:+d}"
+    description = (
+        f"{iono.get_station_name()}, {iono.date:%Y-%m-%d %H:%M:%S} ({utc_str})"
+    )
+    critical = {t["name"]: t["critical_frequency"] for t in traces}
+    frequencies = [
+        f"fo{name} = {critical[name]:.2f} MHz"
+        for name in (
+            IonosphericLayers.F2_LAYER,
+            IonosphericLayers.F1_LAYER,
+            IonosphericLayers.E_LAYER,
+            IonosphericLayers.ES_LAYER,
+        )
+        if critical.get(name)
+    ]
+    if frequencies:
+        description += "\n" + "   ".join(frequencies)
+    return description
+
+
+def render_file(file_name, out_directory, level, percentile, clean, parameters):
+    iono = open_ionogram(file_name)
+    if clean:
+        iono.clean_ionogram()
+
+    vmin, vmax = iono.get_statistics().get_limits(percentile)
+
+    colors = {
+        IonosphericLayers.E_LAYER: parameters.e_color,
+        IonosphericLayers.F1_LAYER: parameters.f1_color,
+        IonosphericLayers.F2_LAYER: parameters.f2_color,
+        IonosphericLayers.ES_LAYER: parameters.es_color,
+    }
+    traces = sorted(read_ordinary_traces(file_name, iono), key=lambda t: LAYERS.index(t["name"]))
+    points = [(t["freqs"], t["heights"], colors[t["name"]]) for t in traces]
+    lines = [
+        (t["critical_frequency"], colors[t["name"]])
+        for t in traces
+        if t["critical_frequency"] and int(t["critical_frequency"]) != 99
+    ]
+
+    out_name = os.path.join(out_directory, os.path.basename(file_name) + ".png")
+    save_ionogram_image(
+        out_name,
+        iono,
+        iono.get_data(),
+        vmin * level / 100,
+        vmax * level / 100,
+        points=points,
+        lines=lines,
+        title=get_description(iono, traces),
+        font_size=parameters.font_size,
+    )
+    return out_name
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render ionograms of a directory to PNG files without GUI."
+    )
+    parser.add_argument("directory", help="directory with ionograms")
+    parser.add_argument("--out", help="output directory (default: input directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--level", type=int, default=100, help="level from 10 to 100%%")
+    parser.add_argument("--percentile", type=float, default=100, help="contrast percentile from 90 to 100%%")
+    parser.add_argument("--clean", action="store_true", help="clean ionograms before rendering")
+    args = parser.parse_args()
+
+    out_directory = args.out or args.directory
+    os.makedirs(out_directory, exist_ok=True)
+
+    tester = IonogramTester()
+    files = sorted(f for f in glob(f"{args.directory}/*.*") if tester.examine(f))
+
+    parameters = Config("data/IonogramViewer2.ini").get_parameters()
+
+    n_errors = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(
+                render_file,
+                file_name,
+                out_directory,
+                args.level,
+                args.percentile,
+                args.clean,
+                parameters,
+            ): file_name
+            for file_name in files
+        }
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as e:
+                n_errors += 1
+                print(f"{futures[future]}: {e}", file=sys.stderr)
+
+    print(f"{len(files) - n_errors} file(s) rendered, {n_errors} error(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-from matplotlib import colors
+cmap_two_comp = "two_comp"
 
+cmap_one_comp = "binary"
 
-cmap_two_comp = colors.ListedColormap([
+TWO_COMP_COLORS = [
     '#C51B7D',
     '#DE77AE',
     '#F186DA',
@@ -9,7 +10,13 @@ cmap_two_comp = colors.ListedColormap([
     '#6060F0', 
     '#353595', 
     '#0050FF'
-])
+]
 
 
-cmap_one_comp = 'binary'
+def get_colormap(name):
+    # matplotlib is imported here so that loading ionograms does not need it
+    from matplotlib import colormaps, colors
+
+    if name == cmap_two_comp:
+        return colors.ListedColormap(TWO_COMP_COLORS, name=cmap_two_comp)
+    return colormaps[name]
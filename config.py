@@ -9,6 +9,14 @@ class Parameters:
     f1_color: str
     e_color: str
     es_color: str
+    pick_radius: int
+    fast_rendering: bool
+    backend: str
+    live_open_newest: bool
+    playback_fps: int
+    playback_buffer: int
+    playback_workers: int
+    summary_workers: int
 
 
 class Config:
@@ -41,6 +49,30 @@ class Config:
         if value := safe_load("GUI", "Es-layer-color"):
             self.__parameters.es_color = "#" + value
 
+        if value := safe_load("GUI", "Pick-radius"):
+            self.__parameters.pick_radius = int(value)
+
+        if value := safe_load("GUI", "Fast-rendering"):
+            self.__parameters.fast_rendering = value.lower() in ("1", "yes", "true", "on")
+
+        if value := safe_load("GUI", "Backend"):
+            self.__parameters.backend = value.lower()
+
+        if value := safe_load("GUI", "Live-open-newest"):
+            self.__parameters.live_open_newest = value.lower() in ("1", "yes", "true", "on")
+
+        if value := safe_load("GUI", "Playback-fps"):
+            self.__parameters.playback_fps = int(value)
+
+        if value := safe_load("GUI", "Playback-buffer"):
+            self.__parameters.playback_buffer = int(value)
+
+        if value := safe_load("GUI", "Playback-workers"):
+            self.__parameters.playback_workers = int(value)
+
+        if value := safe_load("GUI", "Summary-workers"):
+            self.__parameters.summary_workers = int(value)
+
     def __set_default_values(self):
         self.__parameters = Parameters(
             font_size=16,
@@ -48,6 +80,14 @@ class Config:
             f1_color="#10E0E0",
             e_color="#10C010",
             es_color="#F0B000",
+            pick_radius=8,
+            fast_rendering=True,
+            backend="matplotlib",
+            live_open_newest=True,
+            playback_fps=10,
+            playback_buffer=16,
+            playback_workers=2,
+            summary_workers=2,
         )
 
     def get_parameters(self):
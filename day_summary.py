@@ -0,0 +1,345 @@
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from glob import glob
+import numpy as np
+from ionogram_io import open_ionogram, load_metadata, ordered_map
+from ionogram_tester import IonogramTester
+from ionogram_input import split_member_path, create_temp_file
+from file_navigator import list_members
+
+N_BINS = 400
+
+# Ionograms are merged into this number of time columns at most
+MAX_COLUMNS = 2000
+
+# Echoes are values above this part of the strongest one
+OCCUPANCY_THRESHOLD = 0.3
+
+
+def max_amplitude(data):
+    """Maximum amplitude over virtual height of each column."""
+    return np.max(np.abs(data), axis=0)
+
+
+def occupancy(data):
+    """Part of heights with echoes in each column."""
+    data = np.abs(data)
+    strongest = np.max(data)
+    if strongest <= 0:
+        return np.zeros(data.shape[1])
+    return np.mean(data > OCCUPANCY_THRESHOLD * strongest, axis=0)
+
+
+REDUCTIONS = {
+    "max": max_amplitude,
+    "occupancy": occupancy,
+}
+
+
+def reduce_ionogram(iono, frequencies, reduction="max"):
+    """Reduce an ionogram to values at frequencies (MHz), NaN out of its
+    frequency range."""
+    data = np.asarray(iono.get_data(), dtype=float)
+    values = REDUCTIONS[reduction](data)
+    left, right = iono.get_extent()[:2]
+    n_columns = data.shape[1]
+    coords = np.array([iono.freq_to_coord(f) for f in frequencies])
+    columns = np.floor((coords - left) / (right - left) * n_columns).astype(int)
+    valid = (columns >= 0) & (columns < n_columns)
+    profile = np.full(len(frequencies), np.nan, dtype=np.float32)
+    profile[valid] = values[columns[valid]]
+    return profile
+
+
+def summarize_file(file_name, frequencies, reduction="max"):
+    """Return (UT date, profile) of a file, the exception if it can not be
+    loaded. Runs in worker processes, only the profile is sent back."""
+    try:
+        iono = open_ionogram(file_name, strict=True)
+        profile = reduce_ionogram(iono, frequencies, reduction)
+        return iono.date - timedelta(hours=iono.timezone), profile
+    except Exception as e:
+        return e
+
+
+def list_files(path):
+    """Return ionograms of a directory or a container in time order."""
+    if os.path.isdir(path):
+        tester = IonogramTester()
+        return [f for f in sorted(glob(f"{path}/*.*")) if tester.examine(f)]
+    return list_members(path) or []
+
+
+def get_cache_name(file_name, reduction):
+    """Return the cache file of the day of an ionogram (or of a directory):
+    beside the container of members, hidden in the directory of files."""
+    container, member = split_member_path(file_name)
+    if member is not None:
+        return f"{container}.{reduction}.npz"
+    directory = file_name if os.path.isdir(file_name) else os.path.dirname(file_name)
+    return os.path.join(directory, f".summary_{reduction}.npz")
+
+
+def get_stamp(file_name):
+    # Members of containers and archives are not modified
+    if split_member_path(file_name)[1] is not None:
+        return (0, 0)
+    stat = os.stat(file_name)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_frequencies(file_name, n_bins=N_BINS):
+    """Return a frequency grid (MHz) over the range of an ionogram."""
+    iono = load_metadata(file_name)
+    left, right = iono.get_extent()[:2]
+    n_columns = iono.get_shape()[1]
+    f_min = iono.coord_to_freq(left)
+    f_max = iono.coord_to_freq(right - (right - left) / n_columns)
+    return np.linspace(f_min, f_max, n_bins)
+
+
+def get_extent(image, start, step, frequencies):
+    """Return the extent of a summary image (get_image) for imshow, time in
+    matplotlib dates."""
+    from matplotlib.dates import date2num
+
+    left = date2num(start - step / 2)
+    right = date2num(start + step * (image.shape[1] - 0.5))
+    return [left, right, frequencies[0], frequencies[-1]]
+
+
+class DaySummary:
+    """Frequency x time image of a day: an ionogram is reduced to one
+    column of values at fixed frequencies.
+
+    Files are decoded in a pool (at most two per worker at a time) and
+    only their columns are kept, so memory does not depend on the size of
+    ionograms. Columns are cached in an npz file and reused while files
+    are not modified. If the cache can not be written (e.g. on a read-only
+    mount), the summary goes on without it and cache_error is set.
+    """
+
+    # The cache is saved after this number of new columns
+    SAVE_INTERVAL = 50
+
+    def __init__(self, file_names, reduction="max", cache_name=None, frequencies=None):
+        self.file_names = list(file_names)
+        self.reduction = reduction
+        self.cache_name = cache_name
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.frequencies = frequencies
+        if self.frequencies is None and self.file_names:
+            self.frequencies = get_frequencies(self.file_names[0])
+        n_files = len(self.file_names)
+        self.profiles = np.full((n_files, len(self.frequencies)), np.nan, dtype=np.float32)
+        self.dates = [None] * n_files
+        self.stamps = [None] * n_files
+        self.done = np.zeros(n_files, dtype=bool)
+        self.errors = {}
+        self.cache_error = None
+        self.load_cache()
+
+    def load_cache(self):
+        if not self.cache_name or not os.path.exists(self.cache_name):
+            return
+        try:
+            with np.load(self.cache_name) as cache:
+                if str(cache["reduction"]) != self.reduction or not np.array_equal(
+                    cache["frequencies"], self.frequencies
+                ):
+                    return
+                cached = {
+                    name: (tuple(stamp), date, profile)
+                    for name, stamp, date, profile in zip(
+                        cache["names"], cache["stamps"], cache["dates"], cache["profiles"]
+                    )
+                }
+        except (OSError, KeyError, ValueError):
+            return
+        for i, file_name in enumerate(self.file_names):
+            name = os.path.basename(file_name)
+            if name not in cached:
+                continue
+            stamp, date, profile = cached[name]
+            try:
+                if stamp != get_stamp(file_name):
+                    continue
+            except OSError:
+                continue
+            self.profiles[i] = profile
+            self.dates[i] = datetime.fromisoformat(str(date))
+            self.stamps[i] = stamp
+            self.done[i] = True
+
+    def save(self):
+        if not self.cache_name:
+            return
+        with self.lock:
+            done = np.flatnonzero(self.done)
+            names = [os.path.basename(self.file_names[i]) for i in done]
+            stamps = np.array([self.stamps[i] for i in done], dtype=np.int64).reshape(-1, 2)
+            dates = [self.dates[i].isoformat() for i in done]
+            profiles = self.profiles[done]
+        try:
+            file, temp_name = create_temp_file(self.cache_name)
+            try:
+                with file:
+                    np.savez_compressed(
+                        file,
+                        reduction=self.reduction,
+                        frequencies=self.frequencies,
+                        names=np.array(names, dtype=str),
+                        stamps=stamps,
+                        dates=np.array(dates, dtype=str),
+                        profiles=profiles,
+                    )
+                os.replace(temp_name, self.cache_name)
+            except BaseException:
+                os.remove(temp_name)
+                raise
+        except OSError as e:
+            self.cache_error = e
+            self.cache_name = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self, workers=None, processes=True, callback=None, mp_context=None):
+        """Reduce files which are not cached yet; callback(index) is called
+        after each new column. Returns the number of new columns.
+
+        mp_context is the multiprocessing context of worker processes (e.g.
+        "spawn" in a program with threads)."""
+        workers = workers or os.cpu_count() or 1
+        if processes:
+            pool = partial(ProcessPoolExecutor, mp_context=mp_context)
+        else:
+            pool = ThreadPoolExecutor
+        indices = np.flatnonzero(~self.done).tolist()
+        function = partial(summarize_file, frequencies=self.frequencies, reduction=self.reduction)
+        n_new = 0
+        with pool(max_workers=workers) as executor:
+            try:
+                results = ordered_map(
+                    function, [self.file_names[i] for i in indices], executor, 2 * workers
+                )
+                for i, result in zip(indices, results):
+                    if self.cancelled.is_set():
+                        break
+                    if isinstance(result, Exception):
+                        self.errors[self.file_names[i]] = result
+                        continue
+                    try:
+                        stamp = get_stamp(self.file_names[i])
+                    except OSError as e:
+                        self.errors[self.file_names[i]] = e
+                        continue
+                    with self.lock:
+                        self.dates[i], self.profiles[i] = result
+                        self.stamps[i] = stamp
+                        self.done[i] = True
+                    n_new += 1
+                    if callback is not None:
+                        callback(i)
+                    if n_new % self.SAVE_INTERVAL == 0:
+                        self.save()
+            finally:
+                executor.shutdown(cancel_futures=True)
+        if n_new:
+            self.save()
+        return n_new
+
+    def get_image(self, max_columns=None):
+        """Return the image (frequency x time), the UT time of its first
+        column and the time step of columns, and the file index of each
+        column (-1 if there is no ionogram in it).
+
+        Columns are as long as the usual (median) interval between
+        ionograms, or longer to have at most max_columns of them; an
+        ionogram goes to the column nearest to its time and ionograms of
+        one column are merged (maximum). The time is None while no file
+        is reduced.
+        """
+        with self.lock:
+            done = np.flatnonzero(self.done)
+            dates = [self.dates[i] for i in done]
+            profiles = self.profiles[done]
+        if not dates:
+            return np.empty((len(self.frequencies), 0), dtype=np.float32), None, None, done
+        start = min(dates)
+        times = np.array([(date - start).total_seconds() for date in dates])
+        intervals = np.diff(np.sort(times))
+        intervals = intervals[intervals > 0]
+        step = float(np.median(intervals)) if len(intervals) else 60.0
+        if max_columns and max_columns > 1:
+            step = max(step, times.max() / (max_columns - 1))
+        columns = np.round(times / step).astype(int)
+        n_columns = columns.max() + 1
+        image = np.full((n_columns, len(self.frequencies)), np.nan, dtype=np.float32)
+        np.fmax.at(image, columns, profiles)
+        files = np.full(n_columns, -1)
+        used, first = np.unique(columns, return_index=True)
+        files[used] = done[first]
+        return image.T, start, timedelta(seconds=step), files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Make a frequency x time summary image of the ionograms of a day."
+    )
+    parser.add_argument("path", help="directory or container with ionograms of a day")
+    parser.add_argument("--reduction", choices=sorted(REDUCTIONS), default="max")
+    parser.add_argument("--png", help="save the image to a PNG file")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    files = list_files(args.path)
+    if not files:
+        print(f"{args.path}: no ionograms", file=sys.stderr)
+        return
+
+    cache_name = get_cache_name(files[0], args.reduction)
+    summary = DaySummary(files, args.reduction, cache_name)
+    n_cached = int(np.sum(summary.done))
+    n_new = summary.run(workers=args.jobs)
+    for file_name, error in summary.errors.items():
+        print(f"{file_name}: {error}", file=sys.stderr)
+    if summary.cache_error is not None:
+        print(f"Columns are not cached: {summary.cache_error}", file=sys.stderr)
+
+    if args.png:
+        from matplotlib import use as matplotlib_backend_use
+
+        matplotlib_backend_use("agg")
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
+
+        image, start, step, _ = summary.get_image(MAX_COLUMNS)
+        figure, ax = plt.subplots(figsize=(12, 6))
+        if start is not None:
+            ax.imshow(
+                image,
+                origin="lower",
+                aspect="auto",
+                interpolation="nearest",
+                extent=get_extent(image, start, step, summary.frequencies),
+            )
+            locator = mdates.AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.set_xlabel("Time, UT")
+        ax.set_ylabel("Frequency, MHz")
+        figure.tight_layout()
+        figure.savefig(args.png)
+
+    print(f"{len(files)} ionogram(s): {n_new} reduced, {n_cached} cached, {len(summary.errors)} error(s).")
+
+
+if __name__ == "__main__":
+    main()
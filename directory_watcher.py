@@ -0,0 +1,181 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of name
+
+
+def load_inotify():
+    """Return libc with inotify functions, None if there is no inotify."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    """Reports new files of a directory when they are completely written.
+
+    Changes come from inotify on Linux. Elsewhere the directory is polled
+    and listed again only when its modification time changes. A file is
+    ready when its size does not change for settle seconds after its last
+    change (closing after writing and moving into the directory count as
+    changes, as a writer may open the file again). callback(file_name) is
+    called in the watcher thread; hidden (e.g. temporary) files,
+    directories and other files which are not regular are ignored.
+    """
+
+    def __init__(self, directory, callback, interval=0.5, settle=2.0, inotify=True):
+        self.directory = directory
+        self.callback = callback
+        self.interval = interval
+        self.settle = settle
+        self.libc = load_inotify() if inotify else None
+        self.pending = {}  # name: (size, time of the last change)
+        self.known = set()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.fd = -1
+
+    def is_inotify(self):
+        return self.libc is not None
+
+    def start(self):
+        # The watch is added before the directory is listed, so files made
+        # meanwhile are not missed
+        self.fd = self.__add_watch()
+        self.known = set(self.__list())
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __list(self):
+        with os.scandir(self.directory) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
+    def __rescan(self):
+        for name in self.__list():
+            if name not in self.known and name not in self.pending:
+                self.__change(name)
+
+    def __add_watch(self):
+        """Return an inotify descriptor watching the directory, -1 if the
+        directory is to be polled."""
+        if self.libc is None:
+            return -1
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if fd < 0 or self.libc.inotify_add_watch(
+            fd, os.fsencode(self.directory), mask
+        ) < 0:
+            if fd >= 0:
+                os.close(fd)
+            return -1
+        return fd
+
+    def __run(self):
+        fd, self.fd = self.fd, -1
+        try:
+            if fd >= 0:
+                self.__watch(fd)
+            else:
+                self.__poll()
+        finally:
+            if fd >= 0:
+                os.close(fd)
+
+    def __watch(self, fd):
+        while not self.stopped.is_set():
+            readable, _, _ = select.select([fd], [], [], self.interval)
+            if readable:
+                try:
+                    buffer = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    buffer = b""
+                offset = 0
+                while offset < len(buffer):
+                    _, mask, _, length = EVENT.unpack_from(buffer, offset)
+                    offset += EVENT.size
+                    name = buffer[offset : offset + length].rstrip(b"\0")
+                    offset += length
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost, new files are found by listing
+                        self.__rescan()
+                    elif not mask & IN_ISDIR:
+                        self.__change(os.fsdecode(name))
+            self.__check_pending()
+
+    def __poll(self):
+        # The directory is listed at once for files made after start()
+        mtime = None
+        while not self.stopped.wait(self.interval):
+            try:
+                new_mtime = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                continue
+            if new_mtime != mtime:
+                mtime = new_mtime
+                self.__rescan()
+            self.__check_pending()
+
+    def __change(self, name):
+        if name.startswith(".") or name in self.known:
+            return
+        size = self.pending.get(name, (-1, 0))[0]
+        self.pending[name] = (size, time.monotonic())
+
+    def __is_file(self, name):
+        try:
+            return stat.S_ISREG(os.stat(os.path.join(self.directory, name)).st_mode)
+        except OSError:
+            return False
+
+    def __check_pending(self):
+        now = time.monotonic()
+        for name, (size, changed) in list(self.pending.items()):
+            try:
+                info = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                del self.pending[name]
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                del self.pending[name]
+                continue
+            new_size = info.st_size
+            if new_size != size:
+                self.pending[name] = (new_size, now)
+            elif now - changed >= self.settle:
+                self.__ready(name)
+
+    def __ready(self, name):
+        self.pending.pop(name, None)
+        if name.startswith(".") or name in self.known or not self.__is_file(name):
+            return
+        self.known.add(name)
+        self.callback(os.path.join(self.directory, name))
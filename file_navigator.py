@@ -1,29 +1,99 @@
 import os
+from bisect import insort
 from glob import glob
 from ionogram_tester import IonogramTester
+from ionogram_input import split_member_path, join_member_path, is_archive, get_archive
+from ionogram_container import is_container, open_container
+
+
+def list_members(file_name):
+    """Return paths of ionograms in a container (in time order) or in an
+    archive, None for other files."""
+    if is_container(file_name):
+        names = open_container(file_name).get_names()
+    elif is_archive(file_name):
+        tester = IonogramTester()
+        names = [
+            name
+            for name in get_archive(file_name).get_names()
+            if tester.examine(join_member_path(file_name, name))
+        ]
+    else:
+        return None
+    return [join_member_path(file_name, name) for name in names]
 
 
 class FileNavigator:
 
     def __init__(self, file_name: str):
         self.file_name = file_name
-        self.directory = os.path.dirname(file_name)
-        full_file_list = glob(f"{self.directory}/*.*")
-        tester = IonogramTester()
-        self.file_list = [file for file in full_file_list if tester.examine(file)]
+        container, member = split_member_path(file_name)
+        if member is not None:
+            self.directory = container
+            self.file_list = list_members(container)
+        else:
+            self.directory = os.path.dirname(file_name)
+            full_file_list = sorted(glob(f"{self.directory}/*.*"))
+            tester = IonogramTester()
+            self.file_list = [file for file in full_file_list if tester.examine(file)]
 
-    def next(self):
-        index = [os.path.basename(file) for file in self.file_list].index(
+    def add_file(self, file_name):
+        """Add a new file of the directory (e.g. just downloaded) to the list.
+
+        Returns True if it is added.
+        """
+        container, member = split_member_path(file_name)
+        if member is not None:
+            # A new member of the container being browsed
+            directory = container
+            new_file = join_member_path(self.directory, member)
+        else:
+            directory = os.path.dirname(file_name)
+            new_file = os.path.join(self.directory, os.path.basename(file_name))
+        if (split_member_path(self.file_name)[1] is None) != (member is None):
+            return False
+        if os.path.abspath(directory) != os.path.abspath(self.directory):
+            return False
+        name = os.path.basename(new_file)
+        if name in (os.path.basename(file) for file in self.file_list):
+            return False
+        if member is None and not IonogramTester().examine(file_name):
+            return False
+        insort(self.file_list, new_file)
+        return True
+
+    def select(self, file_name):
+        """Make a listed file current without listing the directory again.
+
+        Returns False if the file is not in the list.
+        """
+        container, member = split_member_path(file_name)
+        directory = container if member is not None else os.path.dirname(file_name)
+        if (split_member_path(self.file_name)[1] is None) != (member is None):
+            return False
+        if os.path.abspath(directory) != os.path.abspath(self.directory):
+            return False
+        name = os.path.basename(file_name)
+        for file in self.file_list:
+            if os.path.basename(file) == name:
+                self.file_name = file
+                return True
+        return False
+
+    def index(self):
+        """Return position of the current file in the list."""
+        return [os.path.basename(file) for file in self.file_list].index(
             os.path.basename(self.file_name)
         )
+
+    def next(self):
+        index = self.index()
         if index + 1 < len(self.file_list):
             self.file_name = self.file_list[index + 1]
         return self.file_name
 
     def previous(self):
-        index = [os.path.basename(file) for file in self.file_list].index(
-            os.path.basename(self.file_name)
-        )
+        index = self.index()
         if index > 0:
             self.file_name = self.file_list[index - 1]
         return self.file_name
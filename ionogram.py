@@ -1,6 +1,8 @@
 from datetime import timedelta
+import numpy as np
 from sunspot_loader import Sunspots
 from colormaps import cmap_one_comp
+from ionogram_statistics import IonogramStatistics
 
 
 class Ionogram:
@@ -8,6 +10,8 @@ class Ionogram:
     def __init__(self, debug_level=0):
         self.data = None
         self.date = None
+        # Cleared by loaders which substitute a date they can not read
+        self.date_recognized = True
         self.timezone = 0
         self.station_name = ""
         self.ionosonde_model = ""
@@ -19,10 +23,60 @@ class Ionogram:
         self.debug_level = debug_level
         self.cmap = cmap_one_comp
         self.ox_mode = False
+        self.statistics = None
+        self.components = {}
+        self.shape = None
+
+    def load_metadata(self, file_name):
+        """Read date, station, extent and shape without decoding the data.
+
+        Loaders override it; by default the whole file is decoded.
+        """
+        self.load(file_name)
+        self.shape = self.get_shape()
+        self.data = None
 
     def get_data(self):
         return self.data
 
+    def get_shape(self):
+        """Return (number of heights, number of frequencies)."""
+        if self.data is not None:
+            return np.shape(self.data)
+        return self.shape
+
+    def get_statistics(self):
+        if self.statistics is None:
+            self.statistics = IonogramStatistics(self.data)
+        return self.statistics
+
+    def get_component_data(self, show_o=True, show_x=True):
+        """Return data with only the selected traces (O > 0, X < 0) kept."""
+        if show_o and show_x:
+            return self.data
+        key = (show_o, show_x)
+        if key not in self.components:
+            data = np.asarray(self.data)
+            if show_o:
+                self.components[key] = np.maximum(data, 0)
+            elif show_x:
+                self.components[key] = np.minimum(data, 0)
+            else:
+                self.components[key] = np.zeros_like(data)
+        return self.components[key]
+
+    def invalidate_cache(self):
+        self.statistics = None
+        self.components = {}
+
+    def get_attributes(self):
+        """Return attributes set by the loader, without data and caches."""
+        return {
+            k: v
+            for k, v in self.__dict__.items()
+            if k not in ("data", "statistics", "components", "shape")
+        }
+
     def freq_to_coord(self, freq):
         return float(freq)
 
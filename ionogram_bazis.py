@@ -1,7 +1,8 @@
+import io
 import numpy as np
 from datetime import datetime
-from os import path
 from ionogram import Ionogram
+from ionogram_input import open_input, get_size
 
 
 class IonogramBazis(Ionogram):
@@ -9,25 +10,17 @@ class IonogramBazis(Ionogram):
     def __init__(self):
         super().__init__()
 
+    HEADER_SIZE = 21
+
     def load(self, file_name):
-        with open(file_name, "rb") as file:
-            header_size = 21
-            date = file.read(header_size)[1:-1].decode("utf-8")
-            self.date = datetime.strptime(date, "%d-%m-%Y %H:%M:%S")
-
-            self.start_freq = 1.0
-            self.n_rang = 250
-            file_size = path.getsize(file_name)
-            if file_size == 1200021:
-                self.n_freq = 300
-            elif file_size == 1600021:
-                self.n_freq = 400
-            else:
+        with open_input(file_name, "rb") as file:
+            header = file.read(self.HEADER_SIZE)
+            buf = file.read()
+            if not self._read_header(header, self.HEADER_SIZE + len(buf)):
                 return
 
             self.data = [[0 for x in range(self.n_freq)] for y in range(self.n_rang)]
 
-            buf = file.read(file_size - header_size)
             offset = 0
 
             for f in range(self.n_freq):
@@ -59,6 +52,35 @@ class IonogramBazis(Ionogram):
             if self.date:
                 self.load_sunspot()
 
+    def load_metadata(self, file_name):
+        # Size of the data; bz2, xz and lzma files are decompressed to the
+        # end for it
+        file_size = get_size(file_name)
+        with open_input(file_name, "rb") as file:
+            header = file.read(self.HEADER_SIZE)
+            if file_size is None:
+                file_size = file.seek(0, io.SEEK_END)
+            if not self._read_header(header, file_size):
+                return
+        self.station_name = "Bazis (IION)"
+        self.shape = (self.n_rang, self.n_freq)
+        if self.date:
+            self.load_sunspot()
+
+    def _read_header(self, header, file_size):
+        date = header[1:-1].decode("utf-8")
+        self.date = datetime.strptime(date, "%d-%m-%Y %H:%M:%S")
+
+        self.start_freq = 1.0
+        self.n_rang = 250
+        if file_size == 1200021:
+            self.n_freq = 300
+        elif file_size == 1600021:
+            self.n_freq = 400
+        else:
+            return False
+        return True
+
     def get_altitude(self, h):
         # TODO check start and step values
         return 3 + h * 3
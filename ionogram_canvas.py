@@ -0,0 +1,278 @@
+from math import floor, log10
+import numpy as np
+from PySide6.QtCore import Qt, QRectF, QPointF, Signal
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPen
+from PySide6.QtWidgets import QWidget
+
+
+class CanvasEvent:
+    """Mouse event with the same attributes as matplotlib's MouseEvent.
+
+    Pixel coordinates (x, y) are counted from the bottom left corner of the
+    widget like in matplotlib, so the handlers of MainWindow work with both
+    canvases.
+    """
+
+    def __init__(self, x, y, xdata, ydata, button=None, step=0):
+        self.x = x
+        self.y = y
+        self.xdata = xdata
+        self.ydata = ydata
+        self.button = button
+        self.step = step
+
+
+class CanvasTransform:
+    """Affine data-to-pixel transform (y axis goes up)."""
+
+    def __init__(self, xlim, ylim, left, bottom, width, height):
+        sx = width / (xlim[1] - xlim[0])
+        sy = height / (ylim[1] - ylim[0])
+        self.matrix = np.array(
+            [
+                [sx, 0, left - xlim[0] * sx],
+                [0, sy, bottom - ylim[0] * sy],
+                [0, 0, 1],
+            ]
+        )
+
+    def get_matrix(self):
+        return self.matrix
+
+    def transform(self, points):
+        points = np.asarray(points, dtype=float)
+        return points @ self.matrix[:2, :2].T + self.matrix[:2, 2]
+
+    def inverted(self, x, y):
+        sx, sy = self.matrix[0, 0], self.matrix[1, 1]
+        return (x - self.matrix[0, 2]) / sx, (y - self.matrix[1, 2]) / sy
+
+
+class IonogramCanvas(QWidget):
+    """Ionogram view painted directly with QPainter.
+
+    The image is a QImage over an RGBA buffer produced by LutRenderer; axes,
+    trace points and critical frequency lines are painted on top of it.
+    """
+
+    button_press_event = Signal(object)
+    button_release_event = Signal(object)
+    motion_notify_event = Signal(object)
+    scroll_event = Signal(object)
+    resize_event = Signal(object)
+
+    BUTTONS = {
+        Qt.MouseButton.LeftButton: 1,
+        Qt.MouseButton.MiddleButton: 2,
+        Qt.MouseButton.RightButton: 3,
+    }
+
+    def __init__(self, font_size=16):
+        super().__init__()
+        self.setMouseTracking(True)
+        self.label_font = QFont()
+        self.label_font.setPixelSize(int(font_size))
+        self.clear()
+
+    def mpl_connect(self, name, callback):
+        getattr(self, name).connect(callback)
+
+    def draw(self):
+        self.update()
+
+    def draw_idle(self):
+        self.update()
+
+    def clear(self):
+        self.buffer = None
+        self.image = None
+        self.image_extent = None
+        self.xlim = (0, 1)
+        self.ylim = (0, 1)
+        self.freq_tics = []
+        self.freq_labels = []
+        self.points = {}
+        self.lines = {}
+        self.rubber_band = None
+        self.update()
+
+    def set_image(self, rgba, extent):
+        self.buffer = np.ascontiguousarray(rgba)
+        rows, cols = self.buffer.shape[:2]
+        self.image = QImage(
+            self.buffer.data, cols, rows, cols * 4, QImage.Format.Format_RGBA8888
+        )
+        self.image_extent = extent
+        self.update()
+
+    def set_freq_ticks(self, tics, labels):
+        self.freq_tics = list(tics)
+        self.freq_labels = [str(x) for x in labels]
+        self.update()
+
+    def set_view(self, xlim, ylim):
+        self.xlim = tuple(xlim)
+        self.ylim = tuple(ylim)
+        self.update()
+
+    def get_xlim(self):
+        return self.xlim
+
+    def get_ylim(self):
+        return self.ylim
+
+    def set_points(self, layer, xs, ys, color):
+        self.points[layer] = (np.array(xs, dtype=float), np.array(ys, dtype=float), color)
+        self.update()
+
+    def move_point(self, layer, row, x, y):
+        xs, ys, _ = self.points[layer]
+        xs[row] = x
+        ys[row] = y
+        self.update()
+
+    def set_line(self, layer, x, color):
+        if x is None:
+            self.lines.pop(layer, None)
+        else:
+            self.lines[layer] = (x, color)
+        self.update()
+
+    def set_rubber_band(self, rectangle):
+        self.rubber_band = rectangle
+        self.update()
+
+    def get_plot_rect(self):
+        metrics = QFontMetrics(self.label_font)
+        left = metrics.horizontalAdvance("0000") + 12
+        bottom = metrics.height() + 12
+        return QRectF(left, 8, self.width() - left - 12, self.height() - bottom - 8)
+
+    def get_view_size(self):
+        rect = self.get_plot_rect()
+        return rect.width(), rect.height()
+
+    def get_transform(self):
+        rect = self.get_plot_rect()
+        return CanvasTransform(
+            self.xlim,
+            self.ylim,
+            rect.left(),
+            self.height() - rect.bottom(),
+            rect.width(),
+            rect.height(),
+        )
+
+    def to_widget(self, transform, x, y):
+        px, py = transform.transform((x, y))
+        return QPointF(px, self.height() - py)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        if self.image is None:
+            return
+
+        rect = self.get_plot_rect()
+        transform = self.get_transform()
+
+        painter.save()
+        painter.setClipRect(rect)
+        left, right, bottom, top = self.image_extent
+        target = QRectF(
+            self.to_widget(transform, left, top), self.to_widget(transform, right, bottom)
+        )
+        painter.drawImage(target, self.image)
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for x, color in self.lines.values():
+            painter.setPen(QPen(QColor(color), 1.5))
+            painter.drawLine(
+                self.to_widget(transform, x, self.ylim[0]),
+                self.to_widget(transform, x, self.ylim[1]),
+            )
+
+        for xs, ys, color in self.points.values():
+            if not len(xs):
+                continue
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(color))
+            pixels = transform.transform(np.column_stack((xs, ys)))
+            for px, py in pixels:
+                painter.drawEllipse(QPointF(px, self.height() - py), 4, 4)
+
+        if self.rubber_band is not None:
+            x0, y0, x1, y1 = self.rubber_band
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(QPen(Qt.GlobalColor.black, 1, Qt.PenStyle.DashLine))
+            painter.drawRect(
+                QRectF(self.to_widget(transform, x0, y0), self.to_widget(transform, x1, y1))
+            )
+        painter.restore()
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(QPen(Qt.GlobalColor.black, 1))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRect(rect)
+        painter.setFont(self.label_font)
+        metrics = QFontMetrics(self.label_font)
+
+        x0, x1 = sorted(self.xlim)
+        for tic, label in zip(self.freq_tics, self.freq_labels):
+            if x0 <= tic <= x1:
+                point = self.to_widget(transform, tic, self.ylim[0])
+                painter.drawLine(point, point + QPointF(0, 5))
+                width = metrics.horizontalAdvance(label)
+                painter.drawText(
+                    point + QPointF(-width / 2, 6 + metrics.ascent()), label
+                )
+
+        for tic in self.get_height_tics():
+            point = self.to_widget(transform, self.xlim[0], tic)
+            painter.drawLine(point, point - QPointF(5, 0))
+            label = f"{tic:g}"
+            width = metrics.horizontalAdvance(label)
+            painter.drawText(
+                point + QPointF(-width - 8, metrics.ascent() / 2 - 1), label
+            )
+
+    def get_height_tics(self):
+        y0, y1 = sorted(self.ylim)
+        if y1 <= y0:
+            return []
+        raw_step = (y1 - y0) / 6
+        magnitude = 10 ** floor(log10(raw_step))
+        step = min(
+            (m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step),
+            default=10 * magnitude,
+        )
+        first = np.ceil(y0 / step) * step
+        return list(np.arange(first, y1 + step / 2, step))
+
+    def make_event(self, position, button=None, step=0):
+        x = position.x()
+        y = self.height() - position.y()
+        xdata = ydata = None
+        if self.image is not None and self.get_plot_rect().contains(position):
+            xdata, ydata = self.get_transform().inverted(x, y)
+        return CanvasEvent(x, y, xdata, ydata, button, step)
+
+    def mousePressEvent(self, event):
+        button = self.BUTTONS.get(event.button())
+        self.button_press_event.emit(self.make_event(event.position(), button))
+
+    def mouseReleaseEvent(self, event):
+        button = self.BUTTONS.get(event.button())
+        self.button_release_event.emit(self.make_event(event.position(), button))
+
+    def mouseMoveEvent(self, event):
+        self.motion_notify_event.emit(self.make_event(event.position()))
+
+    def wheelEvent(self, event):
+        step = event.angleDelta().y() / 120
+        button = "up" if step > 0 else "down"
+        self.scroll_event.emit(self.make_event(event.position(), button, step))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resize_event.emit(event)
@@ -0,0 +1,393 @@
+import argparse
+import json
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+import zlib
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+import numpy as np
+import ionogram_tester
+
+
+def is_container(file_name):
+    return file_name.lower().endswith(".ivc")
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} can not be stored in a container")
+
+
+def decode_value(value):
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__ndarray__" in value:
+        return np.array(value["__ndarray__"], dtype=value["dtype"])
+    return value
+
+
+class IonogramContainer:
+    """One file with many ionograms (e.g. a station-day).
+
+    The file has a header with the offset of the index, data chunks and the
+    JSON index at the end. Each chunk is float32 or uint8 (scaled) array,
+    zlib compressed or raw; raw chunks are read through mmap without copy.
+    The index holds loader class, attributes and traces of each ionogram.
+
+    New chunks and indexes are written after the current index, and the
+    header is updated last, so a container interrupted while members are
+    appended still opens with the members of its last index. Indexes left
+    behind are removed by rewriting the file when they take more than half
+    the space of the data.
+    """
+
+    MAGIC = b"IVC1"
+    HEADER = struct.Struct("<4sIQ")
+    VERSION = 1
+    ALIGNMENT = 64
+    # Old indexes are removed when they take more than half of the data and
+    # this
+    COMPACT_SIZE = 1 << 20
+
+    def __init__(self, file_name, mode="r"):
+        self.file_name = file_name
+        self.mode = mode
+        self.frames = {}
+        # JSON of each frame, so the index is not encoded again on flush
+        self.encoded = {}
+        self.mmap = None
+        self.changed = False
+        self.index_size = 0
+        # Bytes of old indexes and replaced chunks
+        self.garbage = 0
+
+        if mode == "w" or (mode == "a" and not os.path.exists(file_name)):
+            self.file = open(file_name, "w+b")
+            self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0))
+            self.end = self.HEADER.size
+            # An empty index, so the file is a container from the start
+            self.changed = True
+            self.flush()
+        elif mode in ("r", "a"):
+            self.file = open(file_name, "rb" if mode == "r" else "r+b")
+            self.__read_index()
+            if mode == "r":
+                # The mapping has its own descriptor, so the file is closed
+                # and a container replaced in the cache (open_container) is
+                # released with the last array of its raw chunks
+                self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.file.close()
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+
+        self.__update_time_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __read_index(self):
+        header = self.file.read(self.HEADER.size)
+        if len(header) < self.HEADER.size:
+            raise ValueError(f"{self.file_name}: not an ionogram container")
+        magic, version, index_offset = self.HEADER.unpack(header)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.file_name}: not an ionogram container")
+        if version > self.VERSION:
+            raise ValueError(f"{self.file_name}: unsupported version {version}")
+        self.file.seek(index_offset)
+        # The index is ASCII; chunks of an interrupted append may follow it
+        text = self.file.read().decode("latin-1")
+        try:
+            index, length = json.JSONDecoder(object_hook=decode_value).raw_decode(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{self.file_name}: damaged index") from e
+        self.frames = {frame["name"]: frame for frame in index["frames"]}
+        self.end = index_offset + length
+        self.index_size = length
+        data_size = sum(frame["size"] for frame in self.frames.values())
+        self.garbage = max(index_offset - self.HEADER.size - data_size, 0)
+
+    def __update_time_index(self):
+        frames = sorted(self.frames.values(), key=lambda f: (f["date"], f["name"]))
+        self.names = [frame["name"] for frame in frames]
+        self.dates = [frame["date"] for frame in frames]
+
+    def close(self):
+        if self.mode != "r" and not self.file.closed:
+            self.flush()
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # Arrays of raw chunks still use the mapping, it is released
+                # with them
+                pass
+        self.file.close()
+
+    @staticmethod
+    def join_index(encoded):
+        return ('{"frames": [' + ", ".join(encoded) + "]}").encode("ascii")
+
+    def get_index(self):
+        for name, frame in self.frames.items():
+            if name not in self.encoded:
+                self.encoded[name] = json.dumps(frame, default=encode_value)
+        return self.join_index(self.encoded[name] for name in self.frames)
+
+    def flush(self):
+        """Write the index, so added members can be read while the container
+        is still open for writing.
+
+        The index goes after the data and the header points to it only when
+        it is written, the previous index stays valid until then.
+        """
+        if not self.changed:
+            return
+        data_size = sum(frame["size"] for frame in self.frames.values())
+        if self.garbage > max(data_size // 2, self.COMPACT_SIZE) and self.compact():
+            return
+        index = self.get_index()
+        offset = self.end
+        self.file.seek(offset)
+        self.file.write(index)
+        self.file.truncate()
+        self.file.flush()
+        self.file.seek(0)
+        self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION, offset))
+        self.file.flush()
+        self.garbage += self.index_size
+        self.index_size = len(index)
+        self.end = offset + len(index)
+        self.changed = False
+
+    def compact(self):
+        """Rewrite the container without old indexes to a new file which
+        replaces it. Returns False if it can not be replaced (e.g. the file
+        is open in another program on Windows)."""
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        fd, temp_name = tempfile.mkstemp(suffix=".part", prefix=".", dir=directory)
+        frames = {}
+        try:
+            os.fchmod(fd, stat.S_IMODE(os.fstat(self.file.fileno()).st_mode))
+        except (AttributeError, OSError):
+            pass
+        with os.fdopen(fd, "w+b") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0))
+            end = self.HEADER.size
+            for name, frame in self.frames.items():
+                self.file.seek(frame["offset"])
+                chunk = self.file.read(frame["size"])
+                offset = -end % self.ALIGNMENT + end
+                file.write(bytes(offset - end))
+                file.write(chunk)
+                end = offset + len(chunk)
+                frames[name] = {**frame, "offset": offset}
+            encoded = {
+                name: json.dumps(frame, default=encode_value) for name, frame in frames.items()
+            }
+            index = self.join_index(encoded.values())
+            file.write(index)
+            file.seek(0)
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, end))
+        self.file.close()
+        try:
+            os.replace(temp_name, self.file_name)
+        except OSError:
+            os.remove(temp_name)
+            return False
+        finally:
+            self.file = open(self.file_name, "r+b")
+        self.frames = frames
+        self.encoded = encoded
+        self.end = end + len(index)
+        self.index_size = len(index)
+        self.garbage = 0
+        self.changed = False
+        return True
+
+    @staticmethod
+    def pack(iono, dtype="float32", compress=True):
+        """Return the data chunk of an ionogram and its fields of the index.
+
+        It does not use the container, so ionograms may be packed in several
+        threads and added one by one.
+        """
+        data = np.asarray(iono.get_data(), dtype=float)
+        scale, zero = 1.0, 0.0
+        if dtype == "uint8":
+            zero = float(np.min(data))
+            scale = float(np.max(data) - zero) / 255 or 1.0
+            chunk = np.rint((data - zero) / scale).astype(np.uint8).tobytes()
+        elif dtype == "float32":
+            chunk = data.astype("<f4").tobytes()
+        else:
+            raise ValueError(f"Unsupported data type: {dtype}")
+        if compress:
+            chunk = zlib.compress(chunk)
+
+        return chunk, {
+            "compression": "zlib" if compress else None,
+            "dtype": dtype,
+            "shape": list(data.shape),
+            "scale": scale,
+            "zero": zero,
+        }
+
+    def add(
+        self, name, iono, json_data=None, dtype="float32", compress=True, packed=None
+    ):
+        """Add an ionogram (replaces a member with the same name).
+
+        json_data is the content of the ionogram's JSON file with traces,
+        packed is the result of pack() if it is already called.
+        """
+        if self.mode == "r":
+            raise ValueError("Container is opened for reading")
+
+        chunk, fields = packed or self.pack(iono, dtype, compress)
+
+        offset = -self.end % self.ALIGNMENT + self.end
+        self.file.seek(self.end)
+        self.file.write(bytes(offset - self.end))
+        self.file.write(chunk)
+        self.end = offset + len(chunk)
+        self.changed = True
+        if name in self.frames:
+            self.garbage += self.frames[name]["size"]
+
+        self.frames[name] = {
+            "name": name,
+            "class_name": type(iono).__name__,
+            "date": iono.date,
+            "offset": offset,
+            "size": len(chunk),
+            **fields,
+            "attributes": iono.get_attributes(),
+            "json_data": json_data,
+        }
+        self.encoded.pop(name, None)
+        self.__update_time_index()
+
+    def get_names(self):
+        """Return member names ordered by date."""
+        return list(self.names)
+
+    def get_names_between(self, start, end):
+        return self.names[bisect_left(self.dates, start) : bisect_right(self.dates, end)]
+
+    def find(self, date):
+        """Return name of the last member at or before date (the first one if
+        all are later), None if the container is empty."""
+        if not self.names:
+            return None
+        return self.names[max(bisect_right(self.dates, date) - 1, 0)]
+
+    def get_frame(self, name):
+        if name not in self.frames:
+            raise ValueError(f"{self.file_name}: no member {name}")
+        return self.frames[name]
+
+    def get_data(self, name):
+        frame = self.get_frame(name)
+        offset, size = frame["offset"], frame["size"]
+        dtype = np.dtype("<f4" if frame["dtype"] == "float32" else np.uint8)
+        count = int(np.prod(frame["shape"]))
+
+        if frame["compression"] is None and self.mmap is not None:
+            data = np.frombuffer(self.mmap, dtype, count, offset)
+        else:
+            if self.mmap is not None:
+                chunk = self.mmap[offset : offset + size]
+            else:
+                self.file.seek(offset)
+                chunk = self.file.read(size)
+            if frame["compression"] == "zlib":
+                chunk = zlib.decompress(chunk)
+            data = np.frombuffer(chunk, dtype, count)
+        data = data.reshape(frame["shape"])
+
+        if frame["dtype"] == "uint8":
+            data = data * np.float32(frame["scale"]) + np.float32(frame["zero"])
+        return data
+
+    def load_metadata(self, name):
+        """Return the ionogram of a member without data."""
+        frame = self.get_frame(name)
+        iono = getattr(ionogram_tester, frame["class_name"])()
+        iono.__dict__.update(frame["attributes"])
+        iono.shape = tuple(frame["shape"])
+        return iono
+
+    def load(self, name):
+        iono = self.load_metadata(name)
+        iono.data = self.get_data(name)
+        return iono
+
+    def get_json_data(self, name):
+        """Return stored content of the JSON file of a member (or None)."""
+        return self.get_frame(name)["json_data"]
+
+
+containers = {}
+
+
+def open_container(file_name):
+    """Return a container opened for reading, cached while the file is not
+    modified."""
+    stat = os.stat(file_name)
+    key = os.path.abspath(file_name)
+    cached = containers.get(key)
+    if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+        # The replaced container is not closed, other threads may still read
+        # it; it holds only its mapping, which is freed with its arrays
+        containers[key] = ((stat.st_mtime_ns, stat.st_size), IonogramContainer(file_name))
+    return containers[key][1]
+
+
+def main():
+    from ionogram_io import iter_ionograms, read_json_data
+
+    parser = argparse.ArgumentParser(
+        description="Pack ionograms (with their JSON/STD files) into a container."
+    )
+    parser.add_argument("container", help="container file (.ivc)")
+    parser.add_argument("files", nargs="+", help="ionogram files")
+    parser.add_argument("-a", "--append", action="store_true", help="append to the container")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker threads")
+    parser.add_argument("--uint8", action="store_true", help="store data as 8-bit values")
+    parser.add_argument("--raw", action="store_true", help="do not compress data (memory-mapped reads)")
+    args = parser.parse_args()
+
+    n_errors = 0
+    with IonogramContainer(args.container, "a" if args.append else "w") as container:
+        for file_name, iono in iter_ionograms(args.files, workers=args.jobs):
+            if isinstance(iono, Exception):
+                n_errors += 1
+                print(f"{file_name}: {iono}", file=sys.stderr)
+                continue
+            container.add(
+                os.path.basename(file_name),
+                iono,
+                read_json_data(file_name),
+                dtype="uint8" if args.uint8 else "float32",
+                compress=not args.raw,
+            )
+        n_frames = len(container.get_names())
+
+    print(f"{n_frames} ionogram(s) in {args.container}, {n_errors} error(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from datetime import datetime
 from math import sin
 from ionogram import Ionogram
+from ionogram_input import open_input
 from colormaps import cmap_two_comp
 
 
@@ -13,24 +14,10 @@ class IonogramDpsAmp(Ionogram):
 
     def load(self, file_name):
 
-        with open(file_name, "r", encoding="ascii") as file:
+        with open_input(file_name, "r", encoding="ascii") as file:
             lines = [line[:-1] for line in file.readlines()]
 
-        self.date = datetime.strptime(lines[0], "%Y.%m.%d (%j) %H:%M:%S.%f")
-
-        ursi_code = None
-        for line in lines[1:4]:
-            if line.startswith("Station name"):
-                self.station_name = line.split(":")[-1].strip()
-            elif line.startswith("URSI code"):
-                ursi_code = line.split(":")[-1].strip()
-            elif line.startswith("Ionosonde model"):
-                self.ionosonde_model = line.split(":")[-1].strip()
-
-        if ursi_code:
-            self.station_name = f"{self.station_name} ({ursi_code})"
-
-        columns = [line.strip() for line in lines[4].split()]
+        columns = self._read_header(lines[:5])
 
         data = {x: [] for x in columns}
         for line in lines[5:]:
@@ -60,6 +47,53 @@ class IonogramDpsAmp(Ionogram):
 
         self.load_sunspot()
 
+    def load_metadata(self, file_name):
+        """Read the header and only Freq and Range columns of the data.
+
+        The grid is not in the header, so all lines are read; only their
+        first columns are split.
+        """
+        with open_input(file_name, "rb") as file:
+            columns = self._read_header(
+                [file.readline().decode("ascii")[:-1] for _ in range(5)]
+            )
+            i_freq = columns.index("Freq")
+            i_rang = columns.index("Range")
+            n_split = max(i_freq, i_rang) + 1
+            frequencies = set()
+            ranges = set()
+            for line in file.read().split(b"\n"):
+                values = line.split(None, n_split)
+                if len(values) >= n_split:
+                    frequencies.add(values[i_freq])
+                    ranges.add(values[i_rang])
+
+        self.frequencies = sorted([float(x) for x in frequencies])
+        self.ranges = sorted([float(x) for x in ranges])
+        self.n_freq = len(self.frequencies)
+        self.n_rang = len(self.ranges)
+        self.shape = (self.n_rang, self.n_freq)
+
+        self.load_sunspot()
+
+    def _read_header(self, lines):
+        """Read date and station from the first lines, return the column names."""
+        self.date = datetime.strptime(lines[0], "%Y.%m.%d (%j) %H:%M:%S.%f")
+
+        ursi_code = None
+        for line in lines[1:4]:
+            if line.startswith("Station name"):
+                self.station_name = line.split(":")[-1].strip()
+            elif line.startswith("URSI code"):
+                ursi_code = line.split(":")[-1].strip()
+            elif line.startswith("Ionosonde model"):
+                self.ionosonde_model = line.split(":")[-1].strip()
+
+        if ursi_code:
+            self.station_name = f"{self.station_name} ({ursi_code})"
+
+        return [line.strip() for line in lines[4].split()]
+
     def get_extent(self):
         left = self.frequencies[0]
         right = self.frequencies[-1]
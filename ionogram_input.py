@@ -0,0 +1,245 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import secrets
+import tarfile
+import threading
+import zipfile
+
+MEMBER_SEPARATOR = "!/"
+
+# Read buffer of files and of decompressed data
+BUFFER_SIZE = 1 << 16
+
+# Magic bytes of compressed files (the "alone" lzma header has no magic,
+# its usual properties byte and dictionary size are checked)
+COMPRESSIONS = (
+    ("gzip", b"\x1f\x8b\x08"),
+    ("bz2", b"BZh"),
+    ("xz", b"\xfd7zXZ\x00"),
+    ("lzma", b"\x5d\x00\x00"),
+)
+
+COMPRESSION_EXTENSIONS = (".gz", ".bz2", ".xz", ".lzma")
+
+ARCHIVE_EXTENSIONS = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+
+
+def create_temp_file(file_name, mode="wb", encoding=None):
+    """Open a new hidden file beside file_name to write it and then rename
+    it to file_name with os.replace. Returns the file and its name.
+
+    Unlike tempfile.mkstemp (owner only), the file gets the permissions of
+    the umask as files made with open().
+    """
+    directory, name = os.path.split(file_name)
+    while True:
+        temp_name = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.part")
+        try:
+            return open(temp_name, mode.replace("w", "x"), encoding=encoding), temp_name
+        except FileExistsError:
+            continue
+
+
+def split_member_path(file_name):
+    """Split "archive!/member" into (archive, member); member is None for
+    ordinary files."""
+    if MEMBER_SEPARATOR in file_name:
+        archive, member = file_name.split(MEMBER_SEPARATOR, 1)
+        return archive, member
+    return file_name, None
+
+
+def join_member_path(archive, member):
+    return f"{archive}{MEMBER_SEPARATOR}{member}"
+
+
+def get_sidecar_name(file_name, extension):
+    """Return name of a JSON/STD/PNG file of an ionogram.
+
+    Files of archive and container members are placed beside the archive
+    with the name of the member, like the files of the unpacked ionogram.
+    """
+    archive, member = split_member_path(file_name)
+    if member is None:
+        return f"{file_name}.{extension}"
+    return os.path.join(
+        os.path.dirname(archive), f"{os.path.basename(member)}.{extension}"
+    )
+
+
+def is_archive(file_name):
+    return file_name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def strip_compression(file_name):
+    """Return name of a file without extension of compression
+    ("NF190607.05.gz" -> "NF190607.05") for matching name patterns."""
+    root, extension = os.path.splitext(file_name)
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        return root
+    return file_name
+
+
+class ArchiveIndex:
+    """Members of a zip or tar archive.
+
+    The directory of the archive is read once; members are read one by one
+    without extracting the archive.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        if zipfile.is_zipfile(file_name):
+            self.zip = zipfile.ZipFile(file_name)
+            self.tar = None
+            self.members = {
+                info.filename: info for info in self.zip.infolist() if not info.is_dir()
+            }
+        elif tarfile.is_tarfile(file_name):
+            self.zip = None
+            self.tar = tarfile.open(file_name)
+            self.members = {info.name: info for info in self.tar.getmembers() if info.isfile()}
+        else:
+            raise ValueError(f"{file_name}: not a zip or tar archive")
+
+    def get_names(self):
+        return sorted(self.members)
+
+    def get_info(self, member):
+        if member not in self.members:
+            raise FileNotFoundError(f"{self.file_name}: no member {member}")
+        return self.members[member]
+
+    def get_size(self, member):
+        info = self.get_info(member)
+        return info.file_size if self.zip is not None else info.size
+
+    def open(self, member):
+        """Return a binary file object of a member."""
+        info = self.get_info(member)
+        if self.zip is not None:
+            return self.zip.open(info)
+        # Members share the file object of the archive, so they are read
+        # at once (ionogram files are small)
+        with self.lock:
+            return io.BytesIO(self.tar.extractfile(info).read())
+
+    def close(self):
+        """Close the archive; zip members already opened are still read to
+        the end."""
+        with self.lock:
+            (self.zip or self.tar).close()
+
+
+archives = {}
+archives_lock = threading.Lock()
+
+
+def get_archive(file_name):
+    """Return index of an archive, cached while the file is not modified."""
+    stat = os.stat(file_name)
+    key = os.path.abspath(file_name)
+    with archives_lock:
+        cached = archives.get(key)
+        if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+            archives[key] = ((stat.st_mtime_ns, stat.st_size), ArchiveIndex(file_name))
+            if cached is not None:
+                cached[1].close()
+        return archives[key][1]
+
+
+def detect_compression(prefix):
+    """Return name of the compression of data starting with prefix (or None)."""
+    for compression, magic in COMPRESSIONS:
+        if prefix.startswith(magic):
+            return compression
+    return None
+
+
+def _open_raw(file_name, buffer_size):
+    archive, member = split_member_path(file_name)
+    if member is None:
+        return open(file_name, "rb", buffering=buffer_size)
+    return get_archive(archive).open(member)
+
+
+def _read_prefix(file):
+    if hasattr(file, "peek"):
+        return file.peek(6)[:6]
+    prefix = file.read(6)
+    file.seek(0)
+    return prefix
+
+
+class DecompressedFile(io.BufferedReader):
+    """Buffered stream of decompressed data which also closes the
+    compressed file."""
+
+    DECOMPRESSORS = {
+        "gzip": lambda file: gzip.GzipFile(fileobj=file),
+        "bz2": bz2.BZ2File,
+        "xz": lzma.LZMAFile,
+        "lzma": lzma.LZMAFile,
+    }
+
+    def __init__(self, file, compression, buffer_size=BUFFER_SIZE):
+        super().__init__(self.DECOMPRESSORS[compression](file), buffer_size)
+        self.source = file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.source.close()
+
+
+def open_input(file_name, mode="r", encoding=None, buffer_size=BUFFER_SIZE):
+    """Open a file or an archive member ("archive!/member") for reading.
+
+    mode is "r" (text, as for open) or "rb". gzip, bz2, xz and lzma files
+    are recognized by their first bytes and decompressed while reading.
+    """
+    file = _open_raw(file_name, buffer_size)
+    try:
+        compression = detect_compression(_read_prefix(file))
+    except BaseException:
+        file.close()
+        raise
+    if compression is not None:
+        file = DecompressedFile(file, compression, buffer_size)
+    if "b" in mode:
+        return file
+    return io.TextIOWrapper(file, encoding=encoding)
+
+
+def get_size(file_name):
+    """Return size of the data of a file or an archive member, None if it
+    is not known without decompressing it.
+
+    gzip keeps the size (modulo 4 GiB) in its last 4 bytes; bz2, xz and
+    lzma data has to be decompressed to the end.
+    """
+    with _open_raw(file_name, BUFFER_SIZE) as file:
+        compression = detect_compression(_read_prefix(file))
+        if compression == "gzip":
+            file.seek(-4, io.SEEK_END)
+            return int.from_bytes(file.read(4), "little")
+        if compression is not None:
+            return None
+    archive, member = split_member_path(file_name)
+    if member is None:
+        return os.path.getsize(file_name)
+    return get_archive(archive).get_size(member)
@@ -0,0 +1,192 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from ionogram_tester import IonogramTester
+from json_file_format import JsonFileIO
+from std_file_format import STDFileIO
+from ionospheric_layer_trace import IonosphericLayerTrace, Modes
+from ionogram_input import split_member_path, get_sidecar_name
+from ionogram_container import is_container, open_container
+from ionogram_shared import (
+    SHARED_MEMORY,
+    share_ionogram,
+    attach_ionogram,
+    release_ionogram,
+)
+
+
+def open_ionogram(file_name, strict=False):
+    """Detect the format of a file and return the loaded ionogram.
+
+    Members of containers and archives are given as "container!/member".
+    Raises ValueError if the format is not supported or no data is loaded,
+    and with strict also if the date is not recognized (the loader would
+    use the current date).
+    """
+    container, member = split_member_path(file_name)
+    if member is not None and is_container(container):
+        iono = open_container(container).load(member)
+    else:
+        tester = IonogramTester()
+        if not tester.examine(file_name):
+            raise ValueError(f"{file_name}: file format is not supported")
+        iono = tester.get_iono()
+        iono.load(file_name)
+        if iono.get_data() is None:
+            raise ValueError(f"{file_name}: ionogram is not loaded")
+    if strict and not iono.date_recognized:
+        raise ValueError(f"{file_name}: date is not recognized")
+    return iono
+
+
+def load_metadata(file_name):
+    """Return an ionogram with date, station, extent and shape but no data.
+
+    Raises ValueError if the format is not supported.
+    """
+    container, member = split_member_path(file_name)
+    if member is not None and is_container(container):
+        return open_container(container).load_metadata(member)
+
+    tester = IonogramTester()
+    if not tester.examine(file_name):
+        raise ValueError(f"{file_name}: file format is not supported")
+    iono = tester.get_iono()
+    iono.load_metadata(file_name)
+    return iono
+
+
+def _load(file_name):
+    try:
+        return file_name, open_ionogram(file_name, strict=True)
+    except Exception as e:
+        return file_name, e
+
+
+def _load_shared(file_name):
+    file_name, iono = _load(file_name)
+    if isinstance(iono, Exception):
+        return file_name, iono
+    return file_name, share_ionogram(iono)
+
+
+def _release(result):
+    if not isinstance(result[1], Exception):
+        release_ionogram(result[1])
+
+
+def ordered_map(function, items, executor, read_ahead, discard=None):
+    """Like executor.map, but submits at most read_ahead items ahead of the
+    consumer, so memory does not grow when the consumer is slower.
+
+    If the consumer stops early, results already computed are passed to
+    discard.
+    """
+    items = iter(items)
+    futures = deque()
+    try:
+        for item in items:
+            futures.append(executor.submit(function, item))
+            if len(futures) >= read_ahead:
+                break
+        while futures:
+            result = futures.popleft().result()
+            for item in items:
+                futures.append(executor.submit(function, item))
+                break
+            yield result
+    finally:
+        for future in futures:
+            if not future.cancel() and discard is not None:
+                discard(future.result())
+
+
+def iter_ionograms(file_names, workers=1, read_ahead=None, processes=False):
+    """Yield (file name, ionogram) pairs in the order of file_names.
+
+    The ionogram is replaced by the exception if the file can not be loaded
+    or its date is not recognized. With workers > 1 up to read_ahead files
+    (2 * workers by default) are decoded ahead in a thread pool, or in a
+    process pool if processes is set.
+    Process workers pass data through shared memory instead of pickling it.
+    """
+    if workers <= 1:
+        for file_name in file_names:
+            yield _load(file_name)
+        return
+
+    read_ahead = max(read_ahead or 2 * workers, 1)
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        try:
+            if processes and SHARED_MEMORY:
+                results = ordered_map(
+                    _load_shared, file_names, executor, read_ahead, _release
+                )
+                for file_name, result in results:
+                    if not isinstance(result, Exception):
+                        result = attach_ionogram(result)
+                    yield file_name, result
+            else:
+                yield from ordered_map(_load, file_names, executor, read_ahead)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+def read_json_data(file_name):
+    """Return parameters and traces of an ionogram in the format of JSON files.
+
+    They are read from the JSON file, the STD file or (for members) from
+    the container, whichever is found first. Returns None if none is found.
+    """
+    json_data = JsonFileIO.load(get_sidecar_name(file_name, "json"))
+    if json_data:
+        return json_data
+
+    std_info = STDFileIO.load(get_sidecar_name(file_name, "STD"))
+    if std_info:
+        date = std_info["date"] - timedelta(hours=std_info["timezone"])
+        return {
+            date.isoformat(): {
+                "station_name": std_info["station_name"],
+                "latitude": std_info["latitude"],
+                "longitude": std_info["longitude"],
+                "gyro": std_info["gyro"],
+                "dip": std_info["dip"],
+                "sunspot": std_info["sunspot"],
+                "date": std_info["date"].isoformat(),
+                "timezone": std_info["timezone"],
+                "traces": [trace.to_dict() for trace in std_info["traces"]],
+            }
+        }
+
+    container, member = split_member_path(file_name)
+    if member is not None and is_container(container):
+        return open_container(container).get_json_data(member)
+    return None
+
+
+def read_traces(file_name, iono=None):
+    """Return traces of an ionogram from its JSON or STD file.
+
+    A JSON file may hold several ionograms, the one with the UT date of
+    iono is taken (the first one if iono is not given or not found).
+    """
+    json_data = read_json_data(file_name)
+    if not json_data:
+        return []
+
+    current_data = next(iter(json_data.values()))
+    if iono is not None:
+        date = iono.date - timedelta(hours=iono.timezone)
+        current_data = json_data.get(date.isoformat(), current_data)
+    return [
+        IonosphericLayerTrace(
+            t["name"],
+            t["freqs"],
+            t["heights"],
+            t["critical_frequency"],
+            t.get("trace_type", Modes.ORDINARY),
+        )
+        for t in current_data["traces"]
+    ]
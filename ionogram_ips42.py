@@ -1,31 +1,24 @@
 from math import log
-from struct import unpack
+import numpy as np
 from datetime import datetime, timedelta
 from configparser import ConfigParser, NoSectionError, NoOptionError
 from ionogram import Ionogram
+from ionogram_input import open_input
 
 
 class IonogramIps42(Ionogram):
 
+    # Blocks of 16 heights and frequencies with the digits of station, date
+    # and time
+    OCR_BLOCKS = (28, 29)
+    OCR_FREQS = 256
+
     def __init__(self, debug_level=0):
         super().__init__(debug_level)
         self.ionosonde_model = "IPS-42"
 
     def load(self, file_name):
-        with open(file_name, "rb") as file:
-            head = file.read(64)
-            data = file.read(512 * 576 // 8)
-
-        data_tuple = unpack("H" * (len(data) // 2), data)
-        self.data = [[0 for x in range(576)] for y in range(512)]
-
-        for f in range(576):
-            for h in range(512 // 16):
-                i = f * 512 // 16 + h
-                for z in range(16):
-                    alt = 511 - (h * 16 + 15 - z)
-                    bit = (data_tuple[i] >> z) & 1
-                    self.data[alt][f] = 0 if bit else 1
+        self.data = self._decode(file_name, range(512 // 16), 576).tolist()
 
         # self.data[0][0] = -1
 
@@ -33,6 +26,36 @@ class IonogramIps42(Ionogram):
         if self.date:
             self.load_sunspot()
 
+    def load_metadata(self, file_name):
+        image = self._decode(file_name, self.OCR_BLOCKS, self.OCR_FREQS)
+        # Only rows of the digits are converted, the others are not read
+        zeros = [0] * 576
+        self.data = [zeros] * 512
+        for h in self.OCR_BLOCKS:
+            for alt in range(511 - (h * 16 + 15), 511 - h * 16 + 1):
+                self.data[alt] = image[alt].tolist()
+        self._extract_info()
+        if self.date:
+            self.load_sunspot()
+        self.shape = (512, 576)
+        self.data = None
+
+    def _decode(self, file_name, blocks, n_freq):
+        """Return the image (512 heights x 576 frequencies, 1 is an echo)
+        of blocks of 16 heights at the first n_freq frequencies."""
+        with open_input(file_name, "rb") as file:
+            head = file.read(64)
+            data = file.read(512 * 576 // 8)
+
+        words = np.frombuffer(data, dtype=np.uint16).reshape(576, 512 // 16)
+        image = np.zeros((512, 576), dtype=np.uint8)
+        # Bit z of block h is the height 511 - (h * 16 + 15 - z)
+        bits = np.arange(16, dtype=np.uint16)
+        for h in blocks:
+            alt = 511 - (h * 16 + 15 - bits)
+            image[alt, :n_freq] = 1 - ((words[:n_freq, h, None] >> bits) & 1).T
+        return image
+
     def _digit_recognize(self, offset_f):
         offset_alt = 36
         digit = None
@@ -73,6 +96,7 @@ class IonogramIps42(Ionogram):
             self.date += timedelta(doy - 1)
         except ValueError:
             self.date = datetime.now()
+            self.date_recognized = False
             print("Date is not recognized. Current date is used.")
 
         try:
@@ -1,6 +1,7 @@
 from math import log
 from datetime import datetime
 from ionogram import Ionogram
+from ionogram_input import open_input
 
 
 class IonogramKarazin(Ionogram):
@@ -9,7 +10,7 @@ class IonogramKarazin(Ionogram):
         super().__init__()
 
     def load(self, file_name):
-        with open(file_name, "rt", encoding="ascii") as file:
+        with open_input(file_name, "rt", encoding="ascii") as file:
             lines = [s.strip() for s in file.readlines()]
 
         index_freq = lines.index("Frequency Set")
@@ -23,34 +24,7 @@ class IonogramKarazin(Ionogram):
         data_temp = [0] * self.n_freq
 
         for i, line in enumerate(lines):
-            if line.startswith("Observatory"):
-                self.station_name = line.split(":")[-1].strip()
-            elif line.startswith("Location"):
-                location = line.split(":")[-1].strip().split(", ")
-
-                def convert_to_decimal(coord):
-                    d = float(coord[:2])
-                    m = float(coord[3:5])
-                    s = float(coord[6:8])
-                    return d + m / 60 + s / 3600
-
-                lat = convert_to_decimal(location[0][:-2])
-                lon = convert_to_decimal(location[1][:-2])
-                self.lat = lat * (1 if location[0][-1] == "N" else -1)
-                self.lon = lon * (1 if location[1][-1] == "E" else -1)
-            elif line.startswith("z0"):
-                self.z0 = float(line.split("=")[-1].strip())
-            elif line.startswith("dz"):
-                self.dz = float(line.split("=")[-1].strip())
-            elif line.startswith("Frep"):
-                self.frep = float(line.split("=")[-1].strip())
-            elif line.startswith("Nstrob"):
-                self.nstrob = int(line.split("=")[-1].strip())
-            elif line.startswith("Nsound"):
-                self.nsound = int(line.split("=")[-1].strip())
-            elif line.startswith("TIME"):
-                date = line.split("=")[-1].strip()
-                self.date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+            self._read_header_line(line)
 
             if i > index_freq and i < index_end_of_header:
                 self.frequencies.append(float(line.split()[-1].strip()))
@@ -78,6 +52,63 @@ class IonogramKarazin(Ionogram):
         if self.date:
             self.load_sunspot()
 
+    def load_metadata(self, file_name):
+        """Read the header and the first data row (for the number of heights)."""
+        lines = []
+        with open_input(file_name, "rt", encoding="ascii") as file:
+            for line in file:
+                lines.append(line.strip())
+                if len(lines) > 1 and lines[-2] == "DATA":
+                    break
+
+        index_freq = lines.index("Frequency Set")
+        index_end_of_header = lines.index("END HEADER")
+        self.frequencies = [
+            float(line.split()[-1].strip())
+            for line in lines[index_freq + 1 : index_end_of_header]
+        ]
+        self.n_freq = len(self.frequencies)
+
+        for line in lines:
+            self._read_header_line(line)
+
+        self.n_rang = len(lines[-1].split())
+        self.ranges = [self.z0 + self.dz * h for h in range(self.n_rang)]
+        self.shape = (self.n_rang, self.n_freq)
+
+        if self.date:
+            self.load_sunspot()
+
+    def _read_header_line(self, line):
+        if line.startswith("Observatory"):
+            self.station_name = line.split(":")[-1].strip()
+        elif line.startswith("Location"):
+            location = line.split(":")[-1].strip().split(", ")
+
+            def convert_to_decimal(coord):
+                d = float(coord[:2])
+                m = float(coord[3:5])
+                s = float(coord[6:8])
+                return d + m / 60 + s / 3600
+
+            lat = convert_to_decimal(location[0][:-2])
+            lon = convert_to_decimal(location[1][:-2])
+            self.lat = lat * (1 if location[0][-1] == "N" else -1)
+            self.lon = lon * (1 if location[1][-1] == "E" else -1)
+        elif line.startswith("z0"):
+            self.z0 = float(line.split("=")[-1].strip())
+        elif line.startswith("dz"):
+            self.dz = float(line.split("=")[-1].strip())
+        elif line.startswith("Frep"):
+            self.frep = float(line.split("=")[-1].strip())
+        elif line.startswith("Nstrob"):
+            self.nstrob = int(line.split("=")[-1].strip())
+        elif line.startswith("Nsound"):
+            self.nsound = int(line.split("=")[-1].strip())
+        elif line.startswith("TIME"):
+            date = line.split("=")[-1].strip()
+            self.date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+
     def get_extent(self):
         left = self.freq_to_coord(self.frequencies[0])
         right = self.freq_to_coord(self.frequencies[-1])
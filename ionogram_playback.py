@@ -0,0 +1,170 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from ionogram_io import open_ionogram, read_traces
+from ionogram_pyramid import IonogramPyramid
+from ionospheric_layer_trace import IonosphericLayers, Modes
+from lut_renderer import LutRenderer, get_value_range
+
+# Layers in the order of the trace lists of the main window
+LAYERS = (
+    IonosphericLayers.F2_LAYER,
+    IonosphericLayers.F1_LAYER,
+    IonosphericLayers.E_LAYER,
+    IonosphericLayers.ES_LAYER,
+)
+
+
+class Frame:
+    """Decoded ionogram rendered to RGBA for playback, with frequency tics,
+    traces in the coordinates of the image ({layer: (xs, heights)}) and
+    critical frequencies ({layer: x})."""
+
+    __slots__ = (
+        "index",
+        "file_name",
+        "iono",
+        "image",
+        "extent",
+        "image_extent",
+        "tics",
+        "labels",
+        "points",
+        "lines",
+    )
+
+    def __init__(
+        self, index, file_name, iono, image, extent, image_extent, tics, labels, points, lines
+    ):
+        self.index = index
+        self.file_name = file_name
+        self.iono = iono
+        self.image = image
+        self.extent = extent
+        self.image_extent = image_extent
+        self.tics = tics
+        self.labels = labels
+        self.points = points
+        self.lines = lines
+
+
+def render_frame(index, file_name, width, height, level=1.0, percentile=100, key=(True, True)):
+    """Load a file and render the whole ionogram for a view of width x
+    height pixels. Returns the exception if the file can not be loaded."""
+    try:
+        iono = open_ionogram(file_name)
+        data = iono.get_component_data(*key) if iono.ox_mode else iono.get_data()
+        statistics = iono.get_statistics()
+        vmin, vmax = statistics.get_limits(percentile)
+
+        extent = iono.get_extent()
+        pyramid = IonogramPyramid(data, extent)
+        view_level, window, image_extent = pyramid.get_view(
+            extent[:2], extent[2:], width, height
+        )
+        renderer = LutRenderer(iono.cmap, *get_value_range(iono))
+        image = renderer.render(
+            view_level, pyramid.levels[view_level], vmin * level, vmax * level, window
+        )
+
+        tics = iono.get_freq_tics()
+        labels = iono.get_freq_labels()
+        points = {}
+        lines = {}
+        for trace in read_traces(file_name, iono):
+            if trace.trace_type != Modes.ORDINARY or trace.name not in LAYERS:
+                continue
+            layer = LAYERS.index(trace.name)
+            points[layer] = ([iono.freq_to_coord(f) for f in trace.freqs], trace.heights)
+            if trace.critical_frequency and int(trace.critical_frequency) != 99:
+                lines[layer] = iono.freq_to_coord(trace.critical_frequency)
+    except Exception as e:
+        return e
+    return Frame(
+        index, file_name, iono, image, extent, image_extent, tics, labels, points, lines
+    )
+
+
+class FrameBuffer:
+    """Ring of frames decoded and rendered ahead in a thread pool.
+
+    render(index, file_name) makes a frame; at most size frames are in
+    the buffer. Frames which are late for their time are dropped, so
+    playback does not wait for slow files.
+    """
+
+    def __init__(self, file_names, start, render, workers=2, size=16):
+        self.file_names = file_names
+        self.render = render
+        self.size = max(size, 1)
+        self.next_index = start
+        self.futures = deque()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.fill()
+
+    def fill(self):
+        while len(self.futures) < self.size and self.next_index < len(self.file_names):
+            index = self.next_index
+            future = self.executor.submit(self.render, index, self.file_names[index])
+            self.futures.append((index, future))
+            self.next_index += 1
+
+    def take(self, index):
+        """Return the newest ready frame up to index (None if there is no
+        new frame yet), the number of dropped frames and the number of
+        files which are not loaded."""
+        frame = None
+        dropped = 0
+        errors = 0
+        while self.futures and self.futures[0][0] <= index:
+            frame_index, future = self.futures[0]
+            if future.done():
+                self.futures.popleft()
+                result = future.result()
+                if isinstance(result, Exception):
+                    errors += 1
+                    continue
+                if frame is not None:
+                    dropped += 1
+                frame = result
+            elif frame_index < index:
+                # It is late, a newer frame is already due
+                self.futures.popleft()
+                future.cancel()
+                dropped += 1
+            else:
+                break
+        self.fill()
+        return frame, dropped, errors
+
+    def get_next_index(self):
+        """Return index of the oldest frame in the buffer."""
+        return self.futures[0][0] if self.futures else self.next_index
+
+    def is_finished(self):
+        return not self.futures and self.next_index >= len(self.file_names)
+
+    def close(self):
+        for _, future in self.futures:
+            future.cancel()
+        self.futures.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateMeter:
+    """Frame rate over the last seconds."""
+
+    def __init__(self, period=2.0):
+        self.period = period
+        self.times = deque()
+
+    def tick(self):
+        now = time.monotonic()
+        self.times.append(now)
+        while now - self.times[0] > self.period:
+            self.times.popleft()
+
+    def get_rate(self):
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
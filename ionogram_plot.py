@@ -0,0 +1,59 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from colormaps import get_colormap
+
+
+def save_ionogram_image(
+    filename,
+    iono,
+    data,
+    vmin,
+    vmax,
+    points=(),
+    lines=(),
+    title="",
+    width=10,
+    height=6,
+    dpi=100,
+    font_size=16,
+):
+    """Save ionogram as an image without pyplot and Qt.
+
+    points is a list of (freqs, heights, color), lines is a list of
+    (critical frequency, color).
+    """
+    figure = Figure(figsize=(width, height))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+
+    extent = iono.get_extent()
+    ax.imshow(
+        data,
+        cmap=get_colormap(iono.cmap),
+        interpolation="nearest",
+        extent=extent,
+        aspect="auto",
+        vmin=vmin,
+        vmax=vmax,
+    )
+
+    for freqs, heights, color in points:
+        ax.scatter([iono.freq_to_coord(f) for f in freqs], heights, c=color)
+
+    for freq, color in lines:
+        f = iono.freq_to_coord(freq)
+        if extent[0] < f < extent[1]:
+            ax.plot([f, f], [extent[2], extent[3]], c=color)
+
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_xticks(iono.get_freq_tics())
+    ax.set_xticklabels(iono.get_freq_labels())
+    ax.tick_params(labelsize=font_size)
+
+    ax.set_title(title, fontdict={"fontsize": font_size})
+    ax.set_xlabel("Frequency [MHz]", fontsize=font_size)
+    ax.set_ylabel("Virtual height [km]", fontsize=font_size)
+
+    figure.tight_layout()
+    figure.savefig(filename, dpi=dpi)
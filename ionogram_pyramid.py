@@ -0,0 +1,77 @@
+from math import ceil, floor, log2
+import numpy as np
+
+
+class IonogramPyramid:
+    """Downsampled copies of an ionogram (2x per level) keeping the strongest echoes.
+
+    Each cell of a coarser level holds the value with the largest magnitude
+    of its 2x2 block, so weak but isolated echoes survive downsampling and
+    the sign of two-component (O/X) data is preserved.
+    """
+
+    def __init__(self, data, extent, min_size=256):
+        self.extent = extent
+        self.levels = [np.asarray(data)]
+        while max(self.levels[-1].shape) > min_size and min(self.levels[-1].shape) > 1:
+            self.levels.append(self.downsample(self.levels[-1]))
+
+    @staticmethod
+    def downsample(data):
+        rows, cols = data.shape
+        padded = np.zeros((rows + rows % 2, cols + cols % 2), dtype=data.dtype)
+        padded[:rows, :cols] = data
+        blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+        blocks = blocks.transpose(0, 2, 1, 3).reshape(blocks.shape[0], blocks.shape[2], 4)
+        index = np.argmax(np.abs(blocks), axis=2)
+        return np.take_along_axis(blocks, index[..., None], axis=2)[..., 0]
+
+    def update_columns(self, data, columns):
+        """Replace the ionogram by data changed only in columns and update
+        the cells of coarser levels covering them.
+
+        Returns changed columns by level.
+        """
+        self.levels[0] = np.asarray(data)
+        changed = {0: sorted(set(columns))}
+        for level in range(1, len(self.levels)):
+            source = self.levels[level - 1]
+            changed[level] = sorted({c // 2 for c in changed[level - 1]})
+            for c in changed[level]:
+                self.levels[level][:, c] = self.downsample(source[:, 2 * c : 2 * c + 2])[:, 0]
+        return changed
+
+    def get_view(self, xlim, ylim, width_px, height_px):
+        """Choose the level and window for the visible area of the canvas.
+
+        Returns level number, (row slice, column slice) of that level and
+        the extent [left, right, bottom, top] of the window.
+        """
+        left, right, bottom, top = self.extent
+        rows, cols = self.levels[0].shape
+        dx = (right - left) / cols
+        dy = (top - bottom) / rows
+
+        c0 = min(max((min(xlim) - left) / dx, 0), cols)
+        c1 = min(max((max(xlim) - left) / dx, 0), cols)
+        r0 = min(max((top - max(ylim)) / dy, 0), rows)
+        r1 = min(max((top - min(ylim)) / dy, 0), rows)
+
+        factor = min((c1 - c0) / max(width_px, 1), (r1 - r0) / max(height_px, 1))
+        level = floor(log2(factor)) if factor >= 2 else 0
+        level = min(level, len(self.levels) - 1)
+
+        scale = 2**level
+        level_rows, level_cols = self.levels[level].shape
+        lc0 = floor(c0 / scale)
+        lc1 = max(min(ceil(c1 / scale), level_cols), lc0 + 1)
+        lr0 = floor(r0 / scale)
+        lr1 = max(min(ceil(r1 / scale), level_rows), lr0 + 1)
+
+        extent = [
+            left + lc0 * scale * dx,
+            left + lc1 * scale * dx,
+            top - lr1 * scale * dy,
+            top - lr0 * scale * dy,
+        ]
+        return level, (slice(lr0, lr1), slice(lc0, lc1)), extent
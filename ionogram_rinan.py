@@ -3,6 +3,7 @@ from configparser import ConfigParser, NoSectionError, NoOptionError
 from datetime import datetime
 import numpy as np
 from ionogram import Ionogram
+from ionogram_input import open_input, strip_compression
 from colormaps import cmap_two_comp
 
 
@@ -12,10 +13,10 @@ class IonogramRinan(Ionogram):
         super().__init__()
 
     def load(self, file_name):
-        with open(file_name, encoding="ascii") as file:
+        with open_input(file_name, encoding="ascii") as file:
             lines = [s.strip() for s in file.readlines()]
 
-        if file_name.lower().endswith(".pion"):
+        if strip_compression(file_name).lower().endswith(".pion"):
             self.cmap = cmap_two_comp
             self.ox_mode = True
 
@@ -33,40 +34,13 @@ class IonogramRinan(Ionogram):
         data_temp = [0] * self.n_freq
 
         for i, line in enumerate(lines):
-            if line.startswith("Observatory"):
-                self.station_name = line.split(":")[-1].strip()
-            elif line.startswith("Location"):
-                location = line.split(":")[-1].strip().split(", ")
-
-                def convert_to_decimal(coord):
-                    d = float(coord[:2])
-                    m = float(coord[3:5])
-                    s = float(coord[6:8])
-                    return d + m / 60 + s / 3600
-
-                lat = convert_to_decimal(location[0][:-2])
-                lon = convert_to_decimal(location[1][:-2])
-                self.lat = lat * (1 if location[0][-1] == "N" else -1)
-                self.lon = lon * (1 if location[1][-1] == "E" else -1)
-            elif line.startswith("z0"):
-                self.z0 = float(line.split("=")[-1].strip())
-            elif line.startswith("dz"):
-                self.dz = float(line.split("=")[-1].strip())
-            elif line.startswith("Nstrob"):
-                self.nstrob = int(line.split("=")[-1].strip())
-            elif line.startswith("Nsound"):
-                self.nsound = int(line.split("=")[-1].strip())
-            elif line.startswith("TIME"):
-                date = line.split("=")[-1].strip()
-                if date.endswith(" UT") or date.endswith(" LT"):
-                    date = date[:-3]
-                self.date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+            self._read_header_line(line)
 
             if index_freq < i < index_end_of_header:
                 self.frequencies.append(float(line.split()[-1].strip()))
 
             if i > index_data and i < index_end_of_data:
-                if file_name.lower().endswith(".pion"):
+                if strip_compression(file_name).lower().endswith(".pion"):
                     row = [
                         -99999 if 49999 <= float(x) <= 50000 else float(x)
                         for x in line.split()
@@ -88,7 +62,7 @@ class IonogramRinan(Ionogram):
 
         n_freq = self.data.shape[1]
 
-        if not file_name.lower().endswith(".pion"):
+        if not strip_compression(file_name).lower().endswith(".pion"):
             for i in range(n_freq):
                 avarage = np.average(self.data[:, i])
                 self.data[:, i] -= avarage
@@ -97,7 +71,70 @@ class IonogramRinan(Ionogram):
         # self.data[0][0] = -np.max(self.data)
 
         self.load_sunspot()
+        self._read_station_config()
+
+    def load_metadata(self, file_name):
+        """Read the header and the first data row (for the number of heights)."""
+        lines = []
+        with open_input(file_name, encoding="ascii") as file:
+            for line in file:
+                lines.append(line.strip())
+                if len(lines) > 1 and lines[-2] == "DATA":
+                    break
+
+        if strip_compression(file_name).lower().endswith(".pion"):
+            self.cmap = cmap_two_comp
+            self.ox_mode = True
+
+        index_freq = lines.index("Frequency Set")
+        index_end_of_header = lines.index("END")
+        self.frequencies = [
+            float(line.split()[-1].strip())
+            for line in lines[index_freq + 1 : index_end_of_header]
+        ]
+        self.n_freq = len(self.frequencies)
 
+        for line in lines:
+            self._read_header_line(line)
+
+        self.n_rang = len(lines[-1].split())
+        self.ranges = [self.z0 + self.dz * h for h in range(self.n_rang)]
+        self.shape = (self.n_rang, self.n_freq)
+
+        self.load_sunspot()
+        self._read_station_config()
+
+    def _read_header_line(self, line):
+        if line.startswith("Observatory"):
+            self.station_name = line.split(":")[-1].strip()
+        elif line.startswith("Location"):
+            location = line.split(":")[-1].strip().split(", ")
+
+            def convert_to_decimal(coord):
+                d = float(coord[:2])
+                m = float(coord[3:5])
+                s = float(coord[6:8])
+                return d + m / 60 + s / 3600
+
+            lat = convert_to_decimal(location[0][:-2])
+            lon = convert_to_decimal(location[1][:-2])
+            self.lat = lat * (1 if location[0][-1] == "N" else -1)
+            self.lon = lon * (1 if location[1][-1] == "E" else -1)
+        elif line.startswith("z0"):
+            self.z0 = float(line.split("=")[-1].strip())
+        elif line.startswith("dz"):
+            self.dz = float(line.split("=")[-1].strip())
+        elif line.startswith("Nstrob"):
+            self.nstrob = int(line.split("=")[-1].strip())
+        elif line.startswith("Nsound"):
+            self.nsound = int(line.split("=")[-1].strip())
+        elif line.startswith("TIME"):
+            date = line.split("=")[-1].strip()
+            if date.endswith(" UT") or date.endswith(" LT"):
+                date = date[:-3]
+            self.date = datetime.strptime(date, "%d.%m.%Y %H:%M:%S")
+
+    def _read_station_config(self):
         config = ConfigParser()
         config_path = "./data/Rinan.ini"
         config.read(config_path)
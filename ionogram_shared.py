@@ -0,0 +1,60 @@
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+# On Windows a block is destroyed when its last handle is closed, so it can
+# not outlive the worker; ionograms are pickled as usual there.
+SHARED_MEMORY = os.name != "nt"
+
+
+def share_ionogram(iono):
+    """Move ionogram data to a shared memory block (in a worker process).
+
+    Returns a small picklable header: the class, attributes except data and
+    caches, and name, shape and dtype of the block.
+    """
+    data = np.ascontiguousarray(iono.data)
+    memory = SharedMemory(create=True, size=max(data.nbytes, 1))
+    np.ndarray(data.shape, data.dtype, buffer=memory.buf)[...] = data
+    # The block is unlinked by the receiving process, the worker must not
+    # remove it at exit
+    resource_tracker.unregister(memory._name, "shared_memory")
+    memory.close()
+
+    return {
+        "class": type(iono),
+        "attributes": iono.get_attributes(),
+        "name": memory.name,
+        "shape": data.shape,
+        "dtype": data.dtype.str,
+    }
+
+
+def attach_ionogram(header):
+    """Make an ionogram from a header of share_ionogram.
+
+    Data is a read-only view of the shared block, which is unlinked at once
+    and unmapped when the last view of data is gone.
+    """
+    memory = SharedMemory(name=header["name"])
+    dtype = np.dtype(header["dtype"])
+    count = int(np.prod(header["shape"]))
+    data = np.frombuffer(memory._mmap, dtype, count).reshape(header["shape"])
+    data.flags.writeable = False
+    # The array keeps the mapping alive, so close() must not unmap it
+    memory._mmap = None
+    memory.close()
+    memory.unlink()
+
+    iono = header["class"]()
+    iono.__dict__.update(header["attributes"])
+    iono.data = data
+    return iono
+
+
+def release_ionogram(header):
+    """Remove the shared block of a header which will not be attached."""
+    memory = SharedMemory(name=header["name"])
+    memory.close()
+    memory.unlink()
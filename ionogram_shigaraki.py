@@ -2,6 +2,7 @@ import numpy as np
 from datetime import datetime
 from os import path
 from ionogram import Ionogram
+from ionogram_input import open_input
 
 
 class IonogramShigaraki(Ionogram):
@@ -15,33 +16,19 @@ class IonogramShigaraki(Ionogram):
         self.dip = 49.0
 
     def load(self, file_name):
-        with open(file_name, "r", encoding="ascii") as file:
-            lines = [s.strip() for s in file.readlines()]
+        with open_input(file_name, "r", encoding="ascii") as file:
+            self.load_lines(file.readlines())
 
-        self.station_name = lines[0].split()[0]
-        date = lines[1].split(": ")[-1]
-        self.date = datetime.strptime(date, "%Y-%m-%d %H:%M")
-        self.fmin = float(lines[3].split(": ")[-1])
-        self.fmax = float(lines[4].split(": ")[-1])
-        self.hmin = float(lines[5].split(": ")[-1])
-        self.hmax = float(lines[6].split(": ")[-1])
-        self.frequencies = [float(f) for f in lines[9].split()]
-        self.altitudes = []
-        self.data = []
-        m = float("-Inf")
-        for i, line in enumerate(lines):
-            if i > 9:
-                tmp = [float(x) + 90 for x in line.split()]
-                self.altitudes.append(tmp[0])
-                data = tmp[1:]
-                self.data.append(data)
-                _m = max(data)
-                if _m > m:
-                    m = _m
-        self.data.reverse()
-        # self.data[0][0] = -m
-
-        self.data = np.array(self.data)
+    def load_lines(self, lines):
+        """Parse the text of an ionogram (e.g. a downloaded one)."""
+        lines = [s.strip() for s in lines]
+
+        self._read_header(lines[:10])
+        # Rows are an altitude and values at frequencies, the last altitude
+        # is the top row of the ionogram
+        values = np.loadtxt(lines[10:], ndmin=2) + 90
+        self.altitudes = values[:, 0].tolist()
+        self.data = values[::-1, 1:].copy()
 
         n_freq = self.data.shape[1]
         for i in range(n_freq):
@@ -54,6 +41,26 @@ class IonogramShigaraki(Ionogram):
 
         self.load_sunspot()
 
+    def load_metadata(self, file_name):
+        """Read the first 10 lines and count rows of the data."""
+        with open_input(file_name, "rb") as file:
+            self._read_header([file.readline().decode("ascii").strip() for _ in range(10)])
+            # Rows are counted in bytes, they are not decoded
+            n_rang = sum(1 for line in file.read().split(b"\n") if line.strip())
+        self.shape = (n_rang, len(self.frequencies))
+
+        self.load_sunspot()
+
+    def _read_header(self, lines):
+        self.station_name = lines[0].split()[0]
+        date = lines[1].split(": ")[-1]
+        self.date = datetime.strptime(date, "%Y-%m-%d %H:%M")
+        self.fmin = float(lines[3].split(": ")[-1])
+        self.fmax = float(lines[4].split(": ")[-1])
+        self.hmin = float(lines[5].split(": ")[-1])
+        self.hmax = float(lines[6].split(": ")[-1])
+        self.frequencies = [float(f) for f in lines[9].split()]
+
     def get_altitude(self, h):
         return h
 
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+class IonogramStatistics:
+
+    def __init__(self, data, n_bins=4096):
+        data = np.asarray(data, dtype=float)
+        self.min = float(np.min(data))
+        self.max = float(np.max(data))
+        if self.max > self.min:
+            self.histogram, self.edges = np.histogram(
+                data, bins=n_bins, range=(self.min, self.max)
+            )
+        else:
+            self.histogram = np.array([data.size])
+            self.edges = np.array([self.min, self.max])
+        self.cdf = np.cumsum(self.histogram) / data.size
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) interpolated from the histogram."""
+        if q <= 0:
+            return self.min
+        if q >= 100:
+            return self.max
+        return float(np.interp(q / 100, np.concatenate(([0], self.cdf)), self.edges))
+
+    def get_limits(self, percentile=100.0):
+        low = self.percentile(100 - percentile)
+        high = self.percentile(percentile)
+        return low, high
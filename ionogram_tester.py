@@ -1,6 +1,7 @@
 from os import path
 from datetime import datetime
 import fnmatch
+from ionogram_input import open_input, get_size, strip_compression
 from ionogram_visrc2t import IonogramVisrc2t
 from ionogram_shigaraki import IonogramShigaraki
 from ionogram_dps_amp import IonogramDpsAmp
@@ -42,9 +43,7 @@ class IonogramTester:
                 "class_name": "IonogramVisrc2t",
                 "patterns": [
                     "??????????????.rad",
-                    "??????????????.rad.bz2",
                     "??????????????.ig",
-                    "??????????????.ig.bz2",
                 ],
             },
         }
@@ -55,10 +54,10 @@ class IonogramTester:
     def examine(self, filename):
         self.__init__()
 
-        file_size = path.getsize(filename)
+        file_size = get_size(filename)
 
         try:
-            with open(filename) as f:
+            with open_input(filename, "rt") as f:
                 first_line = f.readline()
         except UnicodeDecodeError:
             first_line = ""
@@ -71,7 +70,7 @@ class IonogramTester:
                         self.points[key] += 1
             if "patterns" in self.FILE_FORMATS[key]:
                 for pattern in self.FILE_FORMATS[key]["patterns"]:
-                    (_, name) = path.split(filename)
+                    (_, name) = path.split(strip_compression(filename))
                     if fnmatch.fnmatch(name, pattern):
                         self.points[key] += 1
 
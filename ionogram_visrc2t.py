@@ -1,10 +1,9 @@
 import numpy as np
-from scipy import signal
 from datetime import datetime
 from struct import unpack
-import bz2
-from skimage.restoration import denoise_tv_chambolle
 from ionogram import Ionogram
+from ionogram_input import open_input, strip_compression
+from visrc2t_stream import RawDecoder, HEADER_SIZE, BUFFER_SIZE
 from colormaps import cmap_two_comp
 
 
@@ -22,118 +21,99 @@ class IonogramVisrc2t(Ionogram):
         self.cmap = cmap_two_comp
         self.ox_mode = True
 
-    def __read_raw_data(self, file_name):
-        open_proc = bz2.open if file_name.endswith(".bz2") else open
-        with open_proc(file_name, "rb") as file:
-            magic = unpack("4s", file.read(4))[0]
-            buffer = file.read(4 + 8 + 4 + 4 + 8 + 8)
-            (version, date, self.n_height, n_scan, self.rx_rate, rx_bandwidth) = unpack(
-                "<iQiidd", buffer
-            )
-
-            self.date = datetime.utcfromtimestamp(date)
-            self.ranges = [
-                h * 3e8 / self.rx_rate / 2 / 1000 for h in range(self.n_height)
-            ]
-
-            reserved = file.read(1024 - 8)
-
-            if self.debug_level > 0:
-                print(
-                    f"Version: {version}\n"
-                    f"Date: {date} ({self.date})\n"
-                    f"Number of heights: {self.n_height}\n"
-                    f"Number of scans: {n_scan}\n"
-                    f"RX rate: {self.rx_rate}\n"
-                    f"RX bandwidth: {rx_bandwidth}\n"
-                )
-
-            raw_data = []
+    def __read_raw_header(self, file):
+        """Read the header of a raw file, return the number of scans."""
+        decoder = RawDecoder(self.debug_level)
+        decoder.read_header(file.read(HEADER_SIZE))
+        self.__set_raw_header(decoder)
+        return decoder.n_scan
+
+    def __set_raw_header(self, decoder):
+        self.date = decoder.date
+        self.n_height = decoder.n_height
+        self.rx_rate = decoder.rx_rate
+        self.ranges = decoder.get_ranges()
+
+    def set_raw(self, decoder, n_columns=None):
+        """Take the ionogram from a decoder of a raw sounding (also a part
+        of it while it is received)."""
+        self.__set_raw_header(decoder)
+        self.frequencies = decoder.get_frequencies()[:n_columns]
+        self.n_freq = len(self.frequencies)
+        self.data = decoder.get_data(self.n_freq)
+        if decoder.is_complete():
+            self.data[0][0] = np.min(self.data)
+            self.data[-1][-1] = np.max(self.data)
+        self.invalidate_cache()
+
+    def set_raw_columns(self, frequencies, columns):
+        """Replace columns ({index: column}) received from a raw sounding.
+
+        Statistics are kept, the caller checks that columns are in their
+        range.
+        """
+        self.frequencies = frequencies
+        for i, column in columns.items():
+            self.data[:, i] = column
+        self.components = {}
+
+    def __read_raw_metadata(self, file_name):
+        """Read the header and scan headers of a raw file, seeking over samples."""
+        with open_input(file_name, "rb") as file:
+            n_scan = self.__read_raw_header(file)
+
+            dt = 1 / self.rx_rate
+            frequencies_hz = set()
+            n_height_new = self.n_height
             for _ in range(n_scan):
                 freq, amp, bittime, code_length = unpack("fffi", file.read(16))
+                file.seek(4 * 2 * code_length + 4 * 2 * 2 * self.n_height, 1)
+                frequencies_hz.add(freq)
+                if amp >= 1e-6:
+                    # length of "valid" convolution with the complementary code
+                    cc_length = int(bittime * code_length / dt)
+                    n_height_new = abs(self.n_height - cc_length) + 1
 
-                buffer = file.read(4 * code_length)
-                code_real = unpack("f" * code_length, buffer)
-                code_real = [x for i, x in enumerate(code_real) if i < code_length]
-                buffer = file.read(4 * code_length)
-                code_image = unpack("f" * code_length, buffer)
-                code_image = [x for i, x in enumerate(code_image) if i < code_length]
-
-                if self.debug_level > 1:
-                    print(
-                        f"Freq: {freq}\n"
-                        f"Amp: {amp}\n"
-                        f"Bittime: {bittime}\n"
-                        f"Code length: {code_length}\n"
-                        f"Code (Real part): {code_real}\n"
-                        f"Code (Image part): {code_image}\n"
-                        f"\n"
-                    )
-
-                sa = unpack("f" * 2 * self.n_height, file.read(4 * 2 * self.n_height))
-                sa = [complex(sa[i], sa[i + 1]) for i in range(0, len(sa), 2)]
-                sb = unpack("f" * 2 * self.n_height, file.read(4 * 2 * self.n_height))
-                sb = [complex(sb[i], sb[i + 1]) for i in range(0, len(sb), 2)]
-                raw_data.append(
-                    {
-                        "freq": freq,
-                        "amp": amp,
-                        "bittime": bittime,
-                        "code_real": code_real,
-                        "code_image": code_image,
-                        "sa": sa,
-                        "sb": sb,
-                    }
-                )
-            return raw_data
-
-    def __calc_code_complementary(self, code, bittime):
-        dt = 1 / self.rx_rate
-        code = list(reversed(code))
-        cc_length = int(bittime * len(code) / dt)
-        cc = [complex(0, code[int(dt * t / bittime)]) for t in range(cc_length)]
-        n_height_new = len(signal.convolve(np.zeros(self.n_height), cc, mode="valid"))
-        return cc, n_height_new
+        self.frequencies = np.array(sorted(frequencies_hz)) / 1e6
+        self.n_freq = len(self.frequencies)
+        self.shape = (n_height_new, self.n_freq)
 
     def load(self, file_name):
 
-        if file_name.endswith("rad.bz2") or file_name.endswith("rad"):
+        if strip_compression(file_name).endswith("rad"):
             self.__make_iono_from_raw(file_name)
-        elif file_name.endswith("ig.bz2") or file_name.endswith("ig"):
+        elif strip_compression(file_name).endswith("ig"):
             self.__load_ionogram(file_name)
 
         self.load_sunspot()
 
-    def __load_ionogram(self, file_name):
-        open_proc = bz2.open if file_name.endswith(".bz2") else open
-        with open_proc(file_name, "rt") as file:
-            header = [
-                s.replace("#", "").strip()
-                for s in file.readlines()
-                if s.startswith("#")
-            ]
+    def load_metadata(self, file_name):
+        if strip_compression(file_name).endswith("rad"):
+            self.__read_raw_metadata(file_name)
+        elif strip_compression(file_name).endswith("ig"):
+            header = []
+            with open_input(file_name, "rt") as file:
+                for s in file:
+                    if not s.startswith("#"):
+                        break
+                    header.append(s.replace("#", "").strip())
+            self.__read_header(header)
+            self.ranges = self.ranges[self.__get_min_height_index() :]
+            self.n_height = len(self.ranges)
+            self.shape = (self.n_height, len(self.frequencies))
 
-        parameters = dict()
-        for line in header:
-            if line.startswith("datetime: "):
-                d = line[line.index(":") + 2 :]
-                self.date = datetime.fromisoformat(d)
-            elif ":" in line:
-                key = line.split(":")[0].strip()
-                value = line.split(":")[1].strip()
-                parameters[key] = value
+        self.load_sunspot()
 
-        self.frequencies = [float(f) for f in parameters["freqs"].split()]
-        self.ranges = [float(h) for h in parameters["heights"].split()]
-        self.n_freq = float(parameters["n_freq"])
+    def __load_ionogram(self, file_name):
+        with open_input(file_name, "rt") as file:
+            lines = file.readlines()
+        header = [s.replace("#", "").strip() for s in lines if s.startswith("#")]
 
-        self.data = np.loadtxt(file_name)
+        self.__read_header(header)
 
-        min_h_index = 0
-        for r in self.ranges:
-            if r > 100:
-                break
-            min_h_index += 1
+        self.data = np.loadtxt(lines)
+
+        min_h_index = self.__get_min_height_index()
 
         self.ranges = self.ranges[min_h_index:]
         self.n_height = len(self.ranges)
@@ -160,74 +140,38 @@ class IonogramVisrc2t(Ionogram):
         # np.savetxt('out_y.txt', hist[0])
         # np.savetxt('out_x.txt', hist[1])
 
-    def __make_iono_from_raw(self, file_name):
-
-        raw_data = self.__read_raw_data(file_name)
-
-        frequencies_hz = list(set([d["freq"] for d in raw_data]))
-        frequencies_hz.sort()
-
-        self.n_freq = len(frequencies_hz)
-        self.frequencies = np.array(frequencies_hz) / 1e6
-
-        amplitudes_a = np.zeros((self.n_freq, self.n_height), dtype=complex)
-
-        amplitudes_b = np.zeros((self.n_freq, self.n_height), dtype=complex)
-
-        Is = np.zeros((self.n_freq, self.n_height), dtype=complex)
-
-        dt = 1 / self.rx_rate
-
-        for d in raw_data:
-            if d["amp"] < 1e-6:
-                continue
-
-            current_code = d["code_real"]
-            bittime = d["bittime"]
-            code_complementary, n_height_new = self.__calc_code_complementary(
-                current_code, bittime
-            )
-
-            if amplitudes_a.shape != (self.n_freq, n_height_new):
-                amplitudes_a.resize((self.n_freq, n_height_new))
-
-            if amplitudes_b.shape != (self.n_freq, n_height_new):
-                amplitudes_b.resize((self.n_freq, n_height_new))
-
-            if Is.shape != (self.n_freq, n_height_new):
-                Is.resize((self.n_freq, n_height_new))
-
-            sa = signal.convolve(d["sa"], code_complementary, mode="valid")
-            sb = signal.convolve(d["sb"], code_complementary, mode="valid")
-
-            pos = frequencies_hz.index(d["freq"])
-            amplitudes_a[pos] += np.array(sa)
-            amplitudes_b[pos] += np.array(sb)
-
-            Is[pos] += np.array(sa) * np.conj(np.array(sa)) + np.array(sb) * np.conj(
-                np.array(sb)
-            )
-
-        Vs = [None] * len(frequencies_hz)
-        IIs = [None] * len(frequencies_hz)
-
-        for f, freq in enumerate(frequencies_hz):
-            Vs[f] = [
-                1 if x < 0 else -1
-                for x in 2 * (amplitudes_a[f] * np.conj(amplitudes_b[f])).real
-            ]
-
-            IIs[f] = [z.real**1e-2 for z in Is[f]]
-
-            average = np.average(IIs[f])
-            IIs[f] = [x - average for x in IIs[f]]
+    def __read_header(self, header):
+        parameters = dict()
+        for line in header:
+            if line.startswith("datetime: "):
+                d = line[line.index(":") + 2 :]
+                self.date = datetime.fromisoformat(d)
+            elif ":" in line:
+                key = line.split(":")[0].strip()
+                value = line.split(":")[1].strip()
+                parameters[key] = value
 
-            IIs[f] = [x * v for (x, v) in zip(IIs[f], Vs[f])]
+        self.frequencies = [float(f) for f in parameters["freqs"].split()]
+        self.ranges = [float(h) for h in parameters["heights"].split()]
+        self.n_freq = float(parameters["n_freq"])
 
-        self.data = np.flip(np.array(IIs).T, 0)
+    def __get_min_height_index(self):
+        min_h_index = 0
+        for r in self.ranges:
+            if r > 100:
+                break
+            min_h_index += 1
+        return min_h_index
 
-        self.data[0][0] = np.min(IIs)
-        self.data[-1][-1] = np.max(IIs)
+    def __make_iono_from_raw(self, file_name):
+        decoder = RawDecoder(self.debug_level)
+        with open_input(file_name, "rb") as file:
+            while data := file.read(BUFFER_SIZE):
+                decoder.feed(data)
+        decoder.finish()
+        if decoder.date is None:
+            raise ValueError(f"{file_name}: incomplete header")
+        self.set_raw(decoder)
 
     def get_extent(self):
         left = self.freq_to_coord(self.frequencies[0])
@@ -269,6 +213,7 @@ class IonogramVisrc2t(Ionogram):
         return len(self.frequencies) - 2
 
     def clean_ionogram(self):
+        from skimage.restoration import denoise_tv_chambolle
 
         self.data = denoise_tv_chambolle(self.data, weight=0.005)
 
@@ -279,3 +224,5 @@ class IonogramVisrc2t(Ionogram):
 
         self.data[0][0] = -max_abs
         self.data[-1][-1] = max_abs
+
+        self.invalidate_cache()
@@ -11,12 +11,12 @@ class JsonFileIO:
         pass
 
     @staticmethod
-    def save(filename: str, iono: Ionogram, traces: Iterable):
-
+    def to_json_data(iono: Ionogram, traces: Iterable):
+        """Return data of the JSON file (ionogram parameters and traces by UT date)."""
         date_ut = iono.date - datetime.timedelta(hours=iono.timezone)
         date_str = date_ut.isoformat()
 
-        json_data = {
+        return {
             date_str: {
                 "station_name": iono.get_station_name(),
                 "latitude": iono.lat,
@@ -30,6 +30,11 @@ class JsonFileIO:
             }
         }
 
+    @staticmethod
+    def save(filename: str, iono: Ionogram, traces: Iterable):
+
+        json_data = JsonFileIO.to_json_data(iono, traces)
+
         try:
             with open(filename, "wt", encoding="utf-8") as file:
                 json.dump(json_data, file, indent=4)
@@ -0,0 +1,77 @@
+import numpy as np
+from matplotlib.colors import Normalize
+from colormaps import get_colormap
+
+
+def get_value_range(iono):
+    """Return the range of values of all data an ionogram is displayed
+    with (the whole data and its O/X components)."""
+    statistics = iono.get_statistics()
+    low, high = statistics.min, statistics.max
+    if iono.ox_mode:
+        # A component is zero where the other one is
+        low, high = min(low, 0.0), max(high, 0.0)
+    return low, high
+
+
+class LutRenderer:
+    """Renders ionograms to RGBA through a colour lookup table.
+
+    Data is quantized once to LEVELS levels over the range of values
+    (low..high); indices are kept per key and NaN gets the last index,
+    drawn with the "bad" colour of the colormap. A contrast change only
+    builds the LUT again (LEVELS + 1 entries through Normalize and the
+    colormap), zoom and pan only repeat the gather.
+    """
+
+    LEVELS = 4096
+
+    def __init__(self, cmap, low, high):
+        self.cmap = get_colormap(cmap)
+        self.low = float(low)
+        self.high = float(high)
+        self.indices = {}
+        self.clim = None
+        self.lut = None
+
+    def quantize(self, data):
+        data = np.asarray(data, dtype=float)
+        if not self.high > self.low:
+            indices = np.zeros(data.shape)
+        else:
+            indices = np.floor((data - self.low) * (self.LEVELS / (self.high - self.low)))
+            np.clip(indices, 0, self.LEVELS - 1, out=indices)
+        indices[np.isnan(data)] = self.LEVELS
+        return indices.astype(np.uint16)
+
+    def set_clim(self, vmin, vmax):
+        if self.clim == (vmin, vmax):
+            return
+        self.clim = (vmin, vmax)
+        # Values of level centres, NaN for the last index
+        step = (self.high - self.low) / self.LEVELS
+        values = np.append(self.low + step * (np.arange(self.LEVELS) + 0.5), np.nan)
+        self.lut = self.cmap(Normalize(vmin, vmax)(values), bytes=True)
+
+    def get_indices(self, key, data):
+        if key not in self.indices:
+            self.indices[key] = self.quantize(data)
+        return self.indices[key]
+
+    def update_columns(self, key, levels, changed):
+        """Quantize again columns of pyramid levels changed for one display
+        key ({level: columns}); indices of other keys are dropped."""
+        for index_key in list(self.indices):
+            display_key, level = index_key
+            if display_key != key:
+                del self.indices[index_key]
+            elif level in changed:
+                columns = changed[level]
+                self.indices[index_key][:, columns] = self.quantize(levels[level][:, columns])
+
+    def render(self, key, data, vmin, vmax, window=None):
+        self.set_clim(vmin, vmax)
+        indices = self.get_indices(key, data)
+        if window is not None:
+            indices = indices[window]
+        return self.lut[indices]
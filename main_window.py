@@ -1,8 +1,12 @@
 import sys
 import os
+import time
+import numpy as np
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from PySide6.QtGui import QFont, QIcon, QCursor
-from PySide6.QtCore import Qt, QSize, QTimer
+from PySide6.QtGui import QFont, QIcon, QCursor, QAction
+from PySide6.QtCore import Qt, QSize, QTimer, Signal
 from PySide6.QtWidgets import (
     QMainWindow,
     QApplication,
@@ -10,18 +14,32 @@ from PySide6.QtWidgets import (
     QMenu,
     QMessageBox,
     QSpinBox,
+    QDoubleSpinBox,
 )
 from matplotlib import use as matplotlib_backend_use
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-import numpy as np
-from ionogram_tester import IonogramTester
+from matplotlib.patches import Rectangle
 from ui_MainWnd import Ui_mainWindow
 from remote_window import RemoteWindow
-from file_navigator import FileNavigator
+from summary_window import SummaryWindow
+from directory_watcher import DirectoryWatcher
+from visrc2t_stream import RawSoundingReader
+from ionogram_playback import FrameBuffer, RateMeter, render_frame
+from ionogram_visrc2t import IonogramVisrc2t
+from file_navigator import FileNavigator, list_members
 from std_file_format import STDFileIO
 from json_file_format import JsonFileIO
 from ionospheric_layer_trace import IonosphericLayerTrace, IonosphericLayers
+from trace_point_index import TracePointIndex
+from lut_renderer import LutRenderer, get_value_range
+from ionogram_pyramid import IonogramPyramid
+from ionogram_canvas import IonogramCanvas
+from ionogram_plot import save_ionogram_image
+from colormaps import get_colormap
+from ionogram_io import open_ionogram
+from ionogram_input import split_member_path, get_sidecar_name
+from ionogram_container import is_container, open_container
 from program_version import PROGRAM_VERSION
 
 DATE_TIME_FORMAT = "yyyy-MM-dd hh:mm:ss"
@@ -29,6 +47,14 @@ DATE_TIME_FORMAT = "yyyy-MM-dd hh:mm:ss"
 
 class MainWindow(QMainWindow, Ui_mainWindow):
 
+    # A new file of the watched directory is written
+    live_file_ready = Signal(str)
+    # Columns of a raw sounding being received are decoded
+    raw_columns_ready = Signal()
+    # A file requested by navigation is decoded: generation, file name and
+    # the ionogram (or the exception)
+    file_loaded = Signal(int, str, object)
+
     def __init__(self, program_configuration):
 
         super().__init__()
@@ -53,7 +79,36 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         self.f1_min = None
         self.e_min = None
 
+        self.file_navigator = None
+        self.remote_window = None
+        self.summary_window = None
+        self.watcher = None
+        self.raw_reader = None
+        # Traces as they were loaded or saved, see traces_modified
+        self.saved_traces = None
+        self.player = None
+        self.play_clock = None
+        self.play_frame = None
+        self.play_origin = None
+        self.play_artists = []
+
+        self.loader = ThreadPoolExecutor(max_workers=1)
+        self.load_future = None
+        self.load_generation = 0
+        self.load_target = None
+
         self.im_iono = None
+        self.renderer = None
+        self.pyramids = {}
+        self.pan_start = None
+
+        self.trace_index = TracePointIndex()
+        self.trace_items = {}
+        self.trace_key = 0
+        self.drag_key = None
+        self.drag_row = None
+        self.rubber_band = None
+        self.rubber_band_start = None
 
         self.f2_color = self.program_configuration.f2_color
         self.f1_color = self.program_configuration.f1_color
@@ -71,6 +126,57 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         self.level_spin_box.setToolTip("Level (from 10 to 100%)")
         self.toolBar.addWidget(self.level_spin_box)
 
+        self.percentile_spin_box = QDoubleSpinBox()
+        self.percentile_spin_box.setSuffix("%")
+        self.percentile_spin_box.setRange(90, 100)
+        self.percentile_spin_box.setSingleStep(0.1)
+        self.percentile_spin_box.setDecimals(1)
+        self.percentile_spin_box.setValue(100)
+        self.percentile_spin_box.setToolTip(
+            "Contrast percentile (from 90 to 100%, cuts off single hot pixels)"
+        )
+        self.toolBar.addWidget(self.percentile_spin_box)
+
+        self.fps_spin_box = QSpinBox()
+        self.fps_spin_box.setSuffix(" fps")
+        self.fps_spin_box.setRange(1, 50)
+        self.fps_spin_box.setValue(self.program_configuration.playback_fps)
+        self.fps_spin_box.setToolTip("Frame rate of playback")
+        self.toolBar.addWidget(self.fps_spin_box)
+
+        self.actionLive = QAction("Live mode", self)
+        self.actionLive.setCheckable(True)
+        self.actionLive.setToolTip(
+            "Add new files of the directory to the list as they are written"
+        )
+        toolbar_actions = self.toolBar.actions()
+        self.toolBar.insertAction(
+            toolbar_actions[toolbar_actions.index(self.actionLast) + 1], self.actionLive
+        )
+        self.menuView.addAction(self.actionLive)
+
+        self.actionPlay = QAction("Play", self)
+        self.actionPlay.setCheckable(True)
+        self.actionPlay.setToolTip("Play ionograms of the directory in time order")
+        toolbar_actions = self.toolBar.actions()
+        self.toolBar.insertAction(
+            toolbar_actions[toolbar_actions.index(self.actionLive) + 1], self.actionPlay
+        )
+        self.menuView.addAction(self.actionPlay)
+
+        self.actionSummary = QAction("Day summary...", self)
+        self.actionSummary.setToolTip(
+            "Show a frequency-time image of all ionograms of the directory"
+        )
+        self.menuView.addAction(self.actionSummary)
+        self.play_timer = QTimer(self)
+
+        self.actionFollowRaw = QAction("Follow raw sounding...", self)
+        self.actionFollowRaw.setToolTip(
+            "Show a raw VISRC2-t sounding (.rad) while it is being written"
+        )
+        self.menu_File.insertAction(self.actionSave, self.actionFollowRaw)
+
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.timer_mouse_cursor_proc)
         self.timer.start(250)
@@ -79,12 +185,19 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 
         self.change_mode(0)  # F2
 
+        self.native_canvas = self.program_configuration.backend == "qt"
         self.figure = plt.figure()
-        self.canvas = FigureCanvas(self.figure)
+        if self.native_canvas:
+            self.canvas = IonogramCanvas(self.program_configuration.font_size)
+        else:
+            self.canvas = FigureCanvas(self.figure)
         self.horizontalLayout.addWidget(self.canvas)
         self.is_cross = False
         self.canvas.mpl_connect("button_press_event", self.onclick)
         self.canvas.mpl_connect("motion_notify_event", self.onmove)
+        self.canvas.mpl_connect("button_release_event", self.onrelease)
+        self.canvas.mpl_connect("scroll_event", self.onscroll)
+        self.canvas.mpl_connect("resize_event", self.onresize)
 
         traces_list_widgets = [
             self.listWidgetE,
@@ -178,12 +291,311 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         self.pngCheckBox.stateChanged.connect(self.png_state_changed)
 
         self.actionRemote.triggered.connect(self.remote)
+        self.actionLive.toggled.connect(self.live_mode_toggled)
+        self.live_file_ready.connect(self.live_file_added)
+        self.actionFollowRaw.triggered.connect(self.follow_raw_dialog)
+        self.raw_columns_ready.connect(self.raw_columns_received)
+        self.actionPlay.toggled.connect(self.play_toggled)
+        self.actionSummary.triggered.connect(self.day_summary)
+        self.play_timer.timeout.connect(self.playback_tick)
+        self.fps_spin_box.valueChanged.connect(self.fps_changed)
+        self.file_loaded.connect(self.file_load_finished)
 
         self.level_spin_box.valueChanged.connect(self.scale_change)
+        self.percentile_spin_box.valueChanged.connect(self.scale_change)
 
     def close_window(self):
+        self.stop_watcher()
+        self.stop_raw_reader()
+        self.stop_playback(reopen=False)
+        self.loader.shutdown(wait=False, cancel_futures=True)
+        if self.summary_window is not None:
+            self.summary_window.reject()
         sys.exit()
 
+    def live_mode_toggled(self, checked):
+        if checked:
+            if self.file_navigator is None or split_member_path(self.file_name)[1]:
+                self.actionLive.setChecked(False)
+                self.show_error("Open an ionogram file of the directory to watch.")
+                return
+            self.start_watcher()
+        else:
+            self.stop_watcher()
+
+    def start_watcher(self):
+        self.stop_watcher()
+        # Called in the watcher thread, the signal passes files to the GUI
+        self.watcher = DirectoryWatcher(
+            self.file_navigator.directory, self.live_file_ready.emit
+        )
+        self.watcher.start()
+
+    def stop_watcher(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def live_file_added(self, file_name):
+        if self.watcher is None or self.file_navigator is None:
+            return
+        was_last = self.file_navigator.file_list[-1:] == [self.file_navigator.file_name]
+        if not self.file_navigator.add_file(file_name):
+            return
+        # The newest ionogram is opened only if the last one is shown, so
+        # browsing of older files is not interrupted
+        is_last = os.path.basename(self.file_navigator.file_list[-1]) == os.path.basename(
+            file_name
+        )
+        if self.program_configuration.live_open_newest and was_last and is_last:
+            if self.traces_modified():
+                # Traces being edited are not discarded
+                self.statusbar.showMessage(
+                    f"New ionogram: {os.path.basename(file_name)} (traces are not saved)"
+                )
+            else:
+                self.open_file(self.file_navigator.last())
+
+    def follow_raw_dialog(self):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, filter="Raw soundings (*.rad);;All files (*)"
+        )
+        if file_name:
+            self.follow_raw(file_name)
+
+    def follow_raw(self, source):
+        """Show a raw sounding while it is received from a file being
+        written or from a (host, port) address."""
+        self.close_file()
+        # Called in the reader thread, the signal passes columns to the GUI
+        self.raw_reader = RawSoundingReader(source, self.raw_columns_ready.emit)
+        self.raw_reader.start()
+        name = source if isinstance(source, str) else "{}:{}".format(*source)
+        self.setWindowTitle(f"{self.program_name} - {name} (receiving)")
+
+    def stop_raw_reader(self):
+        if self.raw_reader is not None:
+            self.raw_reader.stop()
+            self.raw_reader = None
+
+    def raw_columns_received(self):
+        reader = self.raw_reader
+        if reader is None:
+            return
+        if reader.error is not None:
+            self.stop_raw_reader()
+            self.show_error(f"Raw sounding is not received: {reader.error}")
+            return
+        complete = reader.is_complete() or not reader.thread.is_alive()
+        frequencies, columns = reader.take_changes()
+        if self.iono is None:
+            if not columns and not complete:
+                return
+            self.iono = IonogramVisrc2t()
+            reader.make_ionogram(self.iono)
+            self.iono.load_sunspot()
+            if isinstance(reader.source, str):
+                self.file_name = reader.source
+                self.file_navigator = FileNavigator(self.file_name)
+            self.show_ionogram()
+            if not complete:
+                self.setWindowTitle(f"{self.windowTitle()} (receiving)")
+        elif complete or not self.update_columns(frequencies, columns):
+            extent = self.iono.get_extent()
+            reader.make_ionogram(self.iono)
+            self.refresh_ionogram(extent)
+        if complete:
+            self.stop_raw_reader()
+            self.setWindowTitle(self.windowTitle().removesuffix(" (receiving)"))
+
+    def update_columns(self, frequencies, columns):
+        """Redraw only changed columns of the ionogram, return False if the
+        whole ionogram is to be drawn again (its shape or range changed)."""
+        if not columns:
+            return True
+        statistics = self.iono.get_statistics()
+        values = np.concatenate(list(columns.values()))
+        # Values slightly out of the range are clipped until the ionogram
+        # is drawn again
+        margin = 0.1 * (statistics.max - statistics.min)
+        if (
+            len(frequencies) != self.iono.get_shape()[1]
+            or len(values) != len(columns) * self.iono.get_shape()[0]
+            or values.min() < statistics.min - margin
+            or values.max() > statistics.max + margin
+        ):
+            return False
+        self.iono.set_raw_columns(frequencies, columns)
+
+        key = self.get_display_key()
+        pyramid = self.pyramids.get(key)
+        self.pyramids = {}
+        if pyramid is not None:
+            changed = pyramid.update_columns(self.get_display_data(), list(columns))
+            self.pyramids[key] = pyramid
+            if self.renderer:
+                self.renderer.update_columns(key, pyramid.levels, changed)
+        elif self.renderer:
+            self.renderer.update_columns(key, [], {})
+        self.set_freq_ticks(self.iono.get_freq_tics(), self.iono.get_freq_labels())
+        self.update_image()
+        return True
+
+    def refresh_ionogram(self, previous_extent):
+        """Draw the ionogram again after its data are changed, keeping the
+        view if the extent is the same."""
+        extent = self.iono.get_extent()
+        self.renderer = self.create_renderer()
+        self.pyramids = {}
+        self.set_freq_ticks(self.iono.get_freq_tics(), self.iono.get_freq_labels())
+        if extent == previous_extent:
+            self.update_image()
+        else:
+            self.set_view(extent[:2], extent[2:])
+
+    def set_freq_ticks(self, tics, labels):
+        if self.native_canvas:
+            self.canvas.set_freq_ticks(tics, labels)
+        else:
+            # Ticks out of the view would widen it
+            xlim = self.ax.get_xlim()
+            self.ax.set_xticks(tics)
+            self.ax.set_xticklabels(labels, fontsize=self.program_configuration.font_size)
+            self.ax.set_xlim(*xlim)
+
+    def play_toggled(self, checked):
+        if checked:
+            if not self.file_name or self.file_navigator is None:
+                self.actionPlay.setChecked(False)
+                self.show_error("Open an ionogram of the sequence to play.")
+                return
+            self.start_playback()
+        else:
+            self.stop_playback()
+
+    def start_playback(self):
+        """Play files of the list from the next one; frames are decoded and
+        rendered ahead for the current view size, level and contrast."""
+        file_names = self.file_navigator.file_list
+        start = self.file_navigator.index() + 1
+        if start >= len(file_names):
+            start = 0
+        width, height = self.get_view_size()
+        render = partial(
+            render_frame,
+            width=width,
+            height=height,
+            level=self.level_spin_box.value() / 100,
+            percentile=self.percentile_spin_box.value(),
+            key=self.get_display_key(),
+        )
+        self.play_origin = self.file_name
+        self.close_file()
+        self.player = FrameBuffer(
+            file_names,
+            start,
+            render,
+            self.program_configuration.playback_workers,
+            self.program_configuration.playback_buffer,
+        )
+        self.play_meter = RateMeter()
+        self.play_dropped = 0
+        self.play_errors = 0
+        self.play_frame = None
+        self.fps_changed(self.fps_spin_box.value())
+
+    def stop_playback(self, reopen=True):
+        """Stop playback and open the last shown file for scaling."""
+        if self.player is None:
+            return
+        self.play_timer.stop()
+        self.player.close()
+        self.player = None
+        self.actionPlay.blockSignals(True)
+        self.actionPlay.setChecked(False)
+        self.actionPlay.blockSignals(False)
+        for artist in self.play_artists:
+            artist.remove()
+        self.play_artists = []
+        self.statusbar.showMessage("")
+        file_name = self.play_frame.file_name if self.play_frame else self.play_origin
+        self.play_frame = None
+        if reopen:
+            self.open_file(file_name)
+
+    def fps_changed(self, fps):
+        if self.player is None:
+            return
+        # The clock starts again at the next frame
+        self.play_clock = None
+        self.play_timer.start(max(500 // fps, 1))
+
+    def playback_tick(self):
+        fps = self.fps_spin_box.value()
+        if self.play_clock is None:
+            index = self.player.get_next_index()
+        else:
+            start_time, start_index = self.play_clock
+            index = start_index + int((time.monotonic() - start_time) * fps)
+        frame, dropped, errors = self.player.take(index)
+        self.play_dropped += dropped
+        self.play_errors += errors
+        if frame is not None:
+            if self.play_clock is None:
+                self.play_clock = (time.monotonic(), frame.index)
+            self.show_frame(frame)
+            self.play_meter.tick()
+
+        message = (
+            f"Playback: {self.play_meter.get_rate():.1f} of {fps} fps, "
+            f"{self.play_dropped} frames dropped"
+        )
+        if self.play_errors:
+            message += f", {self.play_errors} files not loaded"
+        self.statusbar.showMessage(message)
+        if self.player.is_finished():
+            self.stop_playback()
+
+    def show_frame(self, frame):
+        self.play_frame = frame
+        self.setWindowTitle(f"{self.program_name} - {frame.file_name}")
+        left, right, bottom, top = frame.extent
+        colors = self.get_trace_colors()
+        if self.native_canvas:
+            self.canvas.set_view((left, right), (bottom, top))
+            self.canvas.set_freq_ticks(frame.tics, frame.labels)
+            for layer in colors:
+                xs, ys = frame.points.get(layer, ([], []))
+                self.canvas.set_points(layer, xs, ys, colors[layer])
+                self.canvas.set_line(layer, frame.lines.get(layer), colors[layer])
+            self.canvas.set_image(frame.image, frame.image_extent)
+            return
+
+        if self.ax is None:
+            self.ax = self.figure.add_subplot(111)
+            self.im_iono = self.ax.imshow(
+                frame.image,
+                interpolation="nearest",
+                extent=frame.image_extent,
+                aspect="auto",
+            )
+            self.ax.set_autoscale_on(False)
+            plt.yticks(fontsize=self.program_configuration.font_size)
+        else:
+            self.im_iono.set_data(frame.image)
+            self.im_iono.set_extent(frame.image_extent)
+        for artist in self.play_artists:
+            artist.remove()
+        self.play_artists = []
+        for layer, (xs, ys) in frame.points.items():
+            self.play_artists.append(self.ax.scatter(xs, ys, c=colors[layer]))
+        for layer, x in frame.lines.items():
+            self.play_artists += self.ax.plot([x, x], [bottom, top], c=colors[layer])
+        self.ax.set_xlim(left, right)
+        self.ax.set_ylim(bottom, top)
+        self.set_freq_ticks(frame.tics, frame.labels)
+        self.canvas.draw()
+
     def timer_mouse_cursor_proc(self):
         is_over = self.canvas.underMouse()
         if self.iono and is_over:
@@ -322,29 +734,126 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 if f <= self.iono.coord_to_freq(self.iono.get_extent()[1] - 1):
                     self.doubleSpinBoxEs.setValue(f)
 
+    def get_clim(self):
+        statistics = self.iono.get_statistics()
+        vmin, vmax = statistics.get_limits(self.percentile_spin_box.value())
+        level = self.level_spin_box.value() / 100
+        return vmin * level, vmax * level
+
+    def create_renderer(self):
+        if not (self.program_configuration.fast_rendering or self.native_canvas):
+            return None
+        return LutRenderer(self.iono.cmap, *get_value_range(self.iono))
+
+    def get_pyramid(self):
+        key = self.get_display_key()
+        if key not in self.pyramids:
+            self.pyramids[key] = IonogramPyramid(
+                self.get_display_data(), self.iono.get_extent()
+            )
+        return self.pyramids[key]
+
+    def render_image(self):
+        """Return the image for the visible area and its extent."""
+        pyramid = self.get_pyramid()
+        level, window, extent = pyramid.get_view(
+            self.get_xlim(), self.get_ylim(), *self.get_view_size()
+        )
+        if self.renderer:
+            vmin, vmax = self.get_clim()
+            image = self.renderer.render(
+                (self.get_display_key(), level),
+                pyramid.levels[level],
+                vmin,
+                vmax,
+                window,
+            )
+        else:
+            image = pyramid.levels[level][window]
+        return image, extent
+
+    def update_image(self):
+        image, extent = self.render_image()
+        if self.native_canvas:
+            self.canvas.set_image(image, extent)
+        else:
+            self.im_iono.set_data(image)
+            self.im_iono.set_extent(extent)
+            if not self.renderer:
+                vmin, vmax = self.get_clim()
+                self.im_iono.set_clim(vmin=vmin, vmax=vmax)
+        self.canvas.draw()
+
+    def get_xlim(self):
+        return self.canvas.get_xlim() if self.native_canvas else self.ax.get_xlim()
+
+    def get_ylim(self):
+        return self.canvas.get_ylim() if self.native_canvas else self.ax.get_ylim()
+
+    def get_view_size(self):
+        if self.native_canvas:
+            return self.canvas.get_view_size()
+        return self.ax.bbox.width, self.ax.bbox.height
+
+    def get_transform(self):
+        return self.canvas.get_transform() if self.native_canvas else self.ax.transData
+
     def scale_change(self):
         if self.iono:
-            self.im_iono.set_clim(
-                vmax=np.max(self.iono.get_data()) * self.level_spin_box.value() / 100,
-                vmin=np.min(self.iono.get_data()) * self.level_spin_box.value() / 100,
-            )
-            self.figure.canvas.draw()
+            self.update_image()
 
     def clean_ionogram(self):
 
         if self.iono:
             self.iono.clean_ionogram()
-
-            self.im_iono.set_data(self.iono.get_data())
-
-            self.im_iono.set_clim(
-                vmin=np.min(self.iono.get_data()), vmax=np.max(self.iono.get_data())
-            )
-            self.figure.canvas.draw()
+            self.renderer = self.create_renderer()
+            self.pyramids = {}
+            self.update_image()
 
     def remote(self):
-        wnd = RemoteWindow()
-        wnd.exec()
+        # The dialog is not modal, ionograms may be browsed during import
+        if self.remote_window is None:
+            self.remote_window = RemoteWindow(self)
+            self.remote_window.file_saved.connect(self.remote_file_saved)
+        self.remote_window.show()
+        self.remote_window.raise_()
+        self.remote_window.activateWindow()
+
+    def day_summary(self):
+        # The dialog is not modal, a click on it opens an ionogram here
+        if self.file_navigator is None or not self.file_navigator.file_list:
+            self.show_error("Open an ionogram file of the directory to summarize.")
+            return
+        file_names = self.file_navigator.file_list
+        if self.summary_window is None or self.summary_window.file_names != file_names:
+            if self.summary_window is not None:
+                self.summary_window.reject()
+            self.summary_window = SummaryWindow(
+                file_names, self.program_configuration.summary_workers, self
+            )
+            self.summary_window.file_selected.connect(self.request_file)
+        else:
+            self.summary_window.resume()
+        self.summary_window.show()
+        self.summary_window.raise_()
+        self.summary_window.activateWindow()
+
+    def remote_file_saved(self, file_name):
+        if self.file_navigator is not None:
+            self.file_navigator.add_file(file_name)
+
+    def closeEvent(self, event):
+        self.stop_watcher()
+        self.stop_raw_reader()
+        self.stop_playback(reopen=False)
+        self.load_target = None
+        self.loader.shutdown(wait=False, cancel_futures=True)
+        if self.remote_window is not None:
+            self.remote_window.reject()
+            self.remote_window.wait_import()
+        if self.summary_window is not None:
+            self.summary_window.reject()
+        super().closeEvent(event)
 
     def png_state_changed(self, state):
         s = state == Qt.CheckState.Checked
@@ -403,6 +912,13 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         self.listWidgetF2.clear()
         self.listWidgetEs.clear()
 
+        self.trace_index = TracePointIndex()
+        self.trace_items = {}
+        self.drag_key = None
+        self.drag_row = None
+        self.rubber_band = None
+        self.rubber_band_start = None
+
         self.radioButtonF2.setChecked(True)
         _ = [e.setEnabled(False) for e in self.properties_of_iono]
 
@@ -418,6 +934,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 self.sender().takeItem(item)
             elif r is delete_all_action:
                 self.sender().clear()
+            self.rebuild_trace_index()
             self.plot_scatters()
 
     def change_mode(self, mode):
@@ -457,44 +974,115 @@ class MainWindow(QMainWindow, Ui_mainWindow):
             self.listWidgetEs.setEnabled(True)
             self.buttonClearEs.setEnabled(True)
 
+    def get_trace_widgets(self):
+        return {
+            0: self.listWidgetF2,
+            1: self.listWidgetF1,
+            2: self.listWidgetE,
+            3: self.listWidgetEs,
+        }
+
+    def get_trace_scatters(self):
+        return {
+            0: self.f2_scatter,
+            1: self.f1_scatter,
+            2: self.e_scatter,
+            3: self.es_scatter,
+        }
+
+    def add_trace_point(self, layer, line):
+        widget = self.get_trace_widgets()[layer]
+        widget.addItem(line)
+        item = widget.item(widget.count() - 1)
+        self.trace_key += 1
+        item.setData(Qt.ItemDataRole.UserRole, self.trace_key)
+        self.trace_items[self.trace_key] = item
+        f, h = [float(v) for v in line.split()]
+        self.trace_index.add(self.trace_key, layer, self.iono.freq_to_coord(f), h)
+
+    def remove_trace_point(self, key):
+        layer = self.trace_index.get_layer(key)
+        widget = self.get_trace_widgets()[layer]
+        widget.takeItem(widget.row(self.trace_items.pop(key)))
+        self.trace_index.remove(key)
+
+    def get_traces(self):
+        """Return points and critical frequencies of the traces."""
+        points = tuple(
+            tuple(widget.item(i).text() for i in range(widget.count()))
+            for widget in self.get_trace_widgets().values()
+        )
+        frequencies = (
+            self.doubleSpinBoxF2.value(),
+            self.doubleSpinBoxF1.value(),
+            self.doubleSpinBoxE.value(),
+            self.doubleSpinBoxEs.value(),
+        )
+        return points, frequencies
+
+    def traces_modified(self):
+        """Return True if traces are changed after they were loaded or saved."""
+        return self.iono is not None and self.get_traces() != self.saved_traces
+
+    def rebuild_trace_index(self):
+        self.trace_index.clear()
+        self.trace_items = {}
+        for layer, widget in self.get_trace_widgets().items():
+            for i in range(widget.count()):
+                item = widget.item(i)
+                self.trace_key += 1
+                item.setData(Qt.ItemDataRole.UserRole, self.trace_key)
+                self.trace_items[self.trace_key] = item
+                f, h = [float(v) for v in item.text().split()]
+                self.trace_index.add(
+                    self.trace_key, layer, self.iono.freq_to_coord(f), h
+                )
+
+    def find_trace_point(self, event, layers=None):
+        self.trace_index.set_transform(self.get_transform())
+        return self.trace_index.nearest(
+            event.x, event.y, self.program_configuration.pick_radius, layers
+        )
+
     def onclick(self, event):
-        if event.ydata and event.xdata:
+        if event.ydata and event.xdata and self.iono:
             f = round(self.iono.coord_to_freq(event.xdata), 2)
             h = event.ydata
             s = f"{f:5.2f} {h:5.1f}"
 
             modifiers = QApplication.keyboardModifiers()
 
-            if event.button == 1:
+            if event.button == 2:
+                self.pan_start = (
+                    event.x,
+                    event.y,
+                    self.get_xlim(),
+                    self.get_ylim(),
+                )
+                return
 
-                widgets = {
-                    0: self.listWidgetF2,
-                    1: self.listWidgetF1,
-                    2: self.listWidgetE,
-                    3: self.listWidgetEs,
-                }
-                widget = widgets[self.mode]
+            if event.button == 1:
 
                 if modifiers == Qt.KeyboardModifier.ControlModifier:
-
-                    def find_closest_point_index(new_point, points):
-                        points = np.array(points)
-                        distances = np.linalg.norm(points - new_point, axis=1)
-                        index = np.argmin(distances)
-                        return index
-
-                    layer_lines = [widget.item(i).text() for i in range(widget.count())]
-                    if layer_lines:
-                        points = [[float(v) for v in x.split()] for x in layer_lines]
-                        point_index = find_closest_point_index([f, h], points)
-                        if (
-                            abs(f - points[point_index][0]) < 0.05
-                            and abs(h - points[point_index][1]) < 5
-                        ):
-                            widget.takeItem(point_index)
+                    # delete the closest point or start rubber band selection
+                    key = self.find_trace_point(event, {self.mode})
+                    if key is not None:
+                        self.remove_trace_point(key)
+                    else:
+                        self.start_rubber_band(event)
+                        return
+
+                elif modifiers == Qt.KeyboardModifier.ShiftModifier:
+                    # start dragging of the closest point
+                    key = self.find_trace_point(event, {self.mode})
+                    if key is not None:
+                        widget = self.get_trace_widgets()[self.mode]
+                        self.drag_key = key
+                        self.drag_row = widget.row(self.trace_items[key])
+                    return
 
                 else:
-                    widget.addItem(s)
+                    self.add_trace_point(self.mode, s)
 
             elif event.button == 3:
 
@@ -517,50 +1105,153 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 
             self.plot_scatters()
 
+    def onrelease(self, event):
+        if self.pan_start is not None:
+            self.pan_start = None
+
+        elif self.drag_key is not None:
+            self.drag_key = None
+            self.drag_row = None
+            self.plot_scatters()
+
+        elif self.rubber_band is not None:
+            x0, y0 = self.rubber_band_start
+            x1, y1 = event.x, event.y
+            self.trace_index.set_transform(self.get_transform())
+            for key in self.trace_index.in_rectangle(x0, y0, x1, y1, {self.mode}):
+                self.remove_trace_point(key)
+            if self.native_canvas:
+                self.canvas.set_rubber_band(None)
+            else:
+                self.rubber_band.remove()
+            self.rubber_band = None
+            self.rubber_band_start = None
+            self.plot_scatters()
+
+    def drag_trace_point(self, event):
+        # The point is kept as it is labelled (and saved)
+        f = round(self.iono.coord_to_freq(event.xdata), 2)
+        h = round(event.ydata, 1)
+        x = self.iono.freq_to_coord(f)
+        self.trace_items[self.drag_key].setText(f"{f:5.2f} {h:5.1f}")
+        self.trace_index.move(self.drag_key, x, h)
+
+        if self.native_canvas:
+            self.canvas.move_point(self.mode, self.drag_row, x, h)
+        else:
+            scatter = self.get_trace_scatters()[self.mode]
+            offsets = scatter.get_offsets()
+            offsets[self.drag_row] = (x, h)
+            scatter.set_offsets(offsets)
+        self.canvas.draw_idle()
+
+    def set_view(self, xlim, ylim):
+        """Set axes limits kept inside the ionogram and redraw the visible part."""
+        left, right, bottom, top = self.iono.get_extent()
+
+        def clamp(low, high, min_value, max_value):
+            width = min(high - low, max_value - min_value)
+            low = min(max(low, min_value), max_value - width)
+            return low, low + width
+
+        xlim = clamp(*xlim, left, right)
+        ylim = clamp(*ylim, bottom, top)
+        if self.native_canvas:
+            self.canvas.set_view(xlim, ylim)
+        else:
+            self.ax.set_xlim(*xlim)
+            self.ax.set_ylim(*ylim)
+        self.update_image()
+
+    def onscroll(self, event):
+        if not self.iono or event.xdata is None or event.ydata is None:
+            return
+        scale = 1 / 1.25 if event.button == "up" else 1.25
+        x0, x1 = self.get_xlim()
+        y0, y1 = self.get_ylim()
+        self.set_view(
+            (
+                event.xdata - (event.xdata - x0) * scale,
+                event.xdata + (x1 - event.xdata) * scale,
+            ),
+            (
+                event.ydata - (event.ydata - y0) * scale,
+                event.ydata + (y1 - event.ydata) * scale,
+            ),
+        )
+
+    def pan(self, event):
+        x_start, y_start, (x0, x1), (y0, y1) = self.pan_start
+        width, height = self.get_view_size()
+        dx = (event.x - x_start) * (x1 - x0) / width
+        dy = (event.y - y_start) * (y1 - y0) / height
+        self.set_view((x0 - dx, x1 - dx), (y0 - dy, y1 - dy))
+
+    def onresize(self, event):
+        if self.file_name:
+            self.update_image()
+
+    def start_rubber_band(self, event):
+        self.rubber_band_start = (event.x, event.y)
+        if self.native_canvas:
+            self.rubber_band = [event.xdata, event.ydata] * 2
+            self.canvas.set_rubber_band(self.rubber_band)
+        else:
+            self.rubber_band = Rectangle(
+                (event.xdata, event.ydata),
+                0,
+                0,
+                fill=False,
+                linestyle="--",
+            )
+            self.ax.add_patch(self.rubber_band)
+
+    def stretch_rubber_band(self, event):
+        if self.native_canvas:
+            self.rubber_band[2:] = [event.xdata, event.ydata]
+            self.canvas.set_rubber_band(self.rubber_band)
+        else:
+            x, y = self.rubber_band.get_xy()
+            self.rubber_band.set_width(event.xdata - x)
+            self.rubber_band.set_height(event.ydata - y)
+        self.canvas.draw_idle()
+
+    def get_trace_colors(self):
+        return {
+            0: self.f2_color,
+            1: self.f1_color,
+            2: self.e_color,
+            3: self.es_color,
+        }
+
+    def get_trace_points(self, layer):
+        widget = self.get_trace_widgets()[layer]
+        freqs = []
+        heights = []
+        for i in range(widget.count()):
+            t = widget.item(i).text().split()
+            freqs.append(float(t[0]))
+            heights.append(float(t[1]))
+        return freqs, heights
+
     def plot_scatters(self):
-        if self.e_scatter is not None:
-            self.e_scatter.remove()
-
-        x_e = []
-        y_e = []
-        for i in range(self.listWidgetE.count()):
-            t = self.listWidgetE.item(i).text().split()
-            x_e.append(self.iono.freq_to_coord(t[0]))
-            y_e.append(float(t[1]))
-        self.e_scatter = self.ax.scatter(x_e, y_e, c=self.e_color)
-
-        if self.f1_scatter is not None:
-            self.f1_scatter.remove()
-
-        x_f1 = []
-        y_f1 = []
-        for i in range(self.listWidgetF1.count()):
-            t = self.listWidgetF1.item(i).text().split()
-            x_f1.append(self.iono.freq_to_coord(t[0]))
-            y_f1.append(float(t[1]))
-        self.f1_scatter = self.ax.scatter(x_f1, y_f1, c=self.f1_color)
-
-        if self.f2_scatter is not None:
-            self.f2_scatter.remove()
-
-        x_f2 = []
-        y_f2 = []
-        for i in range(self.listWidgetF2.count()):
-            t = self.listWidgetF2.item(i).text().split()
-            x_f2.append(self.iono.freq_to_coord(t[0]))
-            y_f2.append(float(t[1]))
-        self.f2_scatter = self.ax.scatter(x_f2, y_f2, c=self.f2_color)
-
-        if self.es_scatter is not None:
-            self.es_scatter.remove()
-
-        x_es = []
-        y_es = []
-        for i in range(self.listWidgetEs.count()):
-            t = self.listWidgetEs.item(i).text().split()
-            x_es.append(self.iono.freq_to_coord(t[0]))
-            y_es.append(float(t[1]))
-        self.es_scatter = self.ax.scatter(x_es, y_es, c=self.es_color)
+        scatters = self.get_trace_scatters()
+        colors = self.get_trace_colors()
+
+        for layer in (2, 1, 0, 3):  # E, F1, F2, Es
+            freqs, heights = self.get_trace_points(layer)
+            x = [self.iono.freq_to_coord(f) for f in freqs]
+            if self.native_canvas:
+                self.canvas.set_points(layer, x, heights, colors[layer])
+            else:
+                if scatters[layer] is not None:
+                    scatters[layer].remove()
+                scatters[layer] = self.ax.scatter(x, heights, c=colors[layer])
+
+        self.f2_scatter = scatters[0]
+        self.f1_scatter = scatters[1]
+        self.e_scatter = scatters[2]
+        self.es_scatter = scatters[3]
 
         self.canvas.draw()
 
@@ -574,38 +1265,58 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         top = self.iono.get_extent()[3]
         bottom = self.iono.get_extent()[2]
 
-        def plot_line(box, line, color, style="-"):
+        def plot_line(layer, box, line, color, style="-"):
             if line is not None:
                 line.remove()
                 line = None
             freq = box.value()
-            if freq > 0:
-                f = self.iono.freq_to_coord(freq)
-                if left < f < right:
-                    (line,) = self.ax.plot(
-                        [f, f], [bottom, top], c=color, linestyle=style
-                    )
-                return line
+            f = self.iono.freq_to_coord(freq) if freq > 0 else None
+            if f is not None and not left < f < right:
+                f = None
+            if self.native_canvas:
+                self.canvas.set_line(layer, f, color)
+            elif f is not None:
+                (line,) = self.ax.plot([f, f], [bottom, top], c=color, linestyle=style)
+            return line
 
         self.f2_critical = plot_line(
-            self.doubleSpinBoxF2, self.f2_critical, self.f2_color
+            0, self.doubleSpinBoxF2, self.f2_critical, self.f2_color
         )
         self.f1_critical = plot_line(
-            self.doubleSpinBoxF1, self.f1_critical, self.f1_color
+            1, self.doubleSpinBoxF1, self.f1_critical, self.f1_color
+        )
+        self.e_critical = plot_line(
+            2, self.doubleSpinBoxE, self.e_critical, self.e_color
         )
-        self.e_critical = plot_line(self.doubleSpinBoxE, self.e_critical, self.e_color)
-
         self.es_critical = plot_line(
-            self.doubleSpinBoxEs, self.es_critical, self.es_color
+            3, self.doubleSpinBoxEs, self.es_critical, self.es_color
         )
 
         self.canvas.draw()
 
     def onmove(self, event):
-        if event.ydata and event.xdata:
+        if self.player is not None:
+            return
+        if event.ydata and event.xdata and self.iono:
+            if self.pan_start is not None:
+                self.pan(event)
+            elif self.drag_key is not None:
+                self.drag_trace_point(event)
+            elif self.rubber_band is not None:
+                self.stretch_rubber_band(event)
+
             f = self.iono.coord_to_freq(event.xdata)
             h = event.ydata
-            self.statusbar.showMessage(f"f={f:5.2f}  h'={h:5.1f}")
+            message = f"f={f:5.2f}  h'={h:5.1f}"
+
+            key = self.find_trace_point(event)
+            if key is not None:
+                layer = self.trace_index.get_layer(key)
+                name = ("F2", "F1", "E", "Es")[layer]
+                point = self.trace_items[key].text().split()
+                message += f"    {name}: f={point[0]}  h'={point[1]}"
+
+            self.statusbar.showMessage(message)
             if not self.is_cross:
                 QApplication.setOverrideCursor(Qt.CursorShape.CrossCursor)
                 self.is_cross = True
@@ -621,128 +1332,212 @@ class MainWindow(QMainWindow, Ui_mainWindow):
             self.open_file(file_name)
 
     def close_file(self):
+        self.stop_raw_reader()
+        self.stop_playback(reopen=False)
         self.clear_all()
         self.iono = None
         self.file_name = ""
         self.figure.clear()
         self.ax = None
+        self.im_iono = None
+        if self.native_canvas:
+            self.canvas.clear()
         self.canvas.draw()
         self.actionO_trace.setEnabled(False)
         self.actionX_trace.setEnabled(False)
 
-    def open_file(self, file_name):
-        tester = IonogramTester()
-        is_iono = tester.examine(file_name)
-        if is_iono:
-            self.close_file()
-            self.file_navigator = FileNavigator(file_name)
-            self.iono = tester.get_iono()
-            self.iono.load(file_name)
-            data = self.iono.get_data()
-            if data is not None:
-
-                self.file_name = file_name
-
-                self.ax = self.figure.add_subplot(111)
-
-                extent = self.iono.get_extent()
-
-                self.im_iono = self.ax.imshow(
-                    data,
-                    cmap=self.iono.cmap,
-                    interpolation="nearest",
-                    extent=extent,
-                    aspect="auto",
-                    vmax=np.max(self.iono.get_data())
-                    * self.level_spin_box.value()
-                    / 100,
-                    vmin=np.min(self.iono.get_data())
-                    * self.level_spin_box.value()
-                    / 100,
-                )
+    def plot_ionogram(self):
+        extent = self.iono.get_extent()
+        tics = self.iono.get_freq_tics()
+        labels = self.iono.get_freq_labels()
 
-                tics = self.iono.get_freq_tics()
-                labels = self.iono.get_freq_labels()
-                self.ax.set_xticks(tics)
-                self.ax.set_xticklabels(labels)
-
-                plt.xticks(fontsize=self.program_configuration.font_size)
-                plt.yticks(fontsize=self.program_configuration.font_size)
+        if self.native_canvas:
+            self.canvas.set_view(extent[:2], extent[2:])
+            self.canvas.set_freq_ticks(tics, labels)
+            return
 
-                plt.tight_layout()
-                self.setWindowTitle(f"{self.program_name} - {file_name}")
-                self.canvas.draw()
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_xlim(extent[0], extent[1])
+        self.ax.set_ylim(extent[2], extent[3])
+
+        vmin, vmax = self.get_clim()
+        image, image_extent = self.render_image()
+        self.im_iono = self.ax.imshow(
+            image,
+            cmap=get_colormap(self.iono.cmap),
+            interpolation="nearest",
+            extent=image_extent,
+            aspect="auto",
+            vmax=vmax,
+            vmin=vmin,
+        )
+        self.ax.set_xlim(extent[0], extent[1])
+        self.ax.set_ylim(extent[2], extent[3])
+        self.ax.set_autoscale_on(False)
 
-                self.stationNameEdit.setText(self.iono.get_station_name())
-                self.dateTimeEdit.setDateTime(self.iono.get_date())
-                self.latLineEdit.setText(str(self.iono.get_lat()))
-                self.longLineEdit.setText(str(self.iono.get_lon()))
-                self.gyrofrequencyLineEdit.setText(str(self.iono.get_gyro()))
-                self.dipAngleLineEdit.setText(str(self.iono.get_dip()))
+        self.ax.set_xticks(tics)
+        self.ax.set_xticklabels(labels)
 
-                sunspot = self.iono.get_sunspot()
-                if sunspot != -1:
-                    self.sunspotNumberLineEdit.setText(str(sunspot))
-                else:
-                    self.sunspotNumberLineEdit.setText("")
-                    if not self.actionIgnore_errors.isChecked():
-                        error_message = """
-                        Sunspot number is not found.<br><br>
-                        File <b>SN_d_tot_V2.0.txt</b> is probably outdated.<br>
-                        Please update it from<br>
-                        <a href='http://www.sidc.be/silso/DATA/SN_d_tot_V2.0.txt'>http://www.sidc.be/silso/DATA/SN_d_tot_V2.0.txt</a>
-                        """
-                        self.show_error(error_message)
-
-                time_zone = self.iono.get_timezone()
-                position = self.timeZoneComboBox.findText(
-                    f"{time_zone:>+3d}" if time_zone != 0 else f"{time_zone:>3d}"
-                )
-                self.timeZoneComboBox.setCurrentIndex(position)
-                _ = [e.setEnabled(True) for e in self.properties_of_iono]
+        plt.xticks(fontsize=self.program_configuration.font_size)
+        plt.yticks(fontsize=self.program_configuration.font_size)
 
-                self.load_text_info()
+        plt.tight_layout()
 
-                self.plot_scatters()
+    def request_file(self, file_name):
+        """Open a file in the background, e.g. while the navigation key is
+        held: only the latest requested file is decoded and shown."""
+        self.load_generation += 1
+        self.load_target = file_name
+        self.setWindowTitle(f"{self.program_name} - {file_name}")
+        if self.load_future is not None and not self.load_future.cancel():
+            # The running decode is discarded when it is finished
+            return
+        self.start_load()
 
-                self.actionO_trace.setChecked(True)
-                self.actionX_trace.setChecked(True)
+    def start_load(self):
+        self.load_future = self.loader.submit(
+            self.load_file, self.load_generation, self.load_target
+        )
 
-                if self.iono.ox_mode:
-                    self.actionO_trace.setEnabled(True)
-                    self.actionX_trace.setEnabled(True)
-                else:
-                    self.actionO_trace.setEnabled(False)
-                    self.actionX_trace.setEnabled(False)
+    def load_file(self, generation, file_name):
+        # Called in the loader thread
+        try:
+            iono = open_ionogram(file_name)
+        except Exception as e:
+            iono = e
+        self.file_loaded.emit(generation, file_name, iono)
+
+    def file_load_finished(self, generation, file_name, iono):
+        if generation != self.load_generation:
+            # Superseded while it was decoded
+            if self.load_target is not None:
+                self.start_load()
+            else:
+                self.load_future = None
+            return
+        self.load_future = None
+        self.load_target = None
+        if isinstance(iono, Exception):
+            if self.file_name:
+                self.setWindowTitle(f"{self.program_name} - {self.file_name}")
+            if isinstance(iono, ValueError):
+                self.show_error("File format is not supported.")
+            else:
+                self.show_error(f"{file_name}: {iono}")
+            return
+        self.open_file(file_name, iono)
+
+    def open_file(self, file_name, iono=None):
+        # A file being opened in the background is not needed any more
+        self.load_generation += 1
+        self.load_target = None
+        if iono is None:
+            try:
+                # Containers and archives are opened at their first ionogram
+                if members := list_members(file_name):
+                    file_name = members[0]
+                iono = open_ionogram(file_name)
+            except ValueError:
+                iono = None
+
+        if iono is not None:
+            self.close_file()
+            # The list of files is kept while files of it are opened
+            if self.file_navigator is None or not self.file_navigator.select(file_name):
+                self.file_navigator = FileNavigator(file_name)
+                if self.watcher is not None:
+                    if split_member_path(file_name)[1] is None:
+                        self.start_watcher()
+                    else:
+                        self.actionLive.setChecked(False)
+            self.iono = iono
+            self.file_name = file_name
+            self.show_ionogram()
         else:
             self.show_error("File format is not supported.")
 
+    def show_ionogram(self):
+        self.actionO_trace.setChecked(True)
+        self.actionX_trace.setChecked(True)
+
+        self.renderer = self.create_renderer()
+        self.pyramids = {}
+
+        self.plot_ionogram()
+        self.setWindowTitle(f"{self.program_name} - {self.file_name}")
+        self.update_image()
+
+        self.stationNameEdit.setText(self.iono.get_station_name())
+        self.dateTimeEdit.setDateTime(self.iono.get_date())
+        self.latLineEdit.setText(str(self.iono.get_lat()))
+        self.longLineEdit.setText(str(self.iono.get_lon()))
+        self.gyrofrequencyLineEdit.setText(str(self.iono.get_gyro()))
+        self.dipAngleLineEdit.setText(str(self.iono.get_dip()))
+
+        sunspot = self.iono.get_sunspot()
+        if sunspot != -1:
+            self.sunspotNumberLineEdit.setText(str(sunspot))
+        else:
+            self.sunspotNumberLineEdit.setText("")
+            if not self.actionIgnore_errors.isChecked():
+                error_message = """
+                Sunspot number is not found.<br><br>
+                File <b>SN_d_tot_V2.0.txt</b> is probably outdated.<br>
+                Please update it from<br>
+                <a href='http://www.sidc.be/silso/DATA/SN_d_tot_V2.0.txt'>http://www.sidc.be/silso/DATA/SN_d_tot_V2.0.txt</a>
+                """
+                self.show_error(error_message)
+
+        time_zone = self.iono.get_timezone()
+        position = self.timeZoneComboBox.findText(
+            f"{time_zone:>+3d}" if time_zone != 0 else f"{time_zone:>3d}"
+        )
+        self.timeZoneComboBox.setCurrentIndex(position)
+        _ = [e.setEnabled(True) for e in self.properties_of_iono]
+
+        self.load_text_info()
+        self.saved_traces = self.get_traces()
+
+        self.plot_scatters()
+
+        if self.iono.ox_mode:
+            self.actionO_trace.setEnabled(True)
+            self.actionX_trace.setEnabled(True)
+        else:
+            self.actionO_trace.setEnabled(False)
+            self.actionX_trace.setEnabled(False)
+
     def open_next_file(self):
         if self.file_name:
-            self.open_file(self.file_navigator.next())
+            self.request_file(self.file_navigator.next())
 
     def open_prev_file(self):
         if self.file_name:
-            self.open_file(self.file_navigator.previous())
+            self.request_file(self.file_navigator.previous())
 
     def open_last_file(self):
         if self.file_name:
-            self.open_file(self.file_navigator.last())
+            self.request_file(self.file_navigator.last())
 
     def open_first_file(self):
         if self.file_name:
-            self.open_file(self.file_navigator.first())
+            self.request_file(self.file_navigator.first())
 
     def reopen_file(self):
         if self.file_name:
+            # The directory is listed again
+            self.file_navigator = FileNavigator(self.file_name)
             self.open_file(self.file_name)
 
     def load_text_info(self):
-        if not self.load_json():
-            self.load_std()
+        if not self.load_json() and not self.load_std():
+            container, member = split_member_path(self.file_name)
+            if member is not None and is_container(container):
+                self.load_json(open_container(container).get_json_data(member))
 
-    def load_json(self):
-        json_data = JsonFileIO.load(f"{self.file_name}.json")
+    def load_json(self, json_data=None):
+        if json_data is None:
+            json_data = JsonFileIO.load(get_sidecar_name(self.file_name, "json"))
 
         if not json_data:
             return False
@@ -784,7 +1579,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetE.addItem(line)
+                self.add_trace_point(2, line)
 
         if foes:
             self.doubleSpinBoxEs.setValue(foes)
@@ -792,7 +1587,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetEs.addItem(line)
+                self.add_trace_point(3, line)
 
         if fof1:
             self.doubleSpinBoxF1.setValue(fof1)
@@ -800,7 +1595,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetF1.addItem(line)
+                self.add_trace_point(1, line)
 
         if fof2:
             self.doubleSpinBoxF2.setValue(fof2)
@@ -808,7 +1603,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetF2.addItem(line)
+                self.add_trace_point(0, line)
 
         return True
 
@@ -822,7 +1617,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         self.dateTimeEdit.setDateTime(self.iono.get_date())
 
     def load_std(self):
-        std_info = STDFileIO.load(f"{self.file_name}.STD")
+        std_info = STDFileIO.load(get_sidecar_name(self.file_name, "STD"))
 
         if not std_info:
             return False
@@ -862,7 +1657,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetE.addItem(line)
+                self.add_trace_point(2, line)
 
         if fof1:
             self.doubleSpinBoxF1.setValue(fof1)
@@ -870,7 +1665,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetF1.addItem(line)
+                self.add_trace_point(1, line)
 
         if fof2:
             self.doubleSpinBoxF2.setValue(fof2)
@@ -878,7 +1673,7 @@ class MainWindow(QMainWindow, Ui_mainWindow):
                 f = float(point.split()[0])
                 h = float(point.split()[1])
                 line = f"{f:-5.2f} {h:-5.1f}"
-                self.listWidgetF2.addItem(line)
+                self.add_trace_point(0, line)
 
         return True
 
@@ -900,7 +1695,8 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         )
 
         JsonFileIO.save(
-            f"{self.file_name}.json", self.iono, [e_layer, es_layer, f1_layer, f2_layer]
+            get_sidecar_name(self.file_name, "json"),
+            self.iono, [e_layer, es_layer, f1_layer, f2_layer]
         )
 
     def save_file(self):
@@ -912,12 +1708,18 @@ class MainWindow(QMainWindow, Ui_mainWindow):
             if self.stdCheckBox.isChecked():
                 self.save_std()
 
+            if self.jsonCheckBox.isChecked() or self.stdCheckBox.isChecked():
+                self.saved_traces = self.get_traces()
+
             if self.pngCheckBox.isChecked():
                 width = self.pngWidthSpinBox.value()
                 height = self.pngHeightSpinBox.value()
                 dpi = self.pngDpiSpinBox.value()
                 self.save_image(
-                    f"{self.file_name}.png", width=width, height=height, dpi=dpi
+                    get_sidecar_name(self.file_name, "png"),
+                    width=width,
+                    height=height,
+                    dpi=dpi,
                 )
             self.statusbar.showMessage("File is saved.")
 
@@ -967,29 +1769,49 @@ class MainWindow(QMainWindow, Ui_mainWindow):
         )
 
         STDFileIO.save(
-            f"{self.file_name}.STD", self.iono, [e_layer, f1_layer, f2_layer]
+            get_sidecar_name(self.file_name, "STD"),
+            self.iono,
+            [e_layer, f1_layer, f2_layer],
         )
 
     def save_image(self, filename, **kwargs):
         width = 10 if "width" not in kwargs else kwargs["width"]
         height = 6 if "height" not in kwargs else kwargs["height"]
         dpi = 100 if "dpi" not in kwargs else kwargs["dpi"]
-        old_size = self.figure.get_size_inches()
 
-        self.figure.set_size_inches(width, height)
-        fontsize = self.program_configuration.font_size
-        plt.title(self.get_description(), fontdict={"fontsize": fontsize})
-        plt.xlabel("Frequency [MHz]", fontsize=fontsize)
-        plt.ylabel("Virtual height [km]", fontsize=fontsize)
+        colors = self.get_trace_colors()
+        points = []
+        for layer in (2, 1, 0, 3):  # E, F1, F2, Es
+            freqs, heights = self.get_trace_points(layer)
+            points.append((freqs, heights, colors[layer]))
+
+        spin_boxes = {
+            0: self.doubleSpinBoxF2,
+            1: self.doubleSpinBoxF1,
+            2: self.doubleSpinBoxE,
+            3: self.doubleSpinBoxEs,
+        }
+        lines = [
+            (box.value(), colors[layer])
+            for layer, box in spin_boxes.items()
+            if box.value() > 0
+        ]
 
-        plt.tight_layout()
-        self.figure.savefig(filename, dpi=dpi)
-        plt.title("")
-        plt.xlabel("")
-        plt.ylabel("")
-        self.figure.set_size_inches(old_size)
-        plt.tight_layout()
-        self.canvas.draw()
+        vmin, vmax = self.get_clim()
+        save_ionogram_image(
+            filename,
+            self.iono,
+            self.get_display_data(),
+            vmin,
+            vmax,
+            points=points,
+            lines=lines,
+            title=self.get_description(),
+            width=width,
+            height=height,
+            dpi=dpi,
+            font_size=self.program_configuration.font_size,
+        )
 
     def get_description(self):
         time_zone = self.timeZoneComboBox.currentText().strip()
@@ -1014,18 +1836,17 @@ class MainWindow(QMainWindow, Ui_mainWindow):
 
         return description
 
-    def action_ox_traces(self):
-        data = np.copy(self.iono.get_data())
-
-        if not self.actionO_trace.isChecked():
-            data[data > 0] = 0
-
-        if not self.actionX_trace.isChecked():
-            data[data < 0] = 0
+    def get_display_key(self):
+        return (
+            self.actionO_trace.isChecked() or not self.iono.ox_mode,
+            self.actionX_trace.isChecked() or not self.iono.ox_mode,
+        )
 
-        self.im_iono.set_data(data)
+    def get_display_data(self):
+        return self.iono.get_component_data(*self.get_display_key())
 
-        self.figure.canvas.draw()
+    def action_ox_traces(self):
+        self.update_image()
 
     def show_error(self, message):
         msg = QMessageBox()
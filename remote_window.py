@@ -1,4 +1,6 @@
+import time
 from datetime import datetime
+from PySide6.QtCore import QThread, Signal
 from PySide6.QtWidgets import (
     QFileDialog,
     QMessageBox,
@@ -9,19 +11,73 @@ from shigaraki_loader import ShigarakiLoader
 
 DATE_TIME_FORMAT = "yyyy-MM-dd hh:mm"
 
-class RemoteWindow(QDialog, Ui_Remote):
+class ImportThread(QThread):
+    """Runs a loader outside of the GUI thread."""
+
+    progress = Signal(int, int, int, int)  # times done, all times, files saved, bytes saved
+    file_saved = Signal(str)
 
-    def __init__(self):
+    def __init__(self, loader, directory_name, start, end, sync):
         super().__init__()
+        self.loader = loader
+        self.directory_name = directory_name
+        self.start_date = start
+        self.end_date = end
+        self.sync = sync
+        self.n_files = 0
+        self.n_done = 0
+        self.n_total = 0
+        self.n_saved = 0
+        self.n_bytes = 0
+        self.error = None
+
+    def run(self):
+        self.n_total = sum(1 for _ in self.loader.get_times(self.start_date, self.end_date))
+        self.loader.progress = self.report
+        try:
+            if self.sync:
+                self.n_files = self.loader.sync(
+                    self.directory_name, self.start_date, self.end_date
+                )
+            else:
+                self.n_files = self.loader.saveTo(
+                    self.directory_name, self.start_date, self.end_date
+                )
+        except Exception as e:
+            self.error = e
+        finally:
+            self.loader.close()
+
+    def report(self, date, file_name, n_bytes):
+        self.n_done += 1
+        self.n_bytes += n_bytes
+        if file_name is not None:
+            self.n_saved += 1
+            self.file_saved.emit(file_name)
+        self.progress.emit(self.n_done, self.n_total, self.n_saved, self.n_bytes)
+
+    def cancel(self):
+        self.loader.cancel()
+
+
+class RemoteWindow(QDialog, Ui_Remote):
+
+    file_saved = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
 
         self.setupUi(self)
 
-        self.setModal(True)
         self.importButton.clicked.connect(self.import_button_clicked)
         self.sourceComboBox.addItem("database.rish.kyoto-u.ac.jp")
         self.ionosondeComboBox.addItem("Shigaraki")
         self.startDateTimeEdit.setDisplayFormat(DATE_TIME_FORMAT)
         self.endDateTimeEdit.setDisplayFormat(DATE_TIME_FORMAT)
+        self.cancelButton.clicked.connect(self.cancel_import)
+
+        self.thread = None
+        self.start_time = 0
         self.show()
 
     def import_button_clicked(self):
@@ -36,12 +92,74 @@ class RemoteWindow(QDialog, Ui_Remote):
             start = datetime.strptime(start, "%Y-%m-%d %H:%M")
             end = datetime.strptime(end, "%Y-%m-%d %H:%M")
             if index == 0 and ionosonde == 0:
-                loader = ShigarakiLoader(proxy_host, proxy_port)
-                n_files = loader.saveTo(directory_name, start, end)
-
-                msg = QMessageBox()
-                msg.setIcon(QMessageBox.Icon.Information)
-                msg.setText(f"{n_files} file(s) loaded.")
-                msg.setWindowTitle("Remote")
-                msg.show()
-                msg.exec()
+                if self.containerCheckBox.isChecked():
+                    loader = ShigarakiLoader(
+                        proxy_host, proxy_port, storage="container", keep_text=True
+                    )
+                else:
+                    loader = ShigarakiLoader(proxy_host, proxy_port)
+                self.start_import(
+                    loader, directory_name, start, end, self.syncCheckBox.isChecked()
+                )
+
+    def start_import(self, loader, directory_name, start, end, sync=True):
+        self.thread = ImportThread(loader, directory_name, start, end, sync)
+        self.thread.progress.connect(self.import_progress)
+        self.thread.file_saved.connect(self.file_saved)
+        self.thread.finished.connect(self.import_finished)
+        self.importButton.setEnabled(False)
+        self.cancelButton.setEnabled(True)
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("Starting...")
+        self.start_time = time.monotonic()
+        self.thread.start()
+
+    def import_progress(self, n_done, n_total, n_saved, n_bytes):
+        self.progressBar.setMaximum(max(n_total, 1))
+        self.progressBar.setValue(n_done)
+        elapsed = max(time.monotonic() - self.start_time, 1e-3)
+        # Skipped and missing times are not counted in the rate
+        self.progressLabel.setText(
+            f"{n_done}/{n_total} done, {n_bytes / 1e6:.1f} MB, "
+            f"{n_saved / elapsed:.1f} files/s"
+        )
+
+    def cancel_import(self):
+        if self.thread is not None:
+            self.cancelButton.setEnabled(False)
+            self.progressLabel.setText("Cancelling...")
+            self.thread.cancel()
+
+    def import_finished(self):
+        thread, self.thread = self.thread, None
+        self.importButton.setEnabled(True)
+        self.cancelButton.setEnabled(False)
+
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Remote")
+        if thread.error is not None:
+            msg.setIcon(QMessageBox.Icon.Warning)
+            msg.setText(f"Import failed: {thread.error}")
+        else:
+            msg.setIcon(QMessageBox.Icon.Information)
+            text = f"{thread.n_files} file(s) loaded."
+            if thread.loader.errors:
+                text += f" {len(thread.loader.errors)} file(s) failed."
+            if thread.loader.cancelled.is_set():
+                text += " Import is cancelled."
+            msg.setText(text)
+        self.progressLabel.setText(msg.text())
+        # The result of an import stopped by closing the dialog is not shown
+        if self.isVisible():
+            msg.exec()
+
+    def reject(self):
+        # Closing the dialog stops the import. The thread is not waited
+        # for here, it ends by itself and import_finished cleans up.
+        self.cancel_import()
+        super().reject()
+
+    def wait_import(self):
+        """Wait for a cancelled import to end (before the program exits)."""
+        if self.thread is not None:
+            self.thread.wait()
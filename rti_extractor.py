@@ -0,0 +1,327 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+import numpy as np
+from ionogram_io import open_ionogram, load_metadata, ordered_map
+from ionogram_input import split_member_path, create_temp_file
+from ionogram_container import IonogramContainer, is_container
+from file_navigator import list_members
+from day_summary import list_files
+
+METHODS = ("nearest", "linear")
+
+
+def get_heights(iono):
+    """Return heights (km) of the rows of an ionogram, bottom first."""
+    n_rows = iono.get_shape()[0]
+    bottom, top = iono.get_extent()[2:]
+    step = (top - bottom) / n_rows
+    return bottom + step * (np.arange(n_rows) + 0.5)
+
+
+def extract_columns(iono, frequencies, method="nearest"):
+    """Return columns (bottom first) of an ionogram at frequencies (MHz),
+    NaN out of its frequency range.
+
+    The nearest column is taken, or columns are linearly interpolated
+    between column centres.
+    """
+    data = np.asarray(iono.get_data(), dtype=np.float32)[::-1]
+    n_rows, n_columns = data.shape
+    left, right = iono.get_extent()[:2]
+    columns = np.full((len(frequencies), n_rows), np.nan, dtype=np.float32)
+    for i, freq in enumerate(frequencies):
+        try:
+            x = (iono.freq_to_coord(freq) - left) / (right - left) * n_columns
+        except (IndexError, ValueError):
+            continue
+        if not 0 <= x <= n_columns:
+            continue
+        if method == "nearest" or n_columns == 1:
+            columns[i] = data[:, min(int(x), n_columns - 1)]
+        else:
+            x = min(max(x - 0.5, 0), n_columns - 1)
+            j = min(int(x), n_columns - 2)
+            w = x - j
+            columns[i] = data[:, j] * (1 - w) + data[:, j + 1] * w
+    return columns
+
+
+def decode_file(file_name, frequencies, method="nearest", pack=True):
+    """Decode a file and extract its columns. Returns the ionogram without
+    data, its packed frame for the cache (None if pack is not set), the
+    columns and their heights; the exception if the file can not be loaded.
+    Runs in workers, so only compact results are sent back."""
+    try:
+        iono = open_ionogram(file_name, strict=True)
+        packed = IonogramContainer.pack(iono) if pack else None
+        columns = extract_columns(iono, frequencies, method)
+        heights = get_heights(iono)
+        iono.shape = iono.get_shape()
+        iono.data = None
+        iono.statistics = None
+        iono.components = {}
+        return iono, packed, columns, heights
+    except Exception as e:
+        return e
+
+
+def decode_new_file(item, frequencies, method="nearest"):
+    """decode_file of a (file name, cache key) pair; the frame is packed
+    only if it goes to the cache."""
+    file_name, key = item
+    return decode_file(file_name, frequencies, method, key is not None)
+
+
+def get_ut_date(iono):
+    return iono.date - timedelta(hours=iono.timezone)
+
+
+class FrameCache:
+    """Decoded ionograms kept in a container, keyed by the path, the
+    modification time and the size of the source file.
+
+    Members of containers are already decoded and are not cached. A
+    modified file gets a new key; its old frame stays in the file.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        try:
+            self.container = IonogramContainer(file_name, "a")
+        except ValueError as e:
+            # Not a container or damaged, it is made again
+            print(f"{e}, the cache is made again", file=sys.stderr)
+            self.container = IonogramContainer(file_name, "w")
+        self.names = set(self.container.get_names())
+
+    @staticmethod
+    def get_key(file_name):
+        container, member = split_member_path(file_name)
+        if member is not None and is_container(container):
+            return None
+        stat = os.stat(container)
+        return f"{os.path.abspath(file_name)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def get(self, file_name):
+        """Return the cached ionogram without data (None if it is not
+        cached) and its key."""
+        key = self.get_key(file_name)
+        if key not in self.names:
+            return None, key
+        return self.container.load_metadata(key), key
+
+    def load(self, key):
+        return self.container.load(key)
+
+    def add(self, key, iono, packed):
+        self.container.add(key, iono, packed=packed)
+        self.names.add(key)
+
+    def flush(self):
+        self.container.flush()
+
+    def close(self):
+        self.container.close()
+
+
+class RtiExtractor:
+    """Height x time (RTI) arrays of ionograms at fixed frequencies.
+
+    New files are decoded in a pool (at most two per worker at a time)
+    and only their columns at the frequencies are kept. Decoded frames
+    are written to a FrameCache, so extraction at other frequencies later
+    reads frames instead of decoding the files again.
+    """
+
+    # The cache index is written after this number of new frames
+    FLUSH_INTERVAL = 50
+
+    def __init__(self, frequencies, method="nearest", cache_name=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        self.frequencies = np.asarray(frequencies, dtype=float)
+        self.method = method
+        self.cache_name = cache_name
+        self.heights = None
+        self.times = []
+        self.files = []
+        self.columns = []
+        self.errors = {}
+        self.n_decoded = 0
+        self.n_cached = 0
+
+    def run(self, file_names, start=None, end=None, workers=1, processes=False):
+        """Extract columns of files with UT dates from start to end (both
+        may be None). Returns the number of extracted ionograms."""
+        file_names = list(file_names)
+        if not file_names:
+            return 0
+        if self.heights is None:
+            self.heights = get_heights(load_metadata(file_names[0]))
+
+        cache = FrameCache(self.cache_name) if self.cache_name else None
+        try:
+            new_files = []
+            for file_name in file_names:
+                try:
+                    iono, key = cache.get(file_name) if cache else (None, None)
+                    if iono is None and (start or end):
+                        iono = load_metadata(file_name)
+                except Exception as e:
+                    self.errors[file_name] = e
+                    continue
+                if iono is not None and not self.__in_range(iono, start, end):
+                    continue
+                if key is not None and key in cache.names:
+                    self.__extract_cached(file_name, cache, key)
+                else:
+                    new_files.append((file_name, key))
+            self.__decode(new_files, cache, workers, processes)
+        finally:
+            if cache is not None:
+                cache.close()
+        return len(self.times)
+
+    @staticmethod
+    def __in_range(iono, start, end):
+        date = get_ut_date(iono)
+        return (start is None or date >= start) and (end is None or date <= end)
+
+    def __extract_cached(self, file_name, cache, key):
+        try:
+            iono = cache.load(key)
+            columns = extract_columns(iono, self.frequencies, self.method)
+        except Exception as e:
+            self.errors[file_name] = e
+            return
+        self.__add(file_name, iono, columns, get_heights(iono))
+        self.n_cached += 1
+
+    def __decode(self, new_files, cache, workers, processes):
+        workers = max(workers or 1, 1)
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        function = partial(decode_new_file, frequencies=self.frequencies, method=self.method)
+        n_new = 0
+        with pool(max_workers=workers) as executor:
+            try:
+                results = ordered_map(function, new_files, executor, 2 * workers)
+                for (file_name, key), result in zip(new_files, results):
+                    if isinstance(result, Exception):
+                        self.errors[file_name] = result
+                        continue
+                    iono, packed, columns, heights = result
+                    self.__add(file_name, iono, columns, heights)
+                    self.n_decoded += 1
+                    if packed is not None:
+                        cache.add(key, iono, packed)
+                        n_new += 1
+                        if n_new % self.FLUSH_INTERVAL == 0:
+                            cache.flush()
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+    def __add(self, file_name, iono, columns, heights):
+        if not np.array_equal(heights, self.heights):
+            columns = np.array(
+                [np.interp(self.heights, heights, c, left=np.nan, right=np.nan) for c in columns],
+                dtype=np.float32,
+            )
+        self.times.append(get_ut_date(iono))
+        self.files.append(file_name)
+        self.columns.append(columns)
+
+    def get_rti(self):
+        """Return UT times, files and the array (frequency x height x time)
+        in time order."""
+        order = sorted(range(len(self.times)), key=lambda i: (self.times[i], self.files[i]))
+        times = [self.times[i] for i in order]
+        files = [self.files[i] for i in order]
+        shape = (len(self.frequencies), len(self.heights), len(order))
+        rti = np.full(shape, np.nan, dtype=np.float32)
+        for t, i in enumerate(order):
+            rti[:, :, t] = self.columns[i]
+        return times, files, rti
+
+    def save(self, file_name):
+        """Write the arrays to a compressed npz file."""
+        times, files, rti = self.get_rti()
+        file, temp_name = create_temp_file(file_name)
+        try:
+            with file:
+                np.savez_compressed(
+                    file,
+                    frequencies=self.frequencies,
+                    heights=self.heights,
+                    times=np.array(times, dtype="datetime64[s]"),
+                    files=np.array(files, dtype=str),
+                    method=self.method,
+                    rti=rti,
+                )
+            os.replace(temp_name, file_name)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
+
+def read_rti(file_name):
+    """Return a dictionary with frequencies (MHz), heights (km), UT times,
+    files and rti (frequency x height x time) of an extracted file."""
+    with np.load(file_name) as rti:
+        return {key: rti[key] for key in rti.files}
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract height x time (RTI) arrays at fixed frequencies from ionograms."
+    )
+    parser.add_argument("paths", nargs="+", help="ionogram files, directories, containers or archives")
+    parser.add_argument("-f", "--freq", type=float, nargs="+", required=True, help="frequencies, MHz")
+    parser.add_argument("-o", "--out", required=True, help="output file (.npz)")
+    parser.add_argument("--start", type=parse_date, help="first UT date and time (ISO format)")
+    parser.add_argument("--end", type=parse_date, help="last UT date and time (ISO format)")
+    parser.add_argument("--method", choices=METHODS, default="nearest")
+    parser.add_argument(
+        "--cache",
+        help="cache of decoded ionograms (.rti_cache.ivc beside the output by default)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="do not cache decoded ionograms")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    file_names = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            file_names += list_files(path)
+        else:
+            file_names += list_members(path) or [path]
+
+    cache_name = None
+    if not args.no_cache:
+        cache_name = args.cache or os.path.join(
+            os.path.dirname(os.path.abspath(args.out)), ".rti_cache.ivc"
+        )
+    extractor = RtiExtractor(args.freq, args.method, cache_name)
+    n_frames = extractor.run(file_names, args.start, args.end, args.jobs, processes=True)
+    for file_name, error in extractor.errors.items():
+        print(f"{file_name}: {error}", file=sys.stderr)
+    if not n_frames:
+        print("No ionograms in the date range.", file=sys.stderr)
+        return
+    extractor.save(args.out)
+
+    print(
+        f"{n_frames} ionogram(s) in {args.out}: {extractor.n_decoded} decoded, "
+        f"{extractor.n_cached} cached, {len(extractor.errors)} error(s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,454 @@
 
-from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from glob import glob
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ionogram_shigaraki import IonogramShigaraki
+from ionogram_container import IonogramContainer
+from ionogram_input import split_member_path, join_member_path, create_temp_file
+
+# Ionograms are made every 15 minutes
+STEP = timedelta(minutes=15)
+
+
+def get_dates(start, end):
+    """Yield times of ionograms from start to end (inclusive)."""
+    date = start.replace(minute=0, second=0, microsecond=0)
+    while date < start:
+        date += STEP
+    while date <= end:
+        yield date
+        date += STEP
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+class CancellableRetry(Retry):
+    """Retry which gives up when the event cancelled is set, also during
+    the delay before the next attempt."""
+
+    def __init__(self, *args, cancelled=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cancelled = cancelled or threading.Event()
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.cancelled = self.cancelled
+        return retry
+
+    def increment(self, *args, **kwargs):
+        if self.cancelled.is_set():
+            raise ImportCancelled()
+        return super().increment(*args, **kwargs)
+
+    def sleep(self, response=None):
+        delay = None
+        if self.respect_retry_after_header and response is not None:
+            delay = self.get_retry_after(response)
+        if delay is None:
+            delay = self.get_backoff_time()
+        if self.cancelled.wait(delay):
+            raise ImportCancelled()
+
+
+def now_jst():
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=9)
+
+
+class SyncManifest:
+    """Record of the ionograms of a directory: fetched (with ETag and
+    Last-Modified of the response), missing (404) and failed ones.
+
+    Keys are times of ionograms (JST) as in file names. Files found in the
+    directory without a record are taken as fetched. Ionograms stored in
+    containers are recorded with their member path.
+    """
+
+    FILE_NAME = '.shigaraki_manifest.json'
+
+    # Ionograms may be published some time after they are made, so times
+    # found missing earlier than this are requested again
+    RECHECK_MISSING = timedelta(days=2)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.file_name = os.path.join(directory, self.FILE_NAME)
+        try:
+            with open(self.file_name) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            manifest = {}
+        self.fetched = manifest.get('fetched', {})
+        self.missing = manifest.get('missing', {})
+        self.failed = manifest.get('failed', {})
+
+        for filename in (
+                glob(os.path.join(directory, '????????????_ionogram.txt'))
+                + glob(os.path.join(directory, '????????????_ionogram.txt.gz'))):
+            key = os.path.basename(filename)[:12]
+            if key not in self.fetched:
+                self.fetched[key] = {}
+
+    @staticmethod
+    def get_key(date):
+        return '{:%Y%m%d%H%M}'.format(date)
+
+    def exists(self, date):
+        info = self.fetched.get(self.get_key(date)) or {}
+        if info.get('file'):
+            container, _ = split_member_path(info['file'])
+            return os.path.exists(os.path.join(self.directory, container))
+        filename = os.path.join(
+            self.directory, ShigarakiLoader.get_file_name(date))
+        return os.path.exists(filename) or os.path.exists(filename + '.gz')
+
+    def is_needed(self, date, refresh=False):
+        """Return True if the ionogram of date is to be requested."""
+        key = self.get_key(date)
+        if key in self.fetched and self.exists(date):
+            return refresh
+        if key in self.missing:
+            checked = datetime.fromisoformat(self.missing[key])
+            return checked < date + self.RECHECK_MISSING
+        return True
+
+    def get_validators(self, date):
+        """Return headers of a conditional request for a fetched ionogram."""
+        info = self.fetched.get(self.get_key(date))
+        if not info or not self.exists(date):
+            return {}
+        headers = {}
+        if info.get('etag'):
+            headers['If-None-Match'] = info['etag']
+        if info.get('last_modified'):
+            headers['If-Modified-Since'] = info['last_modified']
+        return headers
+
+    def set_fetched(self, date, etag=None, last_modified=None, file_name=None):
+        key = self.get_key(date)
+        self.fetched[key] = {'etag': etag, 'last_modified': last_modified}
+        container, member = split_member_path(file_name or '')
+        if member is not None:
+            self.fetched[key]['file'] = join_member_path(
+                os.path.basename(container), member)
+        self.missing.pop(key, None)
+        self.failed.pop(key, None)
+
+    def set_missing(self, date):
+        key = self.get_key(date)
+        self.missing[key] = now_jst().isoformat(timespec='seconds')
+        self.fetched.pop(key, None)
+        self.failed.pop(key, None)
+
+    def set_failed(self, date, error):
+        self.failed[self.get_key(date)] = str(error)
+
+    def save(self):
+        manifest = {
+            'fetched': self.fetched,
+            'missing': self.missing,
+            'failed': self.failed,
+        }
+        file, temp_name = create_temp_file(self.file_name, 'w')
+        with file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(temp_name, self.file_name)
+
 
 class ShigarakiLoader:
 
-    def __init__(self, proxy_host, proxy_port):
+    # Manifest is saved after this number of results during sync, so an
+    # interrupted import resumes from about where it stopped
+    SAVE_INTERVAL = 100
+
+    def __init__(self, proxy_host, proxy_port, workers=8, retries=3,
+                 backoff=0.5, timeout=30, url_base=None, storage='text',
+                 dtype='float32', keep_text=False):
         self.proxy_host = proxy_host
         self. proxy_port = proxy_port
-        self.url_base = ('http://database.rish.kyoto-u.ac.jp'
-                         '/arch/mudb/data/ionosonde/text')
+        self.url_base = url_base or ('http://database.rish.kyoto-u.ac.jp'
+                                     '/arch/mudb/data/ionosonde/text')
+        self.workers = workers
+        self.timeout = timeout
+        self.errors = []
+        self.cancelled = threading.Event()
+        # progress(date, file_name, n_bytes) is called for each time of the
+        # range (file_name is None if no file is saved)
+        self.progress = None
 
-    def saveTo(self, directory, start, end):
-        if not (directory.endswith('/') or directory.endswith('\\')):
-            directory += '/'
+        # 'text' saves responses as they are, 'container' parses them at
+        # once and stores data (float32 or uint8) in a container per day,
+        # keep_text also saves the text gzip compressed
+        if storage not in ('text', 'container'):
+            raise ValueError(f'Unknown storage: {storage}')
+        self.storage = storage
+        self.dtype = dtype
+        self.keep_text = keep_text
+        self.containers = {}
+        self.lock = threading.Lock()
 
-        n_files = 0
+        # One pool of keep-alive connections for all downloads, failed
+        # requests are repeated with growing delays
+        retry = CancellableRetry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            cancelled=self.cancelled)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if self.proxy_host and self.proxy_port:
+            self.session.proxies = {
+                'http': '{}:{}'.format(self.proxy_host, self.proxy_port)
+            }
+
+    def close(self):
+        self.close_containers()
+        self.session.close()
+
+    def close_containers(self):
+        with self.lock:
+            for container in self.containers.values():
+                container.close()
+            self.containers = {}
+
+    def cancel(self):
+        """Stop downloading (may be called from another thread).
+
+        Requests are not retried any more and idle connections of the
+        session are closed.
+        """
+        self.cancelled.set()
+        self.session.close()
+
+    @staticmethod
+    def get_times(start, end):
+        """Return times (JST) of ionograms from start to end (UT)."""
         start = start + timedelta(hours = 9)
         end = end + timedelta(hours = 9)
-        if end > start:
-            dates = set()
-            delta = end - start
+        if end <= start:
+            return iter(())
+        return get_dates(start, end)
 
-            for day in range(delta.days+1):
-                date = start.replace(hour=0, minute=0, second=0) + timedelta(days=day)
-                for hour in range(24):
-                    for minute in (x*15 for x in range(5)):
-                        new_dt = date + timedelta(hours=hour) + timedelta(minutes=minute)
-                        if new_dt >= start and new_dt <= end:
-                            dates.add(new_dt)
+    def _report(self, date, file_name=None, n_bytes=0):
+        if self.progress is not None:
+            self.progress(date, file_name, n_bytes)
 
-            dates = list(dates)
-            dates.sort()
+    def get_url(self, date):
+        return '{:s}/{:%Y}/{:%Y%m}/{:%Y%m%d}/{:%Y%m%d%H%M}_ionogram.txt'.format(
+            self.url_base, date, date, date, date)
 
-            for date in dates:
-                year = date.year
-                month = date.month
-                day = date.day
-                hour = date.hour
-                minute = date.minute
-                format = (
-                    '{:s}'
-                    '/{:d}'
-                    '/{:d}{:02d}'
-                    '/{:d}{:02d}{:02d}'
-                    '/{:d}{:02d}{:02d}{:02d}{:02d}'
-                    '{:s}')
-                url = format.format(
-                    self.url_base,
-                    year,
-                    year, month,
-                    year, month, day,
-                    year, month, day, hour, minute,
-                    '_ionogram.txt')
-
-                if self.proxy_host and self.proxy_port:
-                    proxies = {
-                        'http': '{}:{}'.format(self.proxy_host, self.proxy_port)
-                    }
-                    r = requests.get(url, proxies=proxies)
-                else:
-                    r = requests.get(url)
+    @staticmethod
+    def get_file_name(date):
+        return '{:%Y%m%d%H%M}_ionogram.txt'.format(date)
+
+    @staticmethod
+    def get_container_name(date):
+        return '{:%Y%m%d}_ionogram.ivc'.format(date)
+
+    def fetch(self, date, directory):
+        """Download the ionogram of date (JST) to directory.
+
+        Returns the file name (member path for containers), None if there
+        is no ionogram at this time.
+        """
+        status, filename, _, _ = self._download(date, directory)
+        return filename if status == 200 else None
+
+    def _download(self, date, directory, headers=None):
+        """Request the ionogram of date.
+
+        Returns (status, file name, headers, number of bytes received).
+        """
+        if self.cancelled.is_set():
+            raise ImportCancelled()
+        filename = os.path.join(directory, self.get_file_name(date))
+        with self.session.get(self.get_url(date), headers=headers, stream=True,
+                              timeout=self.timeout) as r:
+            if r.status_code in (304, 404):
+                return r.status_code, filename, r.headers, 0
+            r.raise_for_status()
+
+            if self.storage == 'text':
+                n_bytes = self._write(filename, self._iter_content(r))
+                return r.status_code, filename, r.headers, n_bytes
+
+            content = b''.join(self._iter_content(r))
+            filename = self._store(date, directory, content)
+            return r.status_code, filename, r.headers, len(content)
+
+    def _iter_content(self, r):
+        for chunk in r.iter_content(chunk_size=1 << 16):
+            if self.cancelled.is_set():
+                raise ImportCancelled()
+            yield chunk
+
+    @staticmethod
+    def _write(filename, chunks):
+        """Write chunks to a temporary file which is renamed when it is
+        complete, so an interrupted download leaves no partial file.
+        Returns the number of bytes."""
+        n_bytes = 0
+        file, temp_name = create_temp_file(filename)
+        try:
+            with file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    n_bytes += len(chunk)
+            os.replace(temp_name, filename)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+        return n_bytes
+
+    def _store(self, date, directory, content):
+        """Parse a response (in a worker thread) and add it to the container
+        of its day. Returns the member path."""
+        name = self.get_file_name(date)
+        iono = IonogramShigaraki()
+        iono.load_lines(content.decode('ascii').splitlines())
+        packed = IonogramContainer.pack(iono, self.dtype)
+        if self.keep_text:
+            self._write(os.path.join(directory, name + '.gz'),
+                        [gzip.compress(content, compresslevel=6)])
+
+        container_name = os.path.join(directory, self.get_container_name(date))
+        with self.lock:
+            container = self.containers.get(container_name)
+            if container is None:
+                container = IonogramContainer(container_name, 'a')
+                self.containers[container_name] = container
+            container.add(name, iono, packed=packed)
+            # The index is written at once, so the member can be opened
+            # (e.g. by the viewer) while the import goes on
+            container.flush()
+        return join_member_path(container_name, name)
 
-                if r.status_code == 200:
-                    format = (
-                        '{:d}{:02d}{:02d}{:02d}{:02d}'
-                        '{:s}')
-                    filename = directory + format.format(
-                        year, month, day, hour, minute,
-                        '_ionogram.txt')
+    def _map(self, function, dates):
+        """Call function(date) in the thread pool and yield (date, result)
+        as they complete; the result is the exception if the request failed
+        (or the response could not be parsed or saved).
 
-                    with open(filename, 'w') as file:
-                        file.write(r.text)
+        Dates are submitted as workers get free, not all at once. After
+        cancel no more dates are submitted and cancelled downloads are
+        not yielded.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            dates = iter(dates)
+            try:
+                while True:
+                    for date in dates:
+                        if self.cancelled.is_set():
+                            break
+                        pending[executor.submit(function, date)] = date
+                        if len(pending) >= 2 * self.workers:
+                            break
+                    if not pending:
+                        return
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        date = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except (requests.RequestException, OSError, ValueError) as e:
+                            # Requests broken by cancel are not failures
+                            if self.cancelled.is_set():
+                                continue
+                            result = e
+                        except ImportCancelled:
+                            continue
+                        yield date, result
+            finally:
+                # The consumer stopped early, requests not started are dropped
+                executor.shutdown(cancel_futures=True)
 
+    def saveTo(self, directory, start, end):
+        """Download ionograms from start to end (UT) in parallel.
+
+        Returns the number of saved files; failed downloads are listed in
+        errors as (date, exception).
+        """
+        n_files = 0
+        self.errors = []
+
+        try:
+            for date, result in self._map(
+                    lambda date: self._download(date, directory),
+                    self.get_times(start, end)):
+                if isinstance(result, Exception):
+                    self.errors.append((date, result))
+                    self._report(date)
+                    continue
+                status, file_name, _, n_bytes = result
+                if status == 200:
                     n_files += 1
+                    self._report(date, file_name, n_bytes)
+                else:
+                    self._report(date)
+        finally:
+            self.close_containers()
 
         return n_files
 
+    def sync(self, directory, start, end, refresh=False):
+        """Download only ionograms from start to end (UT) which are not in
+        directory yet, keeping the manifest of the directory.
+
+        With refresh, fetched ionograms are requested again with conditional
+        requests and replaced only if they are changed on the server.
+        Returns the number of new or updated files.
+        """
+        n_files = 0
+        self.errors = []
+        manifest = SyncManifest(directory)
+
+        def needed(dates):
+            for date in dates:
+                if manifest.is_needed(date, refresh):
+                    yield date
+                else:
+                    self._report(date)
+
+        def download(date):
+            headers = manifest.get_validators(date) if refresh else None
+            return self._download(date, directory, headers)
+
+        try:
+            results = self._map(download, needed(self.get_times(start, end)))
+            for i, (date, result) in enumerate(results):
+                if isinstance(result, Exception):
+                    self.errors.append((date, result))
+                    manifest.set_failed(date, result)
+                    self._report(date)
+                    continue
+                status, file_name, headers, n_bytes = result
+                if status == 404:
+                    manifest.set_missing(date)
+                    self._report(date)
+                elif status == 304:
+                    self._report(date)
+                else:
+                    manifest.set_fetched(
+                        date, headers.get('ETag'), headers.get('Last-Modified'),
+                        file_name)
+                    n_files += 1
+                    self._report(date, file_name, n_bytes)
+                if (i + 1) % self.SAVE_INTERVAL == 0:
+                    manifest.save()
+        finally:
+            self.close_containers()
+            manifest.save()
+
+        return n_files
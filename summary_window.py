@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import numpy as np
+from PySide6.QtCore import QThread, QTimer, Signal
+from PySide6.QtWidgets import QComboBox, QDialog, QHBoxLayout, QLabel, QVBoxLayout
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+import matplotlib.dates as mdates
+from day_summary import DaySummary, MAX_COLUMNS, REDUCTIONS, get_cache_name, get_extent
+
+
+class SummaryThread(QThread):
+    """Fills a day summary outside of the GUI thread."""
+
+    progress = Signal(int)  # index of the new column
+
+    def __init__(self, summary, workers):
+        super().__init__()
+        self.summary = summary
+        self.workers = workers
+        self.error = None
+
+    def run(self):
+        try:
+            # Worker processes are spawned, a Qt application is not forked
+            self.summary.run(
+                self.workers,
+                callback=self.progress.emit,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        except Exception as e:
+            self.error = e
+
+    def cancel(self):
+        self.summary.cancel()
+
+
+class SummaryWindow(QDialog):
+    """Frequency x UT time image of the ionograms of a directory or a
+    container; a click on a column selects its ionogram."""
+
+    file_selected = Signal(str)
+
+    def __init__(self, file_names, workers=2, parent=None):
+        super().__init__(parent)
+        self.file_names = list(file_names)
+        self.workers = workers
+        self.summary = None
+        self.thread = None
+        self.columns = np.arange(0)
+        self.start_time = None
+        self.step = None
+        self.changed = False
+        self.image = None
+
+        self.setWindowTitle(f"Day summary - {os.path.dirname(self.file_names[0])}")
+        self.reductionComboBox = QComboBox(self)
+        self.reductionComboBox.addItem("Maximum amplitude", "max")
+        self.reductionComboBox.addItem("Echo occupancy", "occupancy")
+        self.progressLabel = QLabel(self)
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.mpl_connect("button_press_event", self.onclick)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.reductionComboBox)
+        top_layout.addWidget(self.progressLabel, 1)
+        layout = QVBoxLayout(self)
+        layout.addLayout(top_layout)
+        layout.addWidget(self.canvas)
+        self.resize(900, 500)
+
+        # Columns are drawn together, not after each file
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.timeout.connect(self.redraw)
+        self.reductionComboBox.currentIndexChanged.connect(self.start)
+        self.start()
+
+    def start(self):
+        self.stop()
+        reduction = self.reductionComboBox.currentData()
+        if reduction not in REDUCTIONS:
+            return
+        self.summary = DaySummary(
+            self.file_names, reduction, get_cache_name(self.file_names[0], reduction)
+        )
+        self.ax.clear()
+        self.image = None
+        self.changed = True
+        self.redraw()
+        if self.summary.done.all():
+            return
+        self.thread = SummaryThread(self.summary, self.workers)
+        self.thread.progress.connect(self.column_added)
+        self.thread.finished.connect(self.summary_finished)
+        self.thread.start()
+        self.redraw_timer.start(300)
+
+    def resume(self):
+        """Continue a summary stopped when the dialog was closed."""
+        if self.thread is None and not self.summary.done.all():
+            self.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.thread.finished.disconnect(self.summary_finished)
+            self.thread.cancel()
+            self.thread.wait()
+            self.thread = None
+        self.redraw_timer.stop()
+
+    def column_added(self, index):
+        self.changed = True
+
+    def summary_finished(self):
+        thread, self.thread = self.thread, None
+        self.redraw_timer.stop()
+        self.changed = True
+        self.redraw()
+        if thread.error is not None:
+            self.progressLabel.setText(f"Failed: {thread.error}")
+
+    def redraw(self):
+        if not self.changed:
+            return
+        self.changed = False
+        summary = self.summary
+        image, self.start_time, self.step, self.columns = summary.get_image(MAX_COLUMNS)
+        if self.start_time is not None:
+            extent = get_extent(image, self.start_time, self.step, summary.frequencies)
+            if self.image is None:
+                self.image = self.ax.imshow(
+                    image,
+                    origin="lower",
+                    aspect="auto",
+                    interpolation="nearest",
+                    extent=extent,
+                )
+                self.ax.set_ylabel("Frequency, MHz")
+                self.ax.set_xlabel("Time, UT")
+                locator = mdates.AutoDateLocator()
+                self.ax.xaxis.set_major_locator(locator)
+                self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+            else:
+                self.image.set_data(image)
+                self.image.set_extent(extent)
+            if np.isfinite(image).any():
+                self.image.set_clim(np.nanmin(image), np.nanmax(image))
+            self.figure.tight_layout()
+            self.canvas.draw_idle()
+
+        n_done = int(np.sum(summary.done))
+        text = f"{n_done}/{len(self.file_names)} ionogram(s)"
+        if summary.errors:
+            text += f", {len(summary.errors)} failed"
+        if summary.cache_error is not None:
+            text += ", not cached"
+        self.progressLabel.setText(text)
+
+    def get_file_index(self, x):
+        """Return the file of the column at x (matplotlib date), None if
+        there is no ionogram in it."""
+        if self.start_time is None:
+            return None
+        time = mdates.num2date(x).replace(tzinfo=None)
+        column = int(round((time - self.start_time) / self.step))
+        if not 0 <= column < len(self.columns) or self.columns[column] < 0:
+            return None
+        return self.columns[column]
+
+    def onclick(self, event):
+        if event.inaxes is not self.ax or event.button != 1 or event.xdata is None:
+            return
+        index = self.get_file_index(event.xdata)
+        if index is not None:
+            self.file_selected.emit(self.file_names[index])
+
+    def reject(self):
+        # Columns reduced so far are already cached
+        self.stop()
+        super().reject()
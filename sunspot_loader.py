@@ -2,18 +2,28 @@
 class SunspotLoader:
 
     def __init__(self, filename="./data/SN_d_tot_V2.0.txt"):
-        with open(filename, encoding="ascii") as file:
-            self.lines = [s.split() for s in file.readlines()]
+        self.filename = filename
+        self.numbers = None
+
+    def load(self):
+        # The table is set when it is complete, ionograms may be loaded in
+        # several threads
+        numbers = {}
+        try:
+            with open(self.filename, encoding="ascii") as file:
+                for s in file:
+                    line = s.split()
+                    if len(line) > 4:
+                        date = (int(line[0]), int(line[1]), int(line[2]))
+                        numbers.setdefault(date, int(line[4]))
+        except OSError:
+            pass
+        self.numbers = numbers
 
     def get(self, date):
-        year = date.year
-        month = date.month
-        day = date.day
-        for line in self.lines:
-            if int(line[0]) == year and int(line[1]) == month and int(line[2]) == day:
-                number = int(line[4])
-                return number
-        return -1
+        if self.numbers is None:
+            self.load()
+        return self.numbers.get((date.year, date.month, date.day), -1)
 
 
 Sunspots = SunspotLoader()
@@ -0,0 +1,40 @@
+import multiprocessing
+from datetime import datetime, timedelta
+import numpy as np
+from conftest import ROOT
+from day_summary import DaySummary, list_files
+
+SOURCE = f"{ROOT}/examples/shigaraki/201806071645_ionogram.txt"
+
+
+def make_day(directory, times):
+    """Copies of an ionogram at times (JST)."""
+    with open(SOURCE) as file:
+        text = file.read()
+    for time in times:
+        name = directory / f"{time:%Y%m%d%H%M}_ionogram.txt"
+        name.write_text(text.replace("2018-06-07 16:45", f"{time:%Y-%m-%d %H:%M}"))
+
+
+def test_columns_on_time_axis(tmp_path):
+    start = datetime(2018, 6, 7, 9, 0)
+    step = timedelta(minutes=15)
+    # Two hours without ionograms after the first hour
+    times = [start + i * step for i in range(4)] + [start + i * step for i in range(12, 16)]
+    make_day(tmp_path, times)
+    summary = DaySummary(list_files(str(tmp_path)))
+    assert summary.run(workers=2, mp_context=multiprocessing.get_context("spawn")) == 8
+
+    image, first, column_step, files = summary.get_image()
+    assert (first, column_step) == (start - timedelta(hours=9), step)
+    assert image.shape[1] == 16
+    assert list(files) == [0, 1, 2, 3] + [-1] * 8 + [4, 5, 6, 7]
+    assert np.isnan(image[:, 4:12]).all()
+    assert np.array_equal(image[:, 0], summary.profiles[0], equal_nan=True)
+
+    # Columns get longer and ionograms of a column are merged
+    image, first, column_step, files = summary.get_image(max_columns=8)
+    assert column_step == timedelta(minutes=225 / 7)
+    assert list(files) == [0, 2, -1, -1, -1, -1, 4, 6]
+    merged = np.fmax(summary.profiles[0], summary.profiles[1])
+    assert np.array_equal(image[:, 0], merged, equal_nan=True)
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import pytest
+from directory_watcher import DirectoryWatcher
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.05)
+    return condition()
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_only_new_regular_files(tmp_path, inotify):
+    (tmp_path / "old.txt").write_text("old")
+    files = []
+    watcher = DirectoryWatcher(str(tmp_path), files.append, interval=0.05, settle=0.2, inotify=inotify)
+    watcher.start()
+    try:
+        (tmp_path / "sub.dir").mkdir()
+        (tmp_path / ".hidden.part").write_text("hidden")
+        with open(tmp_path / "new.txt", "w") as file:
+            file.write("new")
+        assert wait_for(lambda: files)
+        time.sleep(0.5)
+    finally:
+        watcher.stop()
+    assert files == [os.path.join(str(tmp_path), "new.txt")]
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_file_written_again_after_close(tmp_path, inotify):
+    contents = []
+
+    def callback(file_name):
+        with open(file_name) as file:
+            contents.append(file.read())
+
+    watcher = DirectoryWatcher(str(tmp_path), callback, interval=0.05, settle=0.5, inotify=inotify)
+    watcher.start()
+    try:
+        with open(tmp_path / "new.txt", "w") as file:
+            file.write("first part")
+        time.sleep(0.2)
+        with open(tmp_path / "new.txt", "a") as file:
+            file.write(", second part")
+        assert wait_for(lambda: contents)
+        time.sleep(0.2)
+    finally:
+        watcher.stop()
+    assert contents == ["first part, second part"]
+
+
+def test_files_after_queue_overflow(tmp_path):
+    files = []
+    blocked = threading.Event()
+    released = threading.Event()
+
+    def callback(file_name):
+        files.append(file_name)
+        blocked.set()
+        released.wait(10)
+
+    watcher = DirectoryWatcher(str(tmp_path), callback, interval=0.05, settle=0.1)
+    if not watcher.is_inotify():
+        pytest.skip("no inotify")
+    watcher.start()
+    try:
+        (tmp_path / "first.txt").write_text("first")
+        assert blocked.wait(5)
+        # Events of the files overflow the queue while the watcher waits
+        limit = int(open("/proc/sys/fs/inotify/max_queued_events").read())
+        names = [f"{i:05d}.txt" for i in range(limit // 3 + 100)]
+        for name in names:
+            (tmp_path / name).write_text(name)
+        released.set()
+        assert wait_for(lambda: len(files) == len(names) + 1, timeout=30)
+    finally:
+        released.set()
+        watcher.stop()
+    assert sorted(files[1:]) == [os.path.join(str(tmp_path), name) for name in names]
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import weakref
+from glob import glob
+import numpy as np
+from conftest import ROOT
+from ionogram_container import IonogramContainer, open_container
+from ionogram_io import open_ionogram
+
+FILES = sorted(glob(f"{ROOT}/examples/shigaraki/*"))[:3]
+
+APPEND_AND_DIE = """
+import os, sys
+from ionogram_container import IonogramContainer
+from ionogram_io import open_ionogram
+container = IonogramContainer(sys.argv[1], "a")
+for name in sys.argv[2:-1]:
+    container.add(os.path.basename(name), open_ionogram(name))
+    container.flush()
+container.add(os.path.basename(sys.argv[-1]), open_ionogram(sys.argv[-1]))
+os._exit(1)
+"""
+
+
+def make_container(file_name, files):
+    with IonogramContainer(file_name, "w") as container:
+        for name in files:
+            container.add(os.path.basename(name), open_ionogram(name))
+
+
+def append_and_die(file_name, flushed, unflushed):
+    subprocess.run(
+        [sys.executable, "-c", APPEND_AND_DIE, file_name, *flushed, unflushed],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+
+
+def test_interrupted_append_keeps_members(tmp_path):
+    file_name = str(tmp_path / "day.ivc")
+    make_container(file_name, FILES[:1])
+
+    append_and_die(file_name, FILES[1:2], FILES[2])
+
+    container = IonogramContainer(file_name)
+    assert container.get_names() == [os.path.basename(name) for name in FILES[:2]]
+    for name in FILES[:2]:
+        expected = np.asarray(open_ionogram(name).get_data(), dtype=np.float32)
+        assert np.array_equal(container.get_data(os.path.basename(name)), expected)
+    container.close()
+
+    # Appending continues over the interrupted member
+    with IonogramContainer(file_name, "a") as container:
+        container.add(os.path.basename(FILES[2]), open_ionogram(FILES[2]))
+    assert len(IonogramContainer(file_name).get_names()) == 3
+
+
+def test_old_indexes_are_removed(tmp_path):
+    file_name = str(tmp_path / "day.ivc")
+    iono = open_ionogram(FILES[0])
+    with IonogramContainer(file_name, "a") as container:
+        container.COMPACT_SIZE = 0
+        for i in range(40):
+            container.add(f"{i:02d}", iono)
+            container.flush()
+        data_size = sum(frame["size"] for frame in container.frames.values())
+        assert container.garbage <= data_size // 2 + container.index_size
+    assert os.path.getsize(file_name) < 2 * data_size
+    container = IonogramContainer(file_name)
+    assert container.get_names() == [f"{i:02d}" for i in range(40)]
+    expected = np.asarray(iono.get_data(), dtype=np.float32)
+    assert np.array_equal(container.get_data("39"), expected)
+
+
+def test_replaced_container_is_released(tmp_path):
+    file_name = str(tmp_path / "day.ivc")
+    with IonogramContainer(file_name, "w") as container:
+        container.add("0", open_ionogram(FILES[0]), compress=False)
+    old = open_container(file_name)
+    data = old.get_data("0")
+    assert old.file.closed
+    released = weakref.ref(old.mmap)
+    del old
+
+    with IonogramContainer(file_name, "a") as container:
+        container.add("1", open_ionogram(FILES[1]), compress=False)
+    assert open_container(file_name).get_names() == ["0", "1"]
+    # The mapping of the replaced container lives while its arrays do
+    assert released() is not None
+    expected = np.asarray(open_ionogram(FILES[0]).get_data(), dtype=np.float32)
+    assert np.array_equal(data, expected)
+    del data
+    assert released() is None
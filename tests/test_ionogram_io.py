@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from conftest import ROOT
+
+IMPORT_CHECK = """
+import sys
+import ionogram_io
+print(",".join(m for m in ("PySide6", "matplotlib.pyplot") if m in sys.modules))
+"""
+
+
+def test_import_without_gui():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The GUI toolkit and pyplot are what made the import slow
+    assert result.stdout.strip() == ""
+
+
+def test_unrecognized_date_is_an_error():
+    from glob import glob
+    from ionogram_io import iter_ionograms
+
+    corrupted = sorted(glob(f"{ROOT}/examples/ips42/corrupted/*.ion"))
+    files = [f"{ROOT}/examples/ips42/00h30m.ion"] + corrupted
+    results = dict(iter_ionograms(files, workers=2))
+    assert not isinstance(results[files[0]], Exception)
+    for file_name in corrupted:
+        assert isinstance(results[file_name], ValueError)
+
+
+def test_metadata_of_compressed_files(tmp_path):
+    import gzip
+    import shutil
+    from ionogram_input import get_size
+    from ionogram_io import load_metadata
+
+    for name in (f"{ROOT}/examples/bazis/B1240610.30", f"{ROOT}/examples/ips42/00h30m.ion"):
+        compressed = tmp_path / (name.rsplit("/", 1)[-1] + ".gz")
+        with open(name, "rb") as source, gzip.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        assert get_size(str(compressed)) == get_size(name)
+        iono = load_metadata(name)
+        meta = load_metadata(str(compressed))
+        assert (meta.get_shape(), meta.date, meta.get_extent()) == (
+            iono.get_shape(),
+            iono.date,
+            iono.get_extent(),
+        )
+
+
+def test_replaced_archive_is_closed(tmp_path):
+    import os
+    import zipfile
+    from ionogram_input import get_archive
+
+    file_name = str(tmp_path / "day.zip")
+    with zipfile.ZipFile(file_name, "w") as archive:
+        archive.write(f"{ROOT}/examples/ips42/00h30m.ion", "00h30m.ion")
+    old = get_archive(file_name)
+    with zipfile.ZipFile(file_name, "a") as archive:
+        archive.write(f"{ROOT}/examples/ips42/00h30m.ion", "01h00m.ion")
+    os.utime(file_name, ns=(0, 0))
+    assert get_archive(file_name).get_names() == ["00h30m.ion", "01h00m.ion"]
+    assert old.zip.fp is None
@@ -0,0 +1,44 @@
+import numpy as np
+from matplotlib.colors import Normalize
+from colormaps import get_colormap
+from lut_renderer import LutRenderer
+
+DATA = np.linspace(0, 100, 50 * 40).reshape(50, 40)
+
+
+def test_same_colours_as_normalize():
+    renderer = LutRenderer("viridis", 0, 100)
+    cmap = get_colormap("viridis")
+    image = renderer.render("key", DATA, 0, 100)
+    expected = cmap(Normalize(0, 100)(DATA), bytes=True)
+    assert image.dtype == np.uint8 and image.shape == DATA.shape + (4,)
+    assert np.mean(np.any(image != expected, axis=-1)) < 0.01
+
+
+def test_contrast_change_does_not_quantize(monkeypatch):
+    renderer = LutRenderer("viridis", 0, 100)
+    renderer.render("key", DATA, 0, 100)
+    calls = []
+    quantize = renderer.quantize
+    monkeypatch.setattr(renderer, "quantize", lambda data: calls.append(1) or quantize(data))
+    for vmax in range(100, 60, -1):
+        image = renderer.render("key", DATA, 0, vmax)
+    assert calls == []
+    # Values above vmax get the top colour
+    assert (image[-1, -1] == get_colormap("viridis")(1.0, bytes=True)).all()
+
+
+def test_nan_is_bad_colour():
+    data = DATA.copy()
+    data[3, 4] = np.nan
+    renderer = LutRenderer("viridis", 0, 100)
+    assert renderer.quantize(data)[3, 4] == LutRenderer.LEVELS
+    image = renderer.render("key", data, 0, 100)
+    assert (image[3, 4] == get_colormap("viridis")(np.nan, bytes=True)).all()
+
+
+def test_window():
+    renderer = LutRenderer("viridis", 0, 100)
+    window = (slice(10, 20), slice(5, 15))
+    image = renderer.render("key", DATA, 0, 100, window)
+    assert (image == renderer.render("key", DATA, 0, 100)[window]).all()
@@ -0,0 +1,148 @@
+import errno
+import functools
+import os
+import shutil
+import stat
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from conftest import ROOT
+from shigaraki_loader import ShigarakiLoader, SyncManifest
+from ionogram_container import IonogramContainer
+
+# Ionograms of the examples (JST) between these times (UT)
+START = datetime(2018, 6, 7, 7, 30)
+END = datetime(2018, 6, 7, 8, 0)
+PRESENT = ("201806071645", "201806071700")
+MISSING = ("201806071630",)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A local server with the layout of the Shigaraki database."""
+    root = tmp_path / "server"
+    for name in PRESENT:
+        directory = root / name[:4] / name[:6] / name[:8]
+        directory.mkdir(parents=True, exist_ok=True)
+        shutil.copy(f"{ROOT}/examples/shigaraki/{name}_ionogram.txt", directory)
+    httpd = serve(functools.partial(QuietHandler, directory=str(root)))
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def umask():
+    old = os.umask(0o022)
+    yield 0o022
+    os.umask(old)
+
+
+def make_loader(url_base, **kwargs):
+    loader = ShigarakiLoader("", "", workers=2, retries=0, url_base=url_base, **kwargs)
+    loader.session.trust_env = False
+    return loader
+
+
+def get_mode(file_name):
+    return stat.S_IMODE(os.stat(file_name).st_mode)
+
+
+def test_save_to(server, tmp_path, umask):
+    out = tmp_path / "out"
+    out.mkdir()
+    loader = make_loader(server)
+    assert loader.saveTo(str(out), START, END) == len(PRESENT)
+    loader.close()
+    assert loader.errors == []
+    for name in PRESENT:
+        file_name = out / f"{name}_ionogram.txt"
+        expected = f"{ROOT}/examples/shigaraki/{name}_ionogram.txt"
+        assert file_name.read_bytes() == open(expected, "rb").read()
+        assert get_mode(file_name) == 0o666 & ~umask
+    assert sorted(os.listdir(out)) == [f"{name}_ionogram.txt" for name in PRESENT]
+
+
+def test_sync(server, tmp_path, umask):
+    out = tmp_path / "out"
+    out.mkdir()
+    loader = make_loader(server)
+    assert loader.sync(str(out), START, END) == len(PRESENT)
+    manifest = SyncManifest(str(out))
+    assert sorted(manifest.fetched) == list(PRESENT)
+    assert sorted(manifest.missing) == list(MISSING)
+    assert get_mode(manifest.file_name) == 0o666 & ~umask
+
+    # Nothing is requested again
+    requested = []
+    loader.progress = lambda date, file_name, n_bytes: requested.append(file_name)
+    assert loader.sync(str(out), START, END) == 0
+    assert requested == [None] * (len(PRESENT) + len(MISSING))
+    loader.close()
+
+
+def test_container_storage(server, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    loader = make_loader(server, storage="container")
+    assert loader.saveTo(str(out), START, END) == len(PRESENT)
+    loader.close()
+    container = IonogramContainer(str(out / "20180607_ionogram.ivc"))
+    assert container.get_names() == [f"{name}_ionogram.txt" for name in PRESENT]
+
+
+def test_write_error_is_a_failed_slot(server, tmp_path, monkeypatch):
+    out = tmp_path / "out"
+    out.mkdir()
+
+    def write(filename, chunks):
+        for _ in chunks:
+            pass
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    loader = make_loader(server)
+    monkeypatch.setattr(loader, "_write", write)
+    assert loader.saveTo(str(out), START, END) == 0
+    loader.close()
+    assert len(loader.errors) == len(PRESENT)
+    assert all(isinstance(error, OSError) for _, error in loader.errors)
+
+
+def test_cancel_stops_retries(tmp_path):
+    httpd = serve(UnavailableHandler)
+    loader = ShigarakiLoader(
+        "", "", workers=2, retries=5, backoff=10,
+        url_base=f"http://127.0.0.1:{httpd.server_address[1]}",
+    )
+    loader.session.trust_env = False
+    threading.Timer(0.5, loader.cancel).start()
+    start = time.monotonic()
+    assert loader.saveTo(str(tmp_path), START, END) == 0
+    loader.close()
+    httpd.shutdown()
+    httpd.server_close()
+    assert time.monotonic() - start < 5
+    assert loader.errors == []
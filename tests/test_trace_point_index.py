@@ -0,0 +1,60 @@
+from matplotlib.transforms import Affine2D
+from trace_point_index import TracePointIndex
+
+
+def make_index(transform):
+    index = TracePointIndex(cell_size=16)
+    index.set_transform(transform)
+    index.add(1, 0, 1.0, 100.0)
+    index.add(2, 0, 2.0, 100.0)
+    index.add(3, 1, 1.0, 110.0)
+    return index
+
+
+def test_nearest():
+    # 100 pixels per MHz, 1 pixel per km
+    index = make_index(Affine2D().scale(100, 1))
+    assert index.nearest(103, 101, 10) == 1
+    assert index.nearest(197, 100, 10) == 2
+    assert index.nearest(150, 100, 10) is None
+    # Layers are filtered and the closest point is taken
+    assert index.nearest(100, 108, 10) == 3
+    assert index.nearest(100, 108, 10, {0}) == 1
+    assert index.nearest(100, 108, 5, {0}) is None
+
+
+def test_in_rectangle_and_remove():
+    index = make_index(Affine2D().scale(100, 1))
+    assert sorted(index.in_rectangle(90, 95, 210, 105)) == [1, 2]
+    assert sorted(index.in_rectangle(210, 120, 90, 95)) == [1, 2, 3]
+    assert index.in_rectangle(90, 95, 210, 120, {1}) == [3]
+    index.remove(1)
+    assert index.nearest(100, 100, 10, {0}) is None
+    assert index.in_rectangle(90, 95, 210, 105) == [2]
+
+
+def test_move():
+    index = make_index(Affine2D().scale(100, 1))
+    index.move(1, 3.0, 100.0)
+    assert index.nearest(100, 100, 10, {0}) is None
+    assert index.nearest(300, 100, 10) == 1
+    assert index.get_layer(1) == 0
+
+
+def test_rebuild_on_transform_change():
+    transform = Affine2D().scale(100, 1)
+    index = make_index(transform)
+    cells = index.cells
+    # The same transform does not rebuild the grid
+    index.set_transform(Affine2D().scale(100, 1))
+    assert index.cells is cells
+
+    # Zoom: points move in pixels
+    index.set_transform(Affine2D().scale(200, 2).translate(-100, -150))
+    assert index.display[1] == (100, 50)
+    assert index.nearest(100, 50, 5) == 1
+    assert index.nearest(300, 50, 5) == 2
+    assert index.nearest(103, 101, 10) is None
+    # Points added later use the new transform
+    index.add(4, 2, 1.5, 105.0)
+    assert index.nearest(200, 60, 5) == 4
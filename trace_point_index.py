@@ -0,0 +1,107 @@
+from math import floor, hypot
+import numpy as np
+
+
+class TracePointIndex:
+    """Uniform grid over trace points of all layers in display (pixel) coordinates.
+
+    Points are stored in data coordinates, the grid is rebuilt only when the
+    data-to-display transform changes (resize, zoom), so every mouse event is
+    answered by looking at a few neighbouring cells.
+    """
+
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self.points = {}  # key -> (layer, x, y)
+        self.display = {}  # key -> (x_pix, y_pix)
+        self.cells = {}  # (i, j) -> set of keys
+        self.transform = None
+        self.matrix = None
+
+    def set_transform(self, transform):
+        matrix = np.array(transform.get_matrix())
+        if self.matrix is None or not np.array_equal(matrix, self.matrix):
+            self.transform = transform
+            self.matrix = matrix
+            self.rebuild()
+
+    def rebuild(self):
+        self.display = {}
+        self.cells = {}
+        if self.transform is None or not self.points:
+            return
+        keys = list(self.points)
+        xy = np.array([self.points[k][1:] for k in keys], dtype=float)
+        for key, (x_pix, y_pix) in zip(keys, self.transform.transform(xy)):
+            self._insert(key, x_pix, y_pix)
+
+    def clear(self):
+        self.points = {}
+        self.display = {}
+        self.cells = {}
+
+    def add(self, key, layer, x, y):
+        self.points[key] = (layer, x, y)
+        if self.transform is not None:
+            x_pix, y_pix = self.transform.transform((x, y))
+            self._insert(key, x_pix, y_pix)
+
+    def remove(self, key):
+        if key not in self.points:
+            return
+        del self.points[key]
+        if key in self.display:
+            cell = self._cell(*self.display.pop(key))
+            self.cells[cell].discard(key)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def move(self, key, x, y):
+        layer = self.points[key][0]
+        self.remove(key)
+        self.add(key, layer, x, y)
+
+    def get_layer(self, key):
+        return self.points[key][0]
+
+    def nearest(self, x_pix, y_pix, radius, layers=None):
+        """Return the key of the closest point within radius pixels or None."""
+        best_key = None
+        best_distance = radius
+        n = int(radius // self.cell_size) + 1
+        i0, j0 = self._cell(x_pix, y_pix)
+        for i in range(i0 - n, i0 + n + 1):
+            for j in range(j0 - n, j0 + n + 1):
+                for key in self.cells.get((i, j), ()):
+                    if layers is not None and self.points[key][0] not in layers:
+                        continue
+                    px, py = self.display[key]
+                    distance = hypot(px - x_pix, py - y_pix)
+                    if distance <= best_distance:
+                        best_key = key
+                        best_distance = distance
+        return best_key
+
+    def in_rectangle(self, x0_pix, y0_pix, x1_pix, y1_pix, layers=None):
+        """Return keys of all points inside the rectangle (pixel coordinates)."""
+        x_min, x_max = sorted((x0_pix, x1_pix))
+        y_min, y_max = sorted((y0_pix, y1_pix))
+        i_min, j_min = self._cell(x_min, y_min)
+        i_max, j_max = self._cell(x_max, y_max)
+        keys = []
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                for key in self.cells.get((i, j), ()):
+                    if layers is not None and self.points[key][0] not in layers:
+                        continue
+                    px, py = self.display[key]
+                    if x_min <= px <= x_max and y_min <= py <= y_max:
+                        keys.append(key)
+        return keys
+
+    def _cell(self, x_pix, y_pix):
+        return floor(x_pix / self.cell_size), floor(y_pix / self.cell_size)
+
+    def _insert(self, key, x_pix, y_pix):
+        self.display[key] = (x_pix, y_pix)
+        self.cells.setdefault(self._cell(x_pix, y_pix), set()).add(key)
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 
 ################################################################################
-## Form generated from reading UI file 'RemoteWndheTEKb.ui'
+## Form generated from reading UI file 'RemoteWnd.ui'
 ##
-## Created by: Qt User Interface Compiler version 6.8.0
+## Created by: Qt User Interface Compiler version 6.12.0
 ##
 ## WARNING! All changes made in this file will be lost when recompiling UI file!
 ################################################################################
@@ -15,17 +15,17 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QApplication, QComboBox, QDateTimeEdit, QDialog,
-    QGroupBox, QLabel, QLineEdit, QPushButton,
-    QSizePolicy, QWidget)
+from PySide6.QtWidgets import (QApplication, QCheckBox, QComboBox, QDateTimeEdit,
+    QDialog, QGroupBox, QLabel, QLineEdit,
+    QProgressBar, QPushButton, QSizePolicy, QWidget)
 
 class Ui_Remote(object):
     def setupUi(self, Remote):
         if not Remote.objectName():
             Remote.setObjectName(u"Remote")
-        Remote.resize(350, 270)
-        Remote.setMinimumSize(QSize(350, 270))
-        Remote.setMaximumSize(QSize(350, 270))
+        Remote.resize(350, 350)
+        Remote.setMinimumSize(QSize(350, 350))
+        Remote.setMaximumSize(QSize(350, 350))
         self.endDateTimeEdit = QDateTimeEdit(Remote)
         self.endDateTimeEdit.setObjectName(u"endDateTimeEdit")
         self.endDateTimeEdit.setGeometry(QRect(100, 200, 221, 22))
@@ -73,6 +73,24 @@ class Ui_Remote(object):
         self.label_6 = QLabel(Remote)
         self.label_6.setObjectName(u"label_6")
         self.label_6.setGeometry(QRect(20, 40, 71, 16))
+        self.syncCheckBox = QCheckBox(Remote)
+        self.syncCheckBox.setObjectName(u"syncCheckBox")
+        self.syncCheckBox.setGeometry(QRect(20, 240, 140, 23))
+        self.syncCheckBox.setChecked(True)
+        self.cancelButton = QPushButton(Remote)
+        self.cancelButton.setObjectName(u"cancelButton")
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.setGeometry(QRect(170, 240, 75, 23))
+        self.containerCheckBox = QCheckBox(Remote)
+        self.containerCheckBox.setObjectName(u"containerCheckBox")
+        self.containerCheckBox.setGeometry(QRect(20, 265, 305, 23))
+        self.progressBar = QProgressBar(Remote)
+        self.progressBar.setObjectName(u"progressBar")
+        self.progressBar.setGeometry(QRect(20, 295, 305, 20))
+        self.progressBar.setValue(0)
+        self.progressLabel = QLabel(Remote)
+        self.progressLabel.setObjectName(u"progressLabel")
+        self.progressLabel.setGeometry(QRect(20, 320, 305, 20))
 
         self.retranslateUi(Remote)
 
@@ -89,5 +107,14 @@ class Ui_Remote(object):
         self.label_5.setText(QCoreApplication.translate("Remote", u"End (UTC)", None))
         self.importButton.setText(QCoreApplication.translate("Remote", u"Import...", None))
         self.label_6.setText(QCoreApplication.translate("Remote", u"Ionosonde", None))
+#if QT_CONFIG(tooltip)
+        self.syncCheckBox.setToolTip(QCoreApplication.translate("Remote", u"Skip ionograms downloaded or found missing before", None))
+#endif // QT_CONFIG(tooltip)
+        self.syncCheckBox.setText(QCoreApplication.translate("Remote", u"Only new files", None))
+        self.cancelButton.setText(QCoreApplication.translate("Remote", u"Cancel", None))
+#if QT_CONFIG(tooltip)
+        self.containerCheckBox.setToolTip(QCoreApplication.translate("Remote", u"Parse ionograms on arrival and store their data in one file per day (the text is kept gzip compressed)", None))
+#endif // QT_CONFIG(tooltip)
+        self.containerCheckBox.setText(QCoreApplication.translate("Remote", u"Store in day containers", None))
     # retranslateUi
 
@@ -0,0 +1,317 @@
+import socket
+import struct
+import threading
+from datetime import datetime
+from math import ceil
+import numpy as np
+
+# Magic, version, date, number of heights, number of scans, RX rate and
+# RX bandwidth; reserved bytes follow up to the first scan
+HEADER = struct.Struct("<4siQiidd")
+HEADER_SIZE = HEADER.size + 1024 - 8
+
+# Frequency, amplitude, bit time and code length of a scan
+SCAN = struct.Struct("<fffi")
+
+BUFFER_SIZE = 1 << 16
+
+
+class RawDecoder:
+    """Decodes a raw VISRC2-t sounding (.rad) from its bytes as they arrive.
+
+    Scans of a frequency are accumulated as soon as they are received. The
+    image column of a frequency is computed when its scans are complete,
+    i.e. when a scan of another frequency (or the last scan) arrives, so a
+    growing sounding is never processed again from the beginning.
+    """
+
+    def __init__(self, debug_level=0):
+        self.debug_level = debug_level
+        self.buffer = bytearray()
+        self.date = None
+        self.n_height = 0
+        self.n_scan = 0
+        self.rx_rate = 0
+        self.n_decoded = 0
+        self.n_rows = None  # heights after compression with the code
+        self.frequencies = []  # Hz, sorted
+        self.sums = {}  # frequency: sums of A and B samples and of power
+        self.columns = {}  # frequency: column of the image, top first
+        self.current = None
+        self.n_current = 0
+        self.n_first = None  # scans of the first complete frequency
+        self.interleaved = False
+        self.codes = {}
+
+    def read_header(self, buffer):
+        (magic, version, date, self.n_height, self.n_scan, self.rx_rate, rx_bandwidth) = (
+            HEADER.unpack_from(buffer)
+        )
+        self.date = datetime.utcfromtimestamp(date)
+        if self.debug_level > 0:
+            print(
+                f"Version: {version}\n"
+                f"Date: {date} ({self.date})\n"
+                f"Number of heights: {self.n_height}\n"
+                f"Number of scans: {self.n_scan}\n"
+                f"RX rate: {self.rx_rate}\n"
+                f"RX bandwidth: {rx_bandwidth}\n"
+            )
+
+    def get_ranges(self):
+        return [h * 3e8 / self.rx_rate / 2 / 1000 for h in range(self.n_height)]
+
+    def is_complete(self):
+        return self.date is not None and self.n_decoded >= self.n_scan
+
+    def feed(self, data):
+        """Decode received bytes, return frequencies with new columns."""
+        self.buffer += data
+        position = 0
+        if self.date is None:
+            if len(self.buffer) < HEADER_SIZE:
+                return []
+            self.read_header(self.buffer)
+            position = HEADER_SIZE
+
+        changed = []
+        sample_size = 4 * 2 * 2 * self.n_height
+        while not self.is_complete() and len(self.buffer) - position >= SCAN.size:
+            freq, amp, bittime, code_length = SCAN.unpack_from(self.buffer, position)
+            size = SCAN.size + 4 * 2 * code_length + sample_size
+            if len(self.buffer) - position < size:
+                break
+            scan = np.frombuffer(
+                bytes(self.buffer[position + SCAN.size : position + size]), "<f4"
+            )
+            position += size
+            changed += self.__add_scan(
+                freq, amp, bittime, scan[:code_length], scan[2 * code_length :]
+            )
+        del self.buffer[:position]
+
+        if self.is_complete():
+            changed += self.finish()
+        return changed
+
+    def finish(self):
+        """Complete the column of the last frequency (e.g. when the
+        sounding is interrupted)."""
+        if self.current is None:
+            return []
+        freq, self.current = self.current, None
+        self.__complete(freq)
+        return [freq]
+
+    def __add_scan(self, freq, amp, bittime, code, samples):
+        if self.debug_level > 1:
+            print(
+                f"Freq: {freq}\n"
+                f"Amp: {amp}\n"
+                f"Bittime: {bittime}\n"
+                f"Code length: {len(code)}\n"
+                f"Code (Real part): {code.tolist()}\n"
+                f"\n"
+            )
+        self.n_decoded += 1
+
+        changed = []
+        if freq != self.current:
+            if self.current is not None:
+                changed = self.finish()
+                if self.n_first is None:
+                    self.n_first = self.n_current
+            if freq in self.frequencies:
+                self.interleaved = True
+            else:
+                self.frequencies.append(freq)
+                self.frequencies.sort()
+            self.current = freq
+            self.n_current = 0
+        self.n_current += 1
+
+        if amp < 1e-6:
+            return changed
+
+        code_complementary = self.__get_code_complementary(tuple(code.tolist()), bittime)
+        n_rows = abs(self.n_height - len(code_complementary)) + 1
+        if self.n_rows is None:
+            self.n_rows = n_rows
+        elif n_rows != self.n_rows:
+            raise ValueError("Scans are compressed with codes of different length")
+
+        from scipy import signal
+
+        samples = samples.astype(np.float64).view(complex)
+        sa = signal.convolve(samples[: self.n_height], code_complementary, mode="valid")
+        sb = signal.convolve(samples[self.n_height :], code_complementary, mode="valid")
+        if freq not in self.sums:
+            self.sums[freq] = [np.zeros(n_rows, dtype=complex) for _ in range(2)] + [
+                np.zeros(n_rows)
+            ]
+        sums = self.sums[freq]
+        sums[0] += sa
+        sums[1] += sb
+        sums[2] += (sa * np.conj(sa)).real + (sb * np.conj(sb)).real
+        return changed
+
+    def __get_code_complementary(self, code, bittime):
+        key = (code, bittime)
+        if key not in self.codes:
+            dt = 1 / self.rx_rate
+            code = list(reversed(code))
+            cc_length = int(bittime * len(code) / dt)
+            self.codes[key] = np.array(
+                [complex(0, code[int(dt * t / bittime)]) for t in range(cc_length)]
+            )
+        return self.codes[key]
+
+    def __complete(self, freq):
+        if freq not in self.sums:
+            return
+        amplitudes_a, amplitudes_b, power = self.sums[freq]
+        signs = np.where(2 * (amplitudes_a * np.conj(amplitudes_b)).real < 0, 1, -1)
+        column = power**1e-2
+        column -= np.average(column)
+        self.columns[freq] = (column * signs)[::-1]
+
+    def get_row_count(self):
+        return self.n_rows if self.n_rows is not None else self.n_height
+
+    def get_column_count(self):
+        """Return the number of columns, estimated for the whole sweep
+        while an ascending sweep is received."""
+        n_freq = len(self.frequencies)
+        if (
+            self.is_complete()
+            or self.n_first is None
+            or self.interleaved
+            or self.current != self.frequencies[-1]
+        ):
+            return n_freq
+        return max(n_freq, ceil(self.n_scan / self.n_first))
+
+    def get_frequencies(self):
+        """Return frequencies (MHz) of the columns; those not received yet
+        continue with the last frequency step."""
+        frequencies = np.array(self.frequencies) / 1e6
+        n_extra = self.get_column_count() - len(frequencies)
+        if n_extra > 0:
+            step = frequencies[-1] - frequencies[-2]
+            extra = frequencies[-1] + step * np.arange(1, n_extra + 1)
+            frequencies = np.concatenate((frequencies, extra))
+        return frequencies
+
+    def get_column_index(self, freq):
+        return self.frequencies.index(freq)
+
+    def get_column(self, freq):
+        if freq in self.columns:
+            return self.columns[freq]
+        return np.zeros(self.get_row_count())
+
+    def get_data(self, n_columns=None):
+        """Return the image, columns not received yet are zero."""
+        data = np.zeros((self.get_row_count(), n_columns or len(self.frequencies)))
+        for i, freq in enumerate(self.frequencies[: data.shape[1]]):
+            data[:, i] = self.get_column(freq)
+        return data
+
+
+def follow_file(file_name, stopped, interval=0.2):
+    """Yield data of a file as it is written, until stopped is set."""
+    with open(file_name, "rb") as file:
+        while not stopped.is_set():
+            data = file.read(BUFFER_SIZE)
+            if data:
+                yield data
+            else:
+                stopped.wait(interval)
+
+
+def read_socket(address, stopped, interval=0.2):
+    """Yield data received from a (host, port) address until the sender
+    closes the connection or stopped is set."""
+    with socket.create_connection(address, timeout=interval) as connection:
+        while not stopped.is_set():
+            try:
+                data = connection.recv(BUFFER_SIZE)
+            except socket.timeout:
+                continue
+            if not data:
+                return
+            yield data
+
+
+class RawSoundingReader:
+    """Decodes a raw sounding in a thread while it is being received.
+
+    source is a file name (the file may still be written) or a (host, port)
+    address of a stream of the file. callback() is called in the reader
+    thread when columns are changed; changes are collected with
+    take_changes().
+    """
+
+    def __init__(self, source, callback, interval=0.2):
+        self.source = source
+        self.callback = callback
+        self.interval = interval
+        self.decoder = RawDecoder()
+        self.lock = threading.Lock()
+        self.changed = set()
+        self.error = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def is_complete(self):
+        with self.lock:
+            return self.decoder.is_complete()
+
+    def __run(self):
+        try:
+            if isinstance(self.source, tuple):
+                chunks = read_socket(self.source, self.stopped, self.interval)
+            else:
+                chunks = follow_file(self.source, self.stopped, self.interval)
+            for data in chunks:
+                with self.lock:
+                    changed = self.decoder.feed(data)
+                    self.changed.update(changed)
+                    complete = self.decoder.is_complete()
+                if changed:
+                    self.callback()
+                if complete:
+                    return
+            with self.lock:
+                self.changed.update(self.decoder.finish())
+        except (OSError, ValueError, struct.error) as e:
+            self.error = e
+        self.callback()
+
+    def take_changes(self):
+        """Return frequencies (MHz) of the columns and new columns by
+        their index."""
+        with self.lock:
+            decoder = self.decoder
+            columns = {
+                decoder.get_column_index(freq): decoder.get_column(freq).copy()
+                for freq in self.changed
+            }
+            self.changed.clear()
+            return decoder.get_frequencies(), columns
+
+    def make_ionogram(self, iono):
+        """Set the received part of the sounding to an IonogramVisrc2t."""
+        with self.lock:
+            iono.set_raw(self.decoder, self.decoder.get_column_count())